@@ -0,0 +1,31 @@
+"""
+Конфигурация gunicorn для продакшена.
+
+WSGI (по умолчанию):  gunicorn -c config/gunicorn.conf.py
+ASGI через uvicorn:   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c config/gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.prod')
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+# Для uvicorn-воркеров подключаем ASGI-приложение, для остальных - WSGI
+wsgi_app = 'config.asgi:application' if 'uvicorn' in worker_class else 'config.wsgi:application'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Перезапуск воркеров после N запросов защищает от постепенного роста памяти
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Приложение загружается один раз в мастере, воркеры получают его через fork
+preload_app = True
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
@@ -0,0 +1,247 @@
+"""
+Django settings for config project: общие настройки.
+Окружения: config.settings.dev (разработка) и config.settings.prod (продакшен).
+"""
+
+from pathlib import Path
+import os
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-your-secret-key')
+
+DEBUG = os.environ.get('DJANGO_DEBUG', '0') == '1'
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+# Application definition
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'main',
+    'rest_framework',
+    'django_filters',
+    'import_export',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+   
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'config.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'main.capabilities.capabilities_context',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'config.wsgi.application'
+
+# Database
+# База данных выбирается через окружение: DJANGO_DB_ENGINE=postgres включает PostgreSQL,
+# иначе используется SQLite (файл DJANGO_SQLITE_PATH или db.sqlite3 в корне проекта).
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'kursovaia'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DJANGO_DB_POOL', '0') == '1':
+        # Пул psycopg 3: соединения живут в пуле процесса, CONN_MAX_AGE с пулом не совместим
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN', '2')),
+            'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX', '10')),
+            'timeout': 10,
+        }
+    else:
+        # Постоянные соединения: одно на поток воркера, проверяется перед повторным использованием
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '60'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Сколько секунд ждать освобождения блокировки записи
+                'timeout': 20,
+                # Транзакция сразу берёт блокировку записи: без взаимоблокировок при повышении
+                # чтения до записи (иначе SQLite сразу отвечает "database is locked")
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # Тестовая БД - файл, а не память: в общей памяти SQLite соединения разных потоков
+            # (тест одновременного бронирования) не ждут блокировку, а сразу падают "table is locked"
+            'TEST': {
+                'NAME': os.environ.get('DJANGO_SQLITE_TEST_PATH', BASE_DIR / 'test_db.sqlite3'),
+            },
+        }
+    }
+
+# PRAGMA для каждого нового соединения SQLite (main.signals.tune_sqlite_connection).
+# WAL позволяет читать во время записи, synchronous=NORMAL в режиме WAL безопасен и не делает
+# fsync на каждый коммит. DJANGO_SQLITE_TUNING=0 отключает настройки (для сравнения в бенчмарке).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+} if os.environ.get('DJANGO_SQLITE_TUNING', '1') == '1' else {}
+
+# Password validation
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# Internationalization
+LANGUAGE_CODE = 'ru'
+TIME_ZONE = 'Europe/Moscow'
+USE_I18N = True
+USE_TZ = True
+
+# Static files (CSS, JavaScript, Images)
+STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_DIRS = [
+    os.path.join(BASE_DIR, 'static'),
+]
+
+# Default primary key field type
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Настройка для кастомной модели пользователя
+AUTH_USER_MODEL = 'main.User' 
+
+LANGUAGE_CODE = 'ru-ru'
+
+# лаба 1: Настройки для работы с медиа-файлами
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Раздавать MEDIA_URL самим Django и без DEBUG (config/urls.py). Для одного сервера без
+# обратного прокси, как в docker-compose.yml; за nginx медиа лучше отдавать им из того же тома
+SERVE_MEDIA = os.environ.get('DJANGO_SERVE_MEDIA', '0') == '1'
+
+INTERNAL_IPS = ['127.0.0.1']
+
+LOGIN_REDIRECT_URL = '/profile/'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'PAGE_SIZE': 10,
+    'DEFAULT_FILTER_BACKENDS': [
+        'django_filters.rest_framework.DjangoFilterBackend',
+        'rest_framework.filters.SearchFilter',
+        'rest_framework.filters.OrderingFilter',
+    ],
+}
+
+# Кэш: по умолчанию в памяти процесса. У каждого воркера gunicorn свой locmem-кэш и сброс
+# по сигналам до других воркеров не доходит - в продакшене задайте DJANGO_REDIS_URL.
+REDIS_URL = os.environ.get('DJANGO_REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'kursovaia',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'kursovaia',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Время жизни снимка главной страницы (секунды), см. main/homepage.py
+HOMEPAGE_SNAPSHOT_TTL = 300
+
+# Время жизни закэшированных частей страницы тура (секунды), см. main/tour_cache.py
+TOUR_DETAIL_CACHE_TTL = 60 * 60
+
+# Размер ячейки сетки локаций для поиска ближайших (main/geo.py), градусы (~5,5 км по широте)
+GEO_GRID_CELL_DEG = 0.05
+
+# Байесовский рейтинг гидов (main/ratings.py): априорная оценка и её вес в отзывах
+GUIDE_RATING_PRIOR_MEAN = 3.5
+GUIDE_RATING_PRIOR_WEIGHT = 10
+
+# Сколько секунд хранить в кэше группы пользователя для проверки прав (main/capabilities.py);
+# изменения групп сбрасывают запись сразу
+MANAGER_GROUP_CACHE_TTL = 60 * 60
+
+# Время жизни сводки профиля пользователя в кэше (main/profile_summary.py), секунды
+PROFILE_SUMMARY_TTL = 600
+
+# Время жизни HTML-фрагментов карточек туров и гидов (main/fragments.py), секунды;
+# ключи версионированы, поэтому TTL только освобождает память от старых версий
+FRAGMENT_CACHE_TTL = 60 * 60 * 24
+
+# Очередь фоновых задач в БД (main/taskqueue.py), обработчик - manage.py run_tasks.
+# TASKS_EAGER=1 - выполнять задачи сразу после коммита в том же процессе, без воркера
+TASKS_EAGER = os.environ.get('DJANGO_TASKS_EAGER', '0') == '1'
+# Через сколько секунд задача в статусе running считается брошенной упавшим воркером
+TASK_LEASE_SECONDS = int(os.environ.get('DJANGO_TASK_LEASE_SECONDS', '600'))
+
+# Бюджеты SQL-запросов на вьюху (по url_name), проверяются main.middleware.QueryBudgetMiddleware
+# и помощниками из main/testing.py. Значения учитывают запросы сессии и пользователя.
+QUERY_BUDGETS = {
+    'index': 8,
+    'tour_list': 6,
+    'tour_detail': 14,  # с пустым кэшем страницы тура; из кэша - 4
+    'tour_guides_list': 5,
+    'profile': 4,  # с пустым кэшем сводки профиля; из кэша - 2
+    'rental_list': 8,
+    'create_review': 7,
+}
+# Превышение бюджета в QueryBudgetMiddleware: 1 - исключение, иначе предупреждение в логе.
+# Тесты с QueryBudgetTestMixin включают исключение сами, под любым раннером (main/testing.py)
+QUERY_BUDGET_RAISE = os.environ.get('DJANGO_QUERY_BUDGET_RAISE', '0') == '1'
+
@@ -0,0 +1,19 @@
+"""
+Настройки для разработки: DEBUG, debug_toolbar и контроль бюджетов SQL-запросов.
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+INSTALLED_APPS += ['debug_toolbar']
+
+MIDDLEWARE = [
+    'main.middleware.QueryBudgetMiddleware',
+    *MIDDLEWARE,
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+# Без отдельного run_tasks: фоновые задачи выполняются сразу после коммита, в том же запросе
+TASKS_EAGER = os.environ.get('DJANGO_TASKS_EAGER', '1') == '1'
@@ -0,0 +1,57 @@
+"""
+Продакшен-настройки: без DEBUG и debug_toolbar, статика раздаётся WhiteNoise
+из STATIC_ROOT в сжатом виде (gzip/brotli) с хэшами в именах файлов.
+
+Загруженные файлы (MEDIA_ROOT) WhiteNoise не раздаёт: за обратным прокси их отдаёт
+прокси из того же тома, без прокси - сам Django при DJANGO_SERVE_MEDIA=1 (так
+настроен web в docker-compose.yml). Схема БД создаётся сервисом migrate перед
+запуском web и worker.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Для продакшена задайте переменную окружения DJANGO_SECRET_KEY')
+
+# WhiteNoise сразу после SecurityMiddleware, чтобы статика не проходила через остальной стек
+MIDDLEWARE = [
+    MIDDLEWARE[0],
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    *MIDDLEWARE[1:],
+]
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+# Файлы с хэшем в имени можно кэшировать «навсегда»
+WHITENOISE_MAX_AGE = 60 * 60 * 24 * 365
+
+CSRF_TRUSTED_ORIGINS = [
+    origin for origin in os.environ.get('DJANGO_CSRF_TRUSTED_ORIGINS', '').split(',') if origin
+]
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+SESSION_COOKIE_SECURE = os.environ.get('DJANGO_SECURE_COOKIES', '1') == '1'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+    },
+}
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.views.static import serve
 from django.contrib.auth.views import LogoutView
 
 # лаба 1: Демонстрация использования сеансов Django
@@ -15,6 +16,12 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(next_page='index'), name='logout'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)  # лаба 1: Настройка раздачи медиафайлов 
 
-if settings.DEBUG:
+# static() работает только с DEBUG; в продакшене без прокси медиа отдаёт Django (SERVE_MEDIA)
+if settings.SERVE_MEDIA and not settings.DEBUG:
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.strip("/")}/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    ]
+
+if 'debug_toolbar' in settings.INSTALLED_APPS:
     import debug_toolbar
     urlpatterns = [path('__debug__/', include(debug_toolbar.urls))] + urlpatterns 
@@ -0,0 +1,126 @@
+# loadtest.py
+"""
+Простой нагрузочный тест (только стандартная библиотека): N потоков с keep-alive
+соединениями в течение заданного времени запрашивают список URL по кругу.
+
+Воспроизведение базовой линии (одна и та же БД, заполненная populate_db):
+
+    # 1. runserver (dev)
+    python manage.py runserver 127.0.0.1:8000 --noreload
+    python loadtest.py http://127.0.0.1:8000 --duration 20 --concurrency 16
+
+    # 2. gunicorn (prod)
+    DJANGO_SECRET_KEY=... DJANGO_SECURE_COOKIES=0 python manage.py collectstatic --noinput
+    DJANGO_SECRET_KEY=... DJANGO_SECURE_COOKIES=0 gunicorn -c config/gunicorn.conf.py
+    python loadtest.py http://127.0.0.1:8000 --duration 20 --concurrency 16
+
+    # 3. gunicorn + uvicorn (ASGI)
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker DJANGO_SECRET_KEY=... gunicorn -c config/gunicorn.conf.py
+
+Базовая линия (1 vCPU - генератор нагрузки на той же машине, SQLite, 15 туров,
+--duration 20 --concurrency 16, URL по умолчанию, ошибок 0):
+
+    сервер                              req/s    p50, мс   p99, мс
+    runserver (dev, debug_toolbar)       27.9       564      2088
+    gunicorn sync, 3 воркера            107.1       147       249
+    gunicorn + uvicorn, 3 воркера        76.1       195      1062
+
+Цифры сильно зависят от железа - сравнивайте прогоны только на одной машине.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+DEFAULT_PATHS = ['/', '/tours/', '/tours/?search=экскурсия', '/tour-guides/', '/api/tours/', '/static/css/styles.css']
+
+
+def percentile(values, pct):
+    """Перцентиль по отсортированному списку."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def worker(base, paths, deadline, latencies, errors, lock):
+    """Один поток: свой keep-alive коннект, запросы по кругу до дедлайна."""
+    connection_class = http.client.HTTPSConnection if base.scheme == 'https' else http.client.HTTPConnection
+    conn = connection_class(base.hostname, base.port, timeout=30)
+    local_latencies = []
+    local_errors = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Host': base.netloc})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = connection_class(base.hostname, base.port, timeout=30)
+            continue
+        local_latencies.append(time.perf_counter() - started)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run(base_url, paths, duration, concurrency):
+    base = urlsplit(base_url)
+    quoted = [quote(path, safe='/?=&') for path in paths]
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(base, quoted, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'url': base_url,
+        'duration_s': round(elapsed, 2),
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест bike tours')
+    parser.add_argument('base_url', help='Например, http://127.0.0.1:8000')
+    parser.add_argument('--duration', type=float, default=20, help='Длительность, секунды')
+    parser.add_argument('--concurrency', type=int, default=16, help='Число параллельных соединений')
+    parser.add_argument('--path', action='append', dest='paths', help='Путь для запроса (можно несколько раз)')
+    parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+    args = parser.parse_args()
+
+    result = run(args.base_url.rstrip('/'), args.paths or DEFAULT_PATHS, args.duration, args.concurrency)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        for key, value in result.items():
+            print(f'{key:>12}: {value}')
+
+
+if __name__ == '__main__':
+    main()
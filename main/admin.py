@@ -4,7 +4,8 @@
 from django.contrib import admin
 from import_export.admin import ImportExportModelAdmin
 from import_export import resources
-from .models import User, Guide, Tour, GuideTour, Rental, Bike, Location, Review, Booking, Slot
+from .models import User, Guide, Tour, GuideTour, Rental, Bike, Location, Review, Booking, Slot, Task
+from .taskqueue import retry
 from django.utils.translation import gettext_lazy as _
 
 @admin.register(User)
@@ -17,7 +18,7 @@ class UserAdmin(admin.ModelAdmin):
 @admin.register(Guide)
 class GuideAdmin(admin.ModelAdmin):
     """Админка для гидов."""
-    list_display = ('user', 'experience', 'languages', 'rating')
+    list_display = ('user', 'experience', 'languages', 'rating', 'review_count')
     search_fields = ('user__username', 'languages')
     list_filter = ('experience',)
 
@@ -54,8 +55,9 @@ class SlotInline(admin.TabularInline):
 @admin.register(Tour)
 class TourAdmin(admin.ModelAdmin):
     """Админка для туров."""
-    list_display = ('name', 'duration', 'price', 'location')
+    list_display = ('name', 'duration', 'price', 'location', 'avg_rating', 'review_count')
     search_fields = ('name', 'location')
+    readonly_fields = ('avg_rating', 'review_count')
     list_filter = ('location', HasImageFilter,)
     inlines = [SlotInline]
     
@@ -88,6 +90,10 @@ class BikeResource(resources.ModelResource):
         """Преобразует статус велосипеда в строку для экспорта."""
         return bike.status.status_name if hasattr(bike.status, 'status_name') else str(bike.status)
 
+    class Meta:
+        model = Bike
+        exclude = ('search_text',)
+
 class BikeAdmin(ImportExportModelAdmin):
     """Админка для велосипедов с экспортом."""
     resource_class = BikeResource
@@ -155,6 +161,23 @@ class SlotAdmin(admin.ModelAdmin):
     list_filter = ('tour', 'guide', 'is_booked')
     search_fields = ('tour__name', 'guide__user__username')
 
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Админка очереди фоновых задач: статус, попытки, ошибки и повтор."""
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = [field.name for field in Task._meta.fields]
+    actions = ['retry_failed']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Повторить выбранные задачи с ошибкой')
+    def retry_failed(self, request, queryset):
+        count = retry(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Поставлено в очередь повторно: {count}')
+
 # ... existing code ...
 
 # ... final translation line ...
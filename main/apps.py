@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
-    verbose_name = 'Основное приложение' 
\ No newline at end of file
+    verbose_name = 'Основное приложение' 
+
+    def ready(self):
+        # Подключаем обработчики сигналов (денормализованные рейтинги и т.п.)
+        from . import signals  # noqa: F401
@@ -0,0 +1,175 @@
+"""
+Занятость велосипедов: аренды и слоты туров, пересекающиеся с интервалом.
+
+Велосипед занят арендой на [start_time, end_time) и слотом тура с этим
+велосипедом на [datetime, datetime + длительность тура). Интервалы [a, b) и
+[start, end) пересекаются, если a < end и b > start:
+
+- аренды ищутся по индексу rental_bike_end_idx (bike, end_time, start_time):
+  диапазон end_time > start внутри каждого велосипеда отсекает все прошлые аренды,
+  а start_time < end проверяется по тому же индексу без чтения таблицы;
+- у слота нет времени окончания, но тур длится не дольше SLOT_MAX_DURATION, поэтому
+  достаточно диапазона datetime в (start - SLOT_MAX_DURATION, end) по частичному
+  индексу slot_bike_dt_idx (bike, datetime) - точная проверка по длительности тура
+  делается уже над найденными строками.
+
+Свободные окна - промежутки между слитыми занятыми интервалами внутри запрошенного
+диапазона. Запросов два на любое число велосипедов (аренды и слоты).
+"""
+import datetime
+from collections import defaultdict, namedtuple
+
+from django.utils import timezone
+
+from .exports import parse_export_date
+from .models import Bike, Rental, Slot, Tour
+
+AVAILABLE_STATUS = 'Доступен'
+DEFAULT_RANGE_DAYS = 7
+MAX_RANGE_DAYS = 31
+SLOT_MAX_DURATION = datetime.timedelta(hours=max(hours for hours, _ in Tour.DURATION_CHOICES))
+
+Interval = namedtuple('Interval', 'start end kind pk')
+RENTAL, SLOT = 'rental', 'slot'
+KIND_LABELS = {RENTAL: 'аренда', SLOT: 'тур'}
+
+
+def busy_intervals(bike_ids, start, end, exclude_rental=None):
+    """
+    {id велосипеда: [Interval]} - аренды и слоты, пересекающиеся с [start, end),
+    по возрастанию начала. exclude_rental - id аренды, которую не учитывать (её же правка).
+    """
+    busy = defaultdict(list)
+    rentals = Rental.objects.filter(bike_id__in=bike_ids, end_time__gt=start, start_time__lt=end)
+    if exclude_rental is not None:
+        rentals = rentals.exclude(pk=exclude_rental)
+    for pk, bike_id, rental_start, rental_end in rentals.order_by().values_list(
+        'pk', 'bike_id', 'start_time', 'end_time',
+    ):
+        busy[bike_id].append(Interval(rental_start, rental_end, RENTAL, pk))
+
+    slots = Slot.objects.filter(
+        bike_id__in=bike_ids, datetime__gt=start - SLOT_MAX_DURATION, datetime__lt=end,
+    )
+    for pk, bike_id, slot_start, hours in slots.order_by().values_list('pk', 'bike_id', 'datetime', 'tour__duration'):
+        slot_end = slot_start + datetime.timedelta(hours=hours)
+        if slot_end > start:
+            busy[bike_id].append(Interval(slot_start, slot_end, SLOT, pk))
+
+    for intervals in busy.values():
+        intervals.sort()
+    return busy
+
+
+def merge_intervals(intervals):
+    """Слияние пересекающихся и смежных интервалов, отсортированных по началу -> [(начало, конец)]."""
+    merged = []
+    for interval in intervals:
+        if merged and interval.start <= merged[-1][1]:
+            if interval.end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], interval.end)
+        else:
+            merged.append((interval.start, interval.end))
+    return merged
+
+
+def free_windows(intervals, start, end):
+    """Свободные окна [(начало, конец)] внутри [start, end) между занятыми интервалами."""
+    free = []
+    cursor = start
+    for busy_start, busy_end in merge_intervals(intervals):
+        if busy_start > cursor:
+            free.append((cursor, min(busy_start, end)))
+        cursor = max(cursor, busy_end)
+        if cursor >= end:
+            return free
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+
+def rental_conflict(bike_id, start, end, exclude_rental=None):
+    """Первая аренда или слот велосипеда, пересекающиеся с [start, end); None, если велосипед свободен."""
+    intervals = busy_intervals([bike_id], start, end, exclude_rental).get(bike_id)
+    return intervals[0] if intervals else None
+
+
+def conflict_message(interval):
+    """Текст ошибки для пользователя о пересечении с интервалом."""
+    start, end = timezone.localtime(interval.start), timezone.localtime(interval.end)
+    return (
+        f'Велосипед занят в это время ({KIND_LABELS[interval.kind]} '
+        f'с {start:%d.%m.%Y %H:%M} до {end:%d.%m.%Y %H:%M}).'
+    )
+
+
+def lock_and_check(bike_id, start, end, exclude_rental=None):
+    """
+    Повторная проверка перед сохранением аренды; вызывать внутри transaction.atomic.
+    Строка велосипеда блокируется (SELECT ... FOR UPDATE в PostgreSQL), поэтому две
+    одновременные аренды одного велосипеда проверяются по очереди. Возвращает текст
+    ошибки или None.
+    """
+    list(Bike.objects.select_for_update().filter(pk=bike_id).values_list('pk', flat=True))
+    conflict = rental_conflict(bike_id, start, end, exclude_rental)
+    return conflict_message(conflict) if conflict else None
+
+
+def parse_range_params(params):
+    """
+    Диапазон ?start=&end= (ISO 8601, дата или дата-время) -> (start, end).
+    По умолчанию - DEFAULT_RANGE_DAYS дней от текущего момента. ValueError с текстом для клиента.
+    """
+    start = parse_export_date(params.get('start')) or timezone.now().replace(second=0, microsecond=0)
+    end = parse_export_date(params.get('end')) or start + datetime.timedelta(days=DEFAULT_RANGE_DAYS)
+    if end <= start:
+        raise ValueError('end должен быть позже start')
+    if end - start > datetime.timedelta(days=MAX_RANGE_DAYS):
+        raise ValueError(f'Диапазон не больше {MAX_RANGE_DAYS} дней')
+    return start, end
+
+
+def _window(start, end):
+    return {'start': timezone.localtime(start).isoformat(), 'end': timezone.localtime(end).isoformat()}
+
+
+def _bike_entry(bike, intervals, start, end):
+    available = bike.status.status_name == AVAILABLE_STATUS
+    return {
+        'bike': bike.pk,
+        'type': bike.type,
+        'status': bike.status.status_name,
+        # Владельцы аренд не раскрываются - только вид занятости
+        'busy': [dict(_window(interval.start, interval.end), kind=interval.kind) for interval in intervals],
+        # Велосипед не в статусе «Доступен» (ремонт и т.п.) не сдаётся ни в какое время
+        'free': [_window(*window) for window in free_windows(intervals, start, end)] if available else [],
+    }
+
+
+def bike_availability(bike, start, end):
+    """Занятые интервалы и свободные окна велосипеда в [start, end)."""
+    intervals = busy_intervals([bike.pk], start, end).get(bike.pk, [])
+    return dict(_window(start, end), **_bike_entry(bike, intervals, start, end))
+
+
+def location_availability(location, start, end):
+    """
+    Свободные окна велосипедов локации в [start, end) и общие окна, когда свободен
+    хотя бы один велосипед. Три запроса: велосипеды, аренды, слоты.
+    """
+    bikes = list(location.bikes.select_related('status').order_by('id'))
+    busy = busy_intervals([bike.pk for bike in bikes], start, end)
+    entries = [_bike_entry(bike, busy.get(bike.pk, []), start, end) for bike in bikes]
+    # Объединение свободных окон всех велосипедов
+    windows = sorted(
+        Interval(*window, None, None)
+        for bike in bikes if bike.status.status_name == AVAILABLE_STATUS
+        for window in free_windows(busy.get(bike.pk, []), start, end)
+    )
+    return dict(
+        _window(start, end),
+        location=location.pk,
+        name=location.name,
+        free=[_window(*window) for window in merge_intervals(windows)],
+        bikes=entries,
+    )
@@ -0,0 +1,257 @@
+"""
+Бенчмарк основных HTML-страниц и маршрутов REST API через тестовый клиент Django.
+
+Для каждого сценария: задержка (p50/p99 по --repeat запросам после прогрева),
+число SQL-запросов и время в БД, пиковая память на запрос (tracemalloc, отдельный
+прогон - трассировка сама замедляет код). Результат - словарь, который команда
+benchmark_views пишет в JSON; два файла можно сравнить через --compare.
+Сценарий, хотя бы один ответ которого не 200, помечается valid=False и в
+сравнение не попадает: замер страницы ошибки ничего не говорит о самой вьюхе.
+
+Запросы идут в обход сети и сервера приложений: цифры показывают стоимость
+вьюх, шаблонов и ORM, а не gunicorn (для него см. loadtest.py).
+"""
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+
+from .middleware import QueryRecorder
+from .models import Bike, Booking, Location, Rental, Review, Tour, User
+from .views import TourListView
+
+# Границы дат для фильтров по created_at - с часовым поясом, чтобы вьюха не получала «наивное» время
+CREATED_BOUNDARY = datetime(2025, 1, 1, tzinfo=dt_timezone.utc).isoformat()
+
+# Каждый фильтр списка туров по отдельности и типичные сочетания из формы фильтров
+TOUR_LIST_FILTERS = {
+    'none': {},
+    'search': {'search': 'экскурсия'},
+    'location': {'location': 'парк'},
+    'min_price': {'min_price': '50'},
+    'max_price': {'max_price': '100'},
+    'duration': {'duration': '2'},
+    'created_after': {'created_after': CREATED_BOUNDARY},
+    'created_before': {'created_before': CREATED_BOUNDARY},
+    'rating': {'rating': '4'},
+    'name_starts_with': {'name_starts_with': 'Ист'},
+    'popular_durations': {'popular_durations': ['1', '2', '3']},
+    'hide_expensive': {'hide_expensive': '1'},
+    'hide_without_reviews': {'hide_without_reviews': '1'},
+    'hide_new': {'hide_new': '1'},
+    'highly_rated': {'highly_rated': '1'},
+    'exclude_duration': {'exclude_duration': '8'},
+    'exclude_location': {'exclude_location': 'Озеро'},
+    'has_guide': {'has_guide': '1'},
+    'no_guide': {'has_guide': '0'},
+    'duration+price': {'duration': '2', 'min_price': '20', 'max_price': '60'},
+    'search+price': {'search': 'экскурсия', 'max_price': '100'},
+    'rating+reviews': {'rating': '4', 'hide_without_reviews': '1'},
+    'location+guide': {'location': 'парк', 'has_guide': '1'},
+}
+
+
+@dataclass
+class Scenario:
+    """
+    Один замеряемый запрос: имя в отчёте, маршрут, аргументы URL и GET-параметры.
+    staff=True - запрос от имени персонала (маршруты с IsAdminUser).
+    """
+    name: str
+    url_name: str
+    args: tuple = ()
+    query: dict = field(default_factory=dict)
+    staff: bool = False
+
+    @property
+    def url(self):
+        return reverse(self.url_name, args=self.args)
+
+
+def pick_user():
+    """Обычный пользователь с наибольшим числом аренд - самые тяжёлые profile и rental_list."""
+    users = User.objects.filter(role='Пользователь').annotate(rental_count=Count('rentals'))
+    return users.order_by('-rental_count', 'id').first() or User.objects.order_by('id').first()
+
+
+def pick_staff_user():
+    """Активный сотрудник для маршрутов только для персонала; None - в базе таких нет."""
+    return User.objects.filter(is_staff=True, is_active=True).order_by('id').first()
+
+
+def last_tour_list_page():
+    """Номер последней страницы списка туров без фильтров - самый глубокий OFFSET в текущей базе."""
+    return max(1, math.ceil(Tour.objects.count() / TourListView.paginate_by))
+
+
+def build_scenarios(user, staff_user=None):
+    """
+    Все сценарии для текущей базы; id объектов для детальных страниц и номер
+    глубокой страницы берутся из неё же. Без staff_user сценарии /api/users/
+    (кроме сводки текущего пользователя) пропускаются - обычный пользователь получит 403.
+    """
+    scenarios = [Scenario('index', 'index')]
+    scenarios += [Scenario(f'tour_list[{name}]', 'tour_list', query=query) for name, query in TOUR_LIST_FILTERS.items()]
+    scenarios.append(Scenario('tour_list[deep_page]', 'tour_list', query={'page': str(last_tour_list_page())}))
+
+    tour = Tour.objects.filter(is_active=True).order_by('-review_count', 'id').first()
+    if tour is not None:
+        scenarios.append(Scenario('tour_detail', 'tour_detail', args=(tour.pk,)))
+    scenarios += [
+        Scenario('profile', 'profile'),
+        Scenario('rental_list', 'rental_list'),
+        Scenario('api-root', 'api-root'),
+    ]
+
+    details = {
+        'bike': Bike.objects.order_by('id').values_list('id', flat=True).first(),
+        'rental': Rental.objects.filter(user=user).order_by('id').values_list('id', flat=True).first(),
+        'user': user.pk,
+        'tour': tour.pk if tour else None,
+    }
+    for basename, pk in details.items():
+        staff = basename == 'user'
+        if staff and staff_user is None:
+            continue
+        scenarios.append(Scenario(f'{basename}-list', f'{basename}-list', staff=staff))
+        # У TourViewSet нет keyset-пагинации
+        if basename != 'tour':
+            scenarios.append(Scenario(
+                f'{basename}-list[cursor]', f'{basename}-list', query={'pagination': 'cursor'}, staff=staff,
+            ))
+        if pk is not None:
+            scenarios.append(Scenario(f'{basename}-detail', f'{basename}-detail', args=(pk,), staff=staff))
+    scenarios.append(Scenario('user-me-summary', 'user-me-summary'))
+
+    # Поиск рядом с первой локацией (main/geo.py)
+    point = Location.objects.order_by('id').values('latitude', 'longitude').first()
+    if point is not None:
+        query = {'lat': point['latitude'], 'lng': point['longitude'], 'radius': 5}
+        scenarios.append(Scenario('bike-nearby', 'bike-nearby', query=query))
+        scenarios.append(Scenario('locations-nearby', 'api_nearby_locations', query=query))
+
+    # Свободные окна велосипеда и самой большой локации на неделю (main/availability.py)
+    if details['bike'] is not None:
+        scenarios.append(Scenario('bike-availability', 'bike-availability', args=(details['bike'],)))
+    location_id = (
+        Location.objects.annotate(bike_count=Count('bikes')).order_by('-bike_count', 'id')
+        .values_list('id', flat=True).first()
+    )
+    if location_id is not None:
+        scenarios.append(Scenario('location-availability', 'api_location_availability', args=(location_id,)))
+    return scenarios
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга (для малых выборок p99 = максимум)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(client, scenario, repeat=20, warmup=2, cold=False):
+    """Замеры одного сценария; cold=True - кэш Django очищается перед каждым запросом."""
+    url = scenario.url
+
+    def request():
+        if cold:
+            cache.clear()
+        return client.get(url, scenario.query)
+
+    for _ in range(warmup):
+        request()
+
+    timings, queries, db_times, statuses = [], [], [], set()
+    response = None
+    for _ in range(repeat):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.record():
+            response = request()
+            statuses.add(response.status_code)
+            # Потоковые ответы считаются целиком - иначе замер закончится до рендеринга
+            if response.streaming:
+                b''.join(response.streaming_content)
+        timings.append((time.perf_counter() - started) * 1000)
+        queries.append(recorder.count)
+        db_times.append(recorder.duration * 1000)
+
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'query': scenario.query,
+        'status': response.status_code,
+        'valid': statuses == {200},
+        'p50_ms': round(statistics.median(timings), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'queries': max(queries),
+        'db_ms': round(statistics.median(db_times), 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    """Сведения о прогоне: без них результаты разных машин и баз не сравнить."""
+    return {
+        'started_at': timezone.now().isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'cache': settings.CACHES['default']['BACKEND'],
+        'rows': {
+            'users': User.objects.count(),
+            'tours': Tour.objects.count(),
+            'bikes': Bike.objects.count(),
+            'rentals': Rental.objects.count(),
+            'bookings': Booking.objects.count(),
+            'reviews': Review.objects.count(),
+        },
+    }
+
+
+def compare(baseline, current):
+    """
+    Построчное сравнение двух отчётов: [(сценарий, метрика, было, стало, изменение в %)].
+    Сценарии, невалидные хотя бы в одном отчёте, пропускаются.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None or not before.get('valid', True) or not result.get('valid', True):
+            continue
+        for metric in ('p50_ms', 'p99_ms', 'queries', 'peak_memory_kb'):
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else (0.0 if new == old else math.inf)
+            rows.append((name, metric, old, new, change))
+    return rows
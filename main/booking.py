@@ -0,0 +1,92 @@
+"""
+Бронирование слотов экскурсий без гонок.
+
+Слот захватывается условным UPDATE (... WHERE is_booked = FALSE): из нескольких
+одновременных запросов строку обновит ровно один, остальные получат 0 строк.
+Прошедшие слоты и слоты неактивных туров в UPDATE не попадают.
+Booking и Rental создаются в той же транзакции, что и захват слота.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, Rental, Slot
+from .tour_cache import invalidate_tour_detail
+
+SLOT_UNAVAILABLE = 'slot_unavailable'
+SLOT_NOT_FOUND = 'slot_not_found'
+SLOT_EXPIRED = 'slot_expired'
+TOUR_INACTIVE = 'tour_inactive'
+
+
+@dataclass
+class BookingResult:
+    """Результат бронирования: общий для HTML-вьюхи и API."""
+    success: bool
+    booking: Booking = None
+    rental: Rental = None
+    error: str = None
+    code: str = 'ok'
+
+    def as_dict(self):
+        """Представление результата для JSON-ответа."""
+        data = {'success': self.success, 'code': self.code}
+        if self.error:
+            data['error'] = self.error
+        if self.booking:
+            data['booking_id'] = self.booking.id
+            data['tour_id'] = self.booking.tour_id
+            data['date'] = self.booking.date.isoformat()
+            data['total_price'] = self.booking.total_price
+        if self.rental:
+            data['rental_id'] = self.rental.id
+        return data
+
+
+def book_slot(user, slot):
+    """
+    Бронирует слот для пользователя.
+    slot - экземпляр Slot с загруженным tour (select_related) или его id.
+    Возвращает BookingResult; при занятом, прошедшем слоте или неактивном туре
+    ничего не создаётся.
+    """
+    if not isinstance(slot, Slot):
+        slot = Slot.objects.select_related('tour').filter(pk=slot).first()
+        if slot is None:
+            return BookingResult(False, error='Слот не найден.', code=SLOT_NOT_FOUND)
+
+    tour = slot.tour
+    price = float(tour.price)
+    with transaction.atomic():
+        claimed = Slot.objects.filter(
+            pk=slot.pk, is_booked=False, datetime__gt=timezone.now(), tour__is_active=True,
+        ).update(is_booked=True)
+        if not claimed:
+            return _claim_failure(slot)
+        booking = Booking.objects.create(user=user, tour=tour, date=slot.datetime, total_price=price)
+        # Создаём Rental для пользователя по бронированию тура
+        rental = Rental.objects.create(
+            user=user,
+            bike_id=slot.bike_id,
+            start_time=slot.datetime,
+            end_time=slot.datetime + timedelta(hours=tour.duration),
+            total_price=price,
+        )
+    slot.is_booked = True
+    # UPDATE не отправляет post_save - расписание на странице тура сбрасываем явно
+    invalidate_tour_detail(tour.id, 'schedule')
+    return BookingResult(True, booking=booking, rental=rental)
+
+
+def _claim_failure(slot):
+    """Причина, по которой условный UPDATE не захватил слот."""
+    current = Slot.objects.select_related('tour').filter(pk=slot.pk).first()
+    if current is None:
+        return BookingResult(False, error='Слот не найден.', code=SLOT_NOT_FOUND)
+    if not current.tour.is_active:
+        return BookingResult(False, error='Тур больше не доступен для бронирования.', code=TOUR_INACTIVE)
+    if current.datetime <= timezone.now():
+        return BookingResult(False, error='Этот слот уже прошёл. Пожалуйста, выберите другой.', code=SLOT_EXPIRED)
+    return BookingResult(False, error='Этот слот уже занят. Пожалуйста, выберите другой.', code=SLOT_UNAVAILABLE)
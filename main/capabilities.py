@@ -0,0 +1,151 @@
+"""
+Права пользователя в одном месте: набор возможностей (capabilities), который
+вьюхи и шаблоны проверяют вместо сравнения role, is_superuser и групп.
+
+Менеджер - суперпользователь или участник группы Managers; ему доступны туры со
+слотами, аренды всех пользователей и выгрузки. Поле role права менеджера не даёт:
+его меняет сам пользователь. Бронировать туры может пользователь с ролью «Пользователь».
+
+is_superuser уже загружен вместе с request.user, запрос к БД нужен только для
+групп - и только если пользователь не суперпользователь. Группы пользователя
+хранятся в кэше Django (MANAGER_GROUP_CACHE_TTL); сигналы (main/signals.py) удаляют
+запись при изменении групп пользователя, а переименование или удаление группы
+сдвигает общую версию. Готовый набор запоминается на объекте пользователя - в
+пределах запроса он считается один раз.
+
+Проверки: декоратор capability_required для функций-вьюх, миксин
+CapabilityRequiredMixin для классов, в шаблонах - переменная capabilities
+(контекст-процессор capabilities_context): {% if 'manage_tours' in capabilities %}.
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.utils.functional import SimpleLazyObject
+
+CUSTOMER_ROLE = 'Пользователь'
+MANAGER_GROUP = 'Managers'
+
+MANAGE_TOURS = 'manage_tours'
+MANAGE_RENTALS = 'manage_rentals'
+EXPORT_DATA = 'export_data'
+BOOK_TOURS = 'book_tours'
+MANAGER_CAPABILITIES = frozenset({MANAGE_TOURS, MANAGE_RENTALS, EXPORT_DATA})
+
+KEY_PREFIX = 'capabilities'
+VERSION_KEY = f'{KEY_PREFIX}:version'
+CACHE_ATTR = '_capabilities'
+
+
+def _groups_key(user_id):
+    return f'{KEY_PREFIX}:groups:{user_id}'
+
+
+def _current_version(cached):
+    version = cached.get(VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def user_group_names(user):
+    """Имена групп пользователя: из кэша, при промахе - один запрос."""
+    key = _groups_key(user.pk)
+    # Версия и группы - за одно обращение к кэшу
+    cached = cache.get_many([VERSION_KEY, key])
+    version = _current_version(cached)
+    stored = cached.get(key)
+    if stored is not None and stored[0] == version:
+        return stored[1]
+    names = frozenset(user.groups.values_list('name', flat=True))
+    cache.set(key, (version, names), getattr(settings, 'MANAGER_GROUP_CACHE_TTL', 60 * 60))
+    return names
+
+
+def compute_capabilities(user):
+    """Набор возможностей пользователя без кэша на объекте."""
+    if not user.is_authenticated:
+        return frozenset()
+    capabilities = set()
+    if user.is_superuser or MANAGER_GROUP in user_group_names(user):
+        capabilities |= MANAGER_CAPABILITIES
+    if getattr(user, 'role', None) == CUSTOMER_ROLE:
+        capabilities.add(BOOK_TOURS)
+    return frozenset(capabilities)
+
+
+def user_capabilities(user):
+    """Набор возможностей пользователя; считается один раз на объект (запрос)."""
+    capabilities = getattr(user, CACHE_ATTR, None)
+    if capabilities is None:
+        capabilities = compute_capabilities(user)
+        setattr(user, CACHE_ATTR, capabilities)
+    return capabilities
+
+
+def has_capability(user, *capabilities):
+    """True, если у пользователя есть все перечисленные возможности."""
+    return user_capabilities(user).issuperset(capabilities)
+
+
+def forget_user_capabilities(user):
+    """Сбросить набор, запомненный на объекте (после изменения роли в этом же запросе)."""
+    try:
+        delattr(user, CACHE_ATTR)
+    except AttributeError:
+        pass
+
+
+def invalidate_user_groups(*user_ids):
+    """Группы этих пользователей изменились."""
+    cache.delete_many([_groups_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all_groups():
+    """Группа переименована или удалена: группы всех пользователей перечитаются."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def capability_required(*capabilities, message='У вас нет прав для выполнения этого действия'):
+    """
+    Декоратор функции-вьюхи: анонимного пользователя отправляет на вход,
+    пользователя без нужных возможностей - на страницу 403.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if not has_capability(request.user, *capabilities):
+                raise PermissionDenied(message)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class CapabilityRequiredMixin(UserPassesTestMixin):
+    """Миксин для классов-вьюх: required_capabilities - нужные возможности."""
+    required_capabilities = ()
+    permission_denied_message = 'У вас нет прав для выполнения этого действия'
+
+    def test_func(self):
+        return has_capability(self.request.user, *self.required_capabilities)
+
+    def handle_no_permission(self):
+        if not self.request.user.is_authenticated:
+            return super().handle_no_permission()
+        raise PermissionDenied(self.get_permission_denied_message())
+
+
+def capabilities_context(request):
+    """Контекст-процессор: capabilities в шаблонах; без обращения к нему ничего не считается."""
+    return {'capabilities': SimpleLazyObject(lambda: user_capabilities(request.user))}
@@ -0,0 +1,384 @@
+"""
+Генератор синтетических данных для разработки, нагрузочных тестов и бенчмарков.
+
+Профили (small/medium/large/xl) задают объёмы таблиц. Данные детерминированы:
+одинаковые профиль, seed и опорная дата дают одинаковый набор строк, поэтому
+замеры на разных машинах и в разные дни сравнимы. Строки создаются генераторами
+порциями через bulk_create (по транзакции на порцию), в памяти держатся только
+id пользователей, велосипедов, туров и гидов. Пароль хэшируется один раз и
+переиспользуется для всех пользователей.
+
+Поля с auto_now_add (User.created_at, Review.created_at, GuideTour.assigned_at)
+Django заполняет текущим временем и при bulk_create - они не детерминированы.
+"""
+import datetime
+import random
+import time
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Bike, BikeStatus, Booking, Guide, GuideTour, Location, Payment, Rental, Review, Slot, Tour, User
+from .ratings import recompute_guide_ratings
+
+DEFAULT_SEED = 42
+DEFAULT_PASSWORD = 'password123'
+DEFAULT_BATCH_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class DatasetProfile:
+    """Объёмы таблиц профиля."""
+    users: int
+    bikes: int
+    tours: int
+    rentals: int
+    bookings: int
+    reviews: int
+    payments: int
+    slot_days: int = 14
+
+
+PROFILES = {
+    # Объёмы прежнего populate_db.py
+    'small': DatasetProfile(users=20, bikes=30, tours=15, rentals=50, bookings=40, reviews=30, payments=60),
+    'medium': DatasetProfile(
+        users=2_000, bikes=1_000, tours=200, rentals=100_000, bookings=50_000, reviews=20_000, payments=50_000,
+    ),
+    'large': DatasetProfile(
+        users=20_000, bikes=10_000, tours=1_000, rentals=1_000_000, bookings=500_000, reviews=200_000,
+        payments=500_000,
+    ),
+    'xl': DatasetProfile(
+        users=100_000, bikes=50_000, tours=5_000, rentals=5_000_000, bookings=2_000_000, reviews=2_000_000,
+        payments=2_000_000, slot_days=7,
+    ),
+}
+
+FIRST_NAMES_MALE = ['Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Иван', 'Артем', 'Николай', 'Михаил']
+FIRST_NAMES_FEMALE = ['Елена', 'Ольга', 'Наталья', 'Анна', 'Мария', 'Ирина', 'Светлана', 'Татьяна', 'Екатерина', 'Юлия']
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Павлов', 'Семенов', 'Голубев']
+LANGUAGES = ['Русский', 'Английский', 'Французский', 'Немецкий', 'Испанский', 'Китайский', 'Японский']
+LOCATIONS = [
+    ("Центральный парк", "ул. Центральная, 1", 55.751244, 37.618423),
+    ("Набережная реки", "ул. Набережная, 5", 55.753933, 37.620792),
+    ("Исторический центр", "пл. Историческая, 3", 55.758631, 37.619844),
+    ("Горный район", "ул. Горная, 12", 55.763511, 37.625678),
+    ("Озеро", "ул. Озерная, 7", 55.766422, 37.615432)
+]
+TOUR_NAMES = [
+    "Историческая экскурсия",
+    "Гастрономический тур",
+    "Велосипедная прогулка",
+    "Ночная экскурсия",
+    "Экскурсия для детей",
+    "Архитектурный тур",
+    "Литературный маршрут"
+]
+TOUR_DESCRIPTIONS = [
+    "Увлекательное путешествие по историческим местам города",
+    "Знакомство с местной кухней и традициями",
+    "Активный отдых с осмотром достопримечательностей",
+    "Необычный взгляд на город в ночных огнях",
+    "Специальная программа для маленьких путешественников",
+    "Исследование архитектурных стилей и памятников",
+    "Маршрут по местам, связанным с известными писателями"
+]
+BIKE_STATUSES = ['Доступен', 'В аренде', 'На обслуживании', 'Сломан']
+PAYMENT_METHODS = ['Карта', 'Наличные', 'Онлайн-перевод', 'Криптовалюта']
+COMMENTS = [
+    "Отличный тур, всем рекомендую!",
+    "Гид был очень знающий и дружелюбный.",
+    "Немного устали, но впечатления прекрасные.",
+    "Не все было организовано идеально, но в целом понравилось.",
+    "Прекрасный способ познакомиться с городом!",
+    "Ожидали большего за такую цену.",
+    "Обязательно вернемся и возьмем еще один тур!"
+]
+TOUR_DURATIONS = [1, 2, 3, 4, 6, 8]
+SLOT_TIMES = [datetime.time(10, 0), datetime.time(15, 0)]
+# Распределение оценок 1..5: большинство отзывов положительные, но есть и плохие
+RATING_WEIGHTS = [3, 4, 13, 35, 45]
+
+
+def default_anchor():
+    """Опорная дата по умолчанию - полночь текущего дня (набор воспроизводим в пределах суток)."""
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class DatasetGenerator:
+    """
+    Заполняет пустую базу по профилю. Каждая таблица получает собственный
+    random.Random(seed + смещение), поэтому изменение объёма одной таблицы
+    не меняет строки остальных.
+    """
+
+    def __init__(self, profile, seed=DEFAULT_SEED, anchor=None, batch_size=DEFAULT_BATCH_SIZE,
+                 password=DEFAULT_PASSWORD, progress=None):
+        self.profile = profile
+        self.seed = seed
+        self.anchor = anchor or default_anchor()
+        self.batch_size = batch_size
+        self.password = password
+        self.progress = progress or (lambda name, created, elapsed: None)
+        self.counts = {}
+
+    def _random(self, offset):
+        return random.Random(self.seed * 1000 + offset)
+
+    def _insert(self, name, model, objects):
+        """bulk_create из генератора objects порциями по batch_size, каждая в своей транзакции."""
+        started = time.perf_counter()
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                created += self._flush(model, batch)
+                batch = []
+        if batch:
+            created += self._flush(model, batch)
+        self.counts[name] = created
+        self.progress(name, created, time.perf_counter() - started)
+        return created
+
+    def _flush(self, model, batch):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+        return len(batch)
+
+    @staticmethod
+    def _new_ids(model, after_id, *fields):
+        """id (и поля) строк, вставленных после after_id - не зависит от поддержки RETURNING в bulk_create."""
+        queryset = model.objects.filter(id__gt=after_id).order_by('id')
+        if fields:
+            return list(queryset.values_list('id', *fields))
+        return list(queryset.values_list('id', flat=True))
+
+    @staticmethod
+    def _max_id(model):
+        return model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def run(self):
+        """Создаёт все таблицы профиля; возвращает {таблица: создано строк}."""
+        statuses = self.create_bike_statuses()
+        locations = self.create_locations()
+        users = self.create_users()
+        guides = self.create_guides(users)
+        customers = [user_id for user_id, role in users if role == 'Пользователь'] or [user_id for user_id, _ in users]
+        all_users = [user_id for user_id, _ in users]
+        bikes = self.create_bikes(statuses, locations)
+        tours = self.create_tours(locations)
+        self.assign_guides(tours, guides)
+        self.create_slots(tours, guides)
+        self.create_rentals(customers, bikes)
+        self.create_bookings(all_users, tours)
+        self.create_reviews(customers, tours)
+        self.create_payments(all_users)
+        # bulk_create не отправляет сигналы - денормализованные рейтинги считаем одним UPDATE
+        Tour.recompute_review_stats()
+        recompute_guide_ratings()
+        return self.counts
+
+    def create_bike_statuses(self):
+        existing = dict(BikeStatus.objects.values_list('status_name', 'id'))
+        missing = [name for name in BIKE_STATUSES if name not in existing]
+        self._insert('bike_statuses', BikeStatus, (BikeStatus(status_name=name) for name in missing))
+        return dict(BikeStatus.objects.values_list('status_name', 'id'))
+
+    def create_locations(self):
+        existing = set(Location.objects.values_list('name', flat=True))
+        self._insert('locations', Location, (
+            Location(name=name, address=address, latitude=lat, longitude=lng)
+            for name, address, lat, lng in LOCATIONS if name not in existing
+        ))
+        return list(Location.objects.order_by('id').values_list('id', 'name'))
+
+    def create_users(self):
+        """Пользователи; 2% администраторов, 8% гидов. Возвращает [(id, роль)]."""
+        rng = self._random(1)
+        password = make_password(self.password)
+        after_id = self._max_id(User)
+
+        def rows():
+            for i in range(self.profile.users):
+                gender = rng.choice(['Мужской', 'Женский'])
+                first_name = rng.choice(FIRST_NAMES_MALE if gender == 'Мужской' else FIRST_NAMES_FEMALE)
+                last_name = rng.choice(LAST_NAMES)
+                if gender == 'Женский':
+                    last_name += 'а'
+                username = f"{first_name.lower()}_{last_name.lower()}_{i}"
+                rand = rng.random()
+                role = 'Администратор' if rand < 0.02 else 'Гид' if rand < 0.1 else 'Пользователь'
+                yield User(
+                    username=username,
+                    email=f"{username}@example.com",
+                    first_name=first_name,
+                    last_name=last_name,
+                    gender=gender,
+                    date_of_birth=(self.anchor - datetime.timedelta(days=rng.randint(18 * 365, 70 * 365))).date(),
+                    role=role,
+                    password=password,
+                )
+
+        self._insert('users', User, rows())
+        return self._new_ids(User, after_id, 'role')
+
+    def create_guides(self, users):
+        rng = self._random(2)
+        guide_users = [user_id for user_id, role in users if role == 'Гид']
+        if not guide_users and users:
+            guide_users = [users[0][0]]
+        after_id = self._max_id(Guide)
+        self._insert('guides', Guide, (
+            Guide(
+                user_id=user_id,
+                experience=rng.randint(1, 20),
+                languages=', '.join(rng.sample(LANGUAGES, rng.randint(1, 3))),
+            )
+            for user_id in guide_users
+        ))
+        return self._new_ids(Guide, after_id)
+
+    def create_bikes(self, statuses, locations):
+        rng = self._random(3)
+        status_ids = [statuses[name] for name in BIKE_STATUSES]
+        after_id = self._max_id(Bike)
+
+        def rows():
+            for _ in range(self.profile.bikes):
+                bike_type = rng.choice(['standard', 'electric'])
+                if bike_type == 'standard':
+                    price_hour, price_day = round(rng.uniform(5, 15), 2), round(rng.uniform(30, 70), 2)
+                else:
+                    price_hour, price_day = round(rng.uniform(10, 25), 2), round(rng.uniform(50, 100), 2)
+                location_id, location_name = rng.choice(locations)
+                yield Bike(
+                    type=bike_type,
+                    # Большая часть парка доступна, как в реальном прокате
+                    status_id=rng.choices(status_ids, weights=[70, 15, 10, 5])[0],
+                    rental_price_hour=price_hour,
+                    rental_price_day=price_day,
+                    location_id=location_id,
+                    # bulk_create не вызывает Bike.save()
+                    search_text=Bike.build_search_text(bike_type, location_name),
+                )
+
+        self._insert('bikes', Bike, rows())
+        return self._new_ids(Bike, after_id, 'rental_price_hour', 'rental_price_day')
+
+    def create_tours(self, locations):
+        rng = self._random(4)
+        location_names = [name for _, name in locations]
+        after_id = self._max_id(Tour)
+
+        def rows():
+            for i in range(self.profile.tours):
+                duration = rng.choice(TOUR_DURATIONS)
+                yield Tour(
+                    name=f"{rng.choice(TOUR_NAMES)} {i + 1}",
+                    description=rng.choice(TOUR_DESCRIPTIONS),
+                    duration=duration,
+                    price=round(duration * rng.uniform(10, 25), 2),
+                    location=rng.choice(location_names),
+                    is_active=rng.random() < 0.9,
+                    created_at=self.anchor - datetime.timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60)),
+                )
+
+        self._insert('tours', Tour, rows())
+        return self._new_ids(Tour, after_id)
+
+    def assign_guides(self, tours, guides):
+        rng = self._random(5)
+        if not guides:
+            return
+        self._insert('guide_tours', GuideTour, (
+            GuideTour(guide_id=guide_id, tour_id=tour_id)
+            for tour_id in tours
+            for guide_id in rng.sample(guides, min(len(guides), rng.randint(1, 3)))
+        ))
+
+    def create_slots(self, tours, guides):
+        """Свободные слоты на ближайшие slot_days дней: по гиду на тур, время из SLOT_TIMES."""
+        rng = self._random(6)
+        if not guides:
+            return
+        tz = timezone.get_current_timezone()
+        days = [(self.anchor + datetime.timedelta(days=day)).date() for day in range(1, self.profile.slot_days + 1)]
+        self._insert('slots', Slot, (
+            Slot(tour_id=tour_id, guide_id=guide_id, datetime=timezone.make_aware(datetime.datetime.combine(day, at), tz))
+            for tour_id in tours
+            for guide_id in [rng.choice(guides)]
+            for day in days
+            for at in SLOT_TIMES
+        ))
+
+    def create_rentals(self, users, bikes):
+        """Аренды за последние два года; дороже 6 часов - по дневному тарифу."""
+        rng = self._random(7)
+        if not users or not bikes:
+            return
+
+        def rows():
+            for _ in range(self.profile.rentals):
+                bike_id, price_hour, price_day = rng.choice(bikes)
+                start_time = self.anchor - datetime.timedelta(minutes=rng.randint(60, 2 * 365 * 24 * 60))
+                hours = rng.randint(1, 24)
+                yield Rental(
+                    user_id=rng.choice(users),
+                    bike_id=bike_id,
+                    start_time=start_time,
+                    end_time=start_time + datetime.timedelta(hours=hours),
+                    total_price=price_day if hours > 6 else round(price_hour * hours, 2),
+                )
+
+        self._insert('rentals', Rental, rows())
+
+    def create_bookings(self, users, tours):
+        """Бронирования: прошедшие за год и будущие на 60 дней вперёд."""
+        rng = self._random(8)
+        if not users or not tours:
+            return
+        prices = dict(Tour.objects.filter(id__gt=min(tours) - 1).values_list('id', 'price'))
+
+        def rows():
+            for _ in range(self.profile.bookings):
+                tour_id = rng.choice(tours)
+                yield Booking(
+                    user_id=rng.choice(users),
+                    tour_id=tour_id,
+                    date=self.anchor + datetime.timedelta(hours=rng.randint(-365 * 24, 60 * 24)),
+                    total_price=float(prices[tour_id]),
+                )
+
+        self._insert('bookings', Booking, rows())
+
+    def create_reviews(self, users, tours):
+        rng = self._random(9)
+        if not users or not tours:
+            return
+        self._insert('reviews', Review, (
+            Review(
+                user_id=rng.choice(users),
+                tour_id=rng.choice(tours),
+                rating=rng.choices(range(1, 6), weights=RATING_WEIGHTS)[0],
+                comment=rng.choice(COMMENTS),
+            )
+            for _ in range(self.profile.reviews)
+        ))
+
+    def create_payments(self, users):
+        rng = self._random(10)
+        if not users:
+            return
+        self._insert('payments', Payment, (
+            Payment(
+                user_id=rng.choice(users),
+                amount=round(rng.uniform(10, 500), 2),
+                payment_method=rng.choice(PAYMENT_METHODS),
+                status=rng.choices(['pending', 'completed', 'failed'], weights=[10, 85, 5])[0],
+            )
+            for _ in range(self.profile.payments)
+        ))
@@ -0,0 +1,72 @@
+"""
+Планы запросов для вьюх: выполняет страницу тестовым клиентом, записывает SQL
+и прогоняет каждый SELECT через EXPLAIN QUERY PLAN (SQLite) или EXPLAIN (PostgreSQL).
+Полные сканирования горячих таблиц считаются регрессией индексов.
+"""
+from dataclasses import dataclass, field
+
+from django.db import connection
+
+from .middleware import QueryRecorder
+
+# Таблицы, которые не должны читаться полным сканированием на перечисленных вьюхах
+# (см. Meta.indexes в models.py)
+EXPLAIN_EXPECTATIONS = {
+    'tour_list': ['main_tour'],
+    'tour_detail': ['main_slot', 'main_booking'],
+    'profile': ['main_booking'],
+    'rental_list': ['main_rental'],
+}
+
+
+@dataclass
+class StatementPlan:
+    """SQL-запрос и его план."""
+    sql: str
+    plan: list
+    full_scans: list = field(default_factory=list)
+
+
+def explain_statement(sql, params, using=connection):
+    """Возвращает план запроса строками (формат зависит от СУБД)."""
+    with using.cursor() as cursor:
+        if using.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def find_full_scans(plan, tables, vendor=None):
+    """Таблицы из tables, которые план читает целиком (без индекса)."""
+    vendor = vendor or connection.vendor
+    scans = []
+    for line in plan:
+        for table in tables:
+            if vendor == 'sqlite':
+                # "SCAN main_tour" - полный проход; "SCAN main_tour USING INDEX ..." - по индексу
+                words = line.split()
+                if words[:2] == ['SCAN', table] and 'USING' not in words:
+                    scans.append(table)
+            elif f'Seq Scan on {table} ' in f'{line} ':
+                scans.append(table)
+    return scans
+
+
+def explain_request(client, url, tables=()):
+    """
+    Выполняет GET-запрос и возвращает (response, [StatementPlan, ...]) для всех SELECT.
+    Ошибки вьюхи не прерывают разбор: планы собираются по выполненным до ошибки запросам.
+    """
+    recorder = QueryRecorder()
+    with recorder.record():
+        response = client.get(url)
+    plans = []
+    seen = set()
+    for sql, params in zip(recorder.statements, recorder.params):
+        if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+            continue
+        seen.add(sql)
+        plan = explain_statement(sql, params)
+        plans.append(StatementPlan(sql, plan, find_full_scans(plan, tables)))
+    return response, plans
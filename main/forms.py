@@ -2,8 +2,10 @@
 Формы для bike tours: регистрация, бронирование, отзывы и т.д.
 """
 from django import forms
+from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm
 from .models import Tour, Review, User, Booking, Guide, GuideTour, Slot, Rental, BikeStatus, Bike
+from .availability import conflict_message, rental_conflict
 
 class TourForm(forms.ModelForm):
     """Форма для создания или обновления тура."""
@@ -82,8 +84,20 @@ class BookingForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         tour = kwargs.pop('tour', None)
         super().__init__(*args, **kwargs)
+        self.available_slots = []
         if tour:
-            self.fields['slot'].queryset = Slot.objects.filter(tour=tour, is_booked=False).order_by('datetime')
+            field = self.fields['slot']
+            # Только будущие слоты активного тура - остальные book_slot() всё равно не захватит.
+            # select_related: Slot.__str__ обращается к туру и пользователю гида
+            field.queryset = Slot.objects.filter(
+                tour=tour, tour__is_active=True, is_booked=False, datetime__gt=timezone.now(),
+            ).select_related(
+                'tour', 'guide__user'
+            ).order_by('datetime')
+            # Варианты выбора строятся из уже загруженных слотов: проверка «есть ли слоты» в
+            # шаблоне и сам <select> обходятся одним запросом
+            self.available_slots = list(field.queryset)
+            field.choices = [('', field.empty_label), *((slot.pk, str(slot)) for slot in self.available_slots)]
 
 class SlotForm(forms.ModelForm):
     """Форма для создания или обновления слота."""
@@ -96,6 +110,17 @@ class SlotForm(forms.ModelForm):
             'datetime': forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'}),
         }
 
+    def clean(self):
+        """Проверяет уникальность (тур, гид, время): tour не входит в поля формы, поэтому ограничение БД здесь не проверяется."""
+        cleaned_data = super().clean()
+        guide = cleaned_data.get('guide')
+        slot_datetime = cleaned_data.get('datetime')
+        if self.instance.tour_id and guide and slot_datetime:
+            duplicates = Slot.objects.filter(tour_id=self.instance.tour_id, guide=guide, datetime=slot_datetime)
+            if duplicates.exclude(pk=self.instance.pk).exists():
+                raise forms.ValidationError('У этого гида уже есть слот на это время.')
+        return cleaned_data
+
 class RentalForm(forms.ModelForm):
     """Форма для создания или обновления аренды велосипеда."""
     class Meta:
@@ -125,6 +150,10 @@ class RentalForm(forms.ModelForm):
             duration_hours = (end_time - start_time).total_seconds() / 3600
             if duration_hours <= 0:
                 raise forms.ValidationError('Время окончания должно быть позже времени начала.')
+            # Пересечение с другими арендами и турами этого велосипеда (при правке - кроме самой аренды)
+            conflict = rental_conflict(bike.pk, start_time, end_time, exclude_rental=self.instance.pk)
+            if conflict:
+                raise forms.ValidationError(conflict_message(conflict))
             # Если аренда больше 6 часов, считать как день
             if duration_hours > 6:
                 cleaned_data['total_price'] = bike.rental_price_day
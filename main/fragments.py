@@ -0,0 +1,97 @@
+"""
+Кэш HTML-фрагментов карточек: карточка тура и строка гида рендерятся один раз и
+хранятся в кэше Django под ключом от объекта и его версии. Страница собирает
+все карточки одним cache.get_many и рендерит только отсутствующие (тег
+render_fragments в main/templatetags/fragment_tags.py).
+
+Версия объекта:
+    tour  - Tour.updated_at (auto_now; массовые update() полей карточки и запись
+            миниатюр тоже сдвигают его, см. main/tasks.py и main/thumbnails.py);
+    guide - хэш показанных полей строки: рейтинг гида меняется UPDATE без сигналов.
+
+В ключ входит хэш исходника шаблона фрагмента - после изменения разметки старые
+записи просто перестают читаться. Старые версии вытесняются по FRAGMENT_CACHE_TTL.
+Фрагмент не зависит от запроса и пользователя: в его контексте только сам объект.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+KEY_PREFIX = 'fragment'
+GUIDE_ROW_FIELDS = ('username', 'rating', 'experience', 'tours_count')
+
+_template_digests = {}
+
+
+def get_fragment_ttl():
+    """Время жизни фрагмента (FRAGMENT_CACHE_TTL в settings, по умолчанию сутки)."""
+    return getattr(settings, 'FRAGMENT_CACHE_TTL', 60 * 60 * 24)
+
+
+def _value(item, name):
+    """Поле объекта модели или словаря из кэшированных снимков."""
+    return item.get(name) if isinstance(item, dict) else getattr(item, name)
+
+
+def _tour_version(tour):
+    updated_at = _value(tour, 'updated_at')
+    # Словарь из снимка, собранного до появления updated_at, - без кэша
+    return updated_at.timestamp() if updated_at else None
+
+
+def _guide_version(guide):
+    shown = '|'.join(str(_value(guide, field)) for field in GUIDE_ROW_FIELDS)
+    return hashlib.md5(shown.encode()).hexdigest()[:12]
+
+
+VERSIONS = {
+    'tour': _tour_version,
+    'guide': _guide_version,
+}
+
+
+def _template(name):
+    """Шаблон фрагмента и хэш его исходника (считается один раз на процесс)."""
+    template = get_template(name)
+    digest = _template_digests.get(name)
+    if digest is None:
+        digest = hashlib.md5(f'{name}\n{template.template.source}'.encode()).hexdigest()[:12]
+        _template_digests[name] = digest
+    return template, digest
+
+
+def fragment_key(digest, kind, item):
+    """Ключ фрагмента; None - версию не определить, фрагмент не кэшируется."""
+    version = VERSIONS[kind](item)
+    if version is None:
+        return None
+    return f'{KEY_PREFIX}:{digest}:{kind}:{_value(item, "id")}:{version}'
+
+
+def render_fragments(items, template_name, kind):
+    """
+    HTML фрагментов для items в том же порядке: из кэша одним get_many,
+    недостающие рендерятся шаблоном template_name (объект в контексте под именем kind)
+    и сохраняются одним set_many.
+    """
+    items = list(items)
+    if not items:
+        return []
+    template, digest = _template(template_name)
+    keys = [fragment_key(digest, kind, item) for item in items]
+    found = cache.get_many([key for key in keys if key is not None])
+    missing = {}
+    fragments = []
+    for key, item in zip(keys, items):
+        if key is None:
+            fragments.append(template.render({kind: item}))
+            continue
+        if key not in found:
+            found[key] = missing[key] = template.render({kind: item})
+        fragments.append(found[key])
+    if missing:
+        cache.set_many(missing, get_fragment_ttl())
+    return [mark_safe(fragment) for fragment in fragments]
@@ -0,0 +1,206 @@
+"""
+Поиск ближайших локаций и доступных велосипедов по координатам.
+
+Локации держатся в памяти процесса в равномерной сетке по широте/долготе
+(ячейка GEO_GRID_CELL_DEG градусов). Запрос «в радиусе R от точки» смотрит только
+ячейки, покрывающие окрестность точки, и считает расстояние по гаверсинусу
+пачкой на ячейку, с заранее вычисленными радианами и косинусами широт. Поиск
+не обращается к БД и занимает микросекунды даже на тысячах локаций
+(см. benchmark_geo).
+
+Сетка строится из БД при первом запросе и пересобирается, когда меняется
+версия в кэше - её сдвигают сигналы Location. Так все процессы gunicorn
+видят изменения без перезапуска.
+
+Доступные велосипеды ближайших локаций выбираются по индексу внешнего ключа
+location_id - запрос на порцию локаций, от ближних к дальним.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .models import Bike, Location
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+AVAILABLE_STATUS = 'Доступен'
+VERSION_KEY = 'geo:locations:version'
+LOCATION_BATCH_SIZE = 50
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+_lock = threading.Lock()
+_index = (None, None)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Расстояние по дуге большого круга между двумя точками (градусы) в километрах."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+class GridIndex:
+    """Сетка точек (id, широта, долгота) для поиска в радиусе; не меняется после построения."""
+
+    def __init__(self, points, cell_deg=None):
+        self.cell_deg = cell_deg or getattr(settings, 'GEO_GRID_CELL_DEG', 0.05)
+        self.rows = math.ceil(180 / self.cell_deg)
+        self.columns = math.ceil(360 / self.cell_deg)
+        cells = defaultdict(list)
+        for pk, lat, lng in points:
+            lat_rad = math.radians(lat)
+            cells[self._cell(lat, lng)].append((pk, lat_rad, math.radians(lng), math.cos(lat_rad)))
+        self.cells = dict(cells)
+        self.size = sum(len(bucket) for bucket in self.cells.values())
+
+    def _cell(self, lat, lng):
+        row = min(self.rows - 1, max(0, math.floor((lat + 90) / self.cell_deg)))
+        return row, math.floor((lng + 180) / self.cell_deg) % self.columns
+
+    def _buckets(self, lat, lng, radius_km):
+        """Ячейки, покрывающие круг радиуса radius_km (с запасом по долготе у полюсов и через 180-й меридиан)."""
+        lat_span = radius_km / KM_PER_DEGREE
+        first_row, _ = self._cell(max(-90.0, lat - lat_span), lng)
+        last_row, _ = self._cell(min(90.0, lat + lat_span), lng)
+        # Градус долготы короче всего на самой далёкой от экватора широте окрестности
+        cos_min = math.cos(math.radians(min(90.0, abs(lat) + lat_span)))
+        lng_span = lat_span / cos_min if cos_min > 1e-9 else 360.0
+        if lng_span >= 180:
+            columns = range(self.columns)
+        else:
+            first_column = math.floor((lng - lng_span + 180) / self.cell_deg)
+            last_column = math.floor((lng + lng_span + 180) / self.cell_deg)
+            columns = {column % self.columns for column in range(first_column, last_column + 1)}
+        cells = self.cells
+        for row in range(first_row, last_row + 1):
+            for column in columns:
+                bucket = cells.get((row, column))
+                if bucket:
+                    yield bucket
+
+    def within(self, lat, lng, radius_km, limit=None):
+        """[(расстояние_км, id)] точек в радиусе, от ближней к дальней."""
+        lat1, lng1 = math.radians(lat), math.radians(lng)
+        cos1 = math.cos(lat1)
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        diameter = 2 * EARTH_RADIUS_KM
+        found = []
+        for bucket in self._buckets(lat, lng, radius_km):
+            # Гаверсинус пачкой по ячейке
+            distances = [
+                (diameter * asin(sqrt(min(1.0, sin((lat2 - lat1) / 2) ** 2 + cos1 * cos2 * sin((lng2 - lng1) / 2) ** 2))), pk)
+                for pk, lat2, lng2, cos2 in bucket
+            ]
+            found.extend(item for item in distances if item[0] <= radius_km)
+        found.sort()
+        return found[:limit] if limit else found
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = int(time.time() * 1000)
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def get_location_index():
+    """Сетка локаций текущей версии; при смене версии пересобирается из БД."""
+    global _index
+    version = _current_version()
+    cached_version, index = _index
+    if cached_version == version and index is not None:
+        return index
+    with _lock:
+        cached_version, index = _index
+        if cached_version != version or index is None:
+            index = GridIndex(Location.objects.values_list('pk', 'latitude', 'longitude'))
+            _index = (version, index)
+    return index
+
+
+def invalidate_location_index():
+    """Локации изменились: все процессы пересоберут сетку при следующем поиске."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def parse_nearby_params(params):
+    """
+    lat, lng, radius (км), limit из GET-параметров -> (lat, lng, radius_km, limit).
+    ValueError с текстом для клиента, если параметры неверны.
+    """
+    try:
+        lat, lng = float(params['lat']), float(params['lng'])
+    except KeyError:
+        raise ValueError('Укажите lat и lng')
+    except (TypeError, ValueError):
+        raise ValueError('lat и lng должны быть числами')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Координаты вне допустимого диапазона')
+    try:
+        radius_km = float(params.get('radius') or DEFAULT_RADIUS_KM)
+        limit = int(params.get('limit') or DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        raise ValueError('radius и limit должны быть числами')
+    if not (0 < radius_km <= MAX_RADIUS_KM):
+        raise ValueError(f'radius - от 0 до {MAX_RADIUS_KM:g} км')
+    if not (0 < limit <= MAX_LIMIT):
+        raise ValueError(f'limit - от 1 до {MAX_LIMIT}')
+    return lat, lng, radius_km, limit
+
+
+def nearest_locations(lat, lng, radius_km, limit=None):
+    """[(расстояние_км, id локации)] в радиусе, от ближней к дальней."""
+    return get_location_index().within(lat, lng, radius_km, limit)
+
+
+def nearby_available_bikes(lat, lng, radius_km, limit):
+    """
+    Доступные велосипеды в радиусе: [(расстояние_км, велосипед)] от ближнего к дальнему
+    (в одной локации - по id). Локации берутся из сетки порциями от ближних, пока
+    не наберётся limit велосипедов - дальние локации в БД не запрашиваются.
+    """
+    locations = nearest_locations(lat, lng, radius_km)
+    found = []
+    for start in range(0, len(locations), LOCATION_BATCH_SIZE):
+        batch = locations[start:start + LOCATION_BATCH_SIZE]
+        distances = {pk: distance for distance, pk in batch}
+        # Порядок по расстоянию задаёт номер локации в порции - сортировка и LIMIT в БД,
+        # у локации с тысячами велосипедов не читаются лишние строки
+        rank = Case(
+            *(When(location_id=pk, then=Value(position)) for position, (_, pk) in enumerate(batch)),
+            output_field=IntegerField(),
+        )
+        bikes = (
+            Bike.objects.filter(location_id__in=distances, status__status_name=AVAILABLE_STATUS)
+            .select_related('location', 'status').order_by(rank, 'id')[:limit - len(found)]
+        )
+        found.extend((distances[bike.location_id], bike) for bike in bikes)
+        if len(found) >= limit:
+            break
+    return found
+
+
+def nearby_locations(lat, lng, radius_km, limit):
+    """[(расстояние_км, локация, число доступных велосипедов)] от ближней к дальней - два запроса."""
+    nearest = nearest_locations(lat, lng, radius_km, limit)
+    ids = [pk for _, pk in nearest]
+    locations = Location.objects.in_bulk(ids)
+    available = dict(
+        Bike.objects.filter(location_id__in=ids, status__status_name=AVAILABLE_STATUS)
+        .order_by().values('location_id').annotate(count=Count('id')).values_list('location_id', 'count')
+    )
+    # Локацию могли удалить после построения сетки
+    return [(distance, locations[pk], available.get(pk, 0)) for distance, pk in nearest if pk in locations]
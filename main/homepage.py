@@ -0,0 +1,144 @@
+"""
+Снимок данных главной страницы: блоки index собираются несколькими короткими запросами
+и хранятся в кэше одним документом, поэтому обычный заход на главную не обращается к БД.
+
+Изменения данных снимок не удаляют, а только помечают устаревшим: его пересобирает
+один запрос, взявший блокировку (cache.add), остальные до этого получают прежний
+снимок. Команда refresh_homepage_snapshot обновляет снимок на месте по расписанию.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Booking, Guide, GuideTour, Tour
+
+SNAPSHOT_CACHE_KEY = 'homepage:snapshot'
+SNAPSHOT_STALE_KEY = 'homepage:snapshot:stale'
+SNAPSHOT_LOCK_KEY = 'homepage:snapshot:lock'
+# Сколько секунд держится блокировка пересборки, если собиравший процесс упал
+SNAPSHOT_LOCK_TIMEOUT = 30
+
+# Сколько элементов показывать в каждом блоке главной страницы
+TOP_PRICE_TOURS_LIMIT = 3
+BEST_GUIDES_LIMIT = 5
+LATEST_BOOKINGS_LIMIT = 5
+
+
+def get_snapshot_ttl():
+    """Время жизни снимка в секундах (HOMEPAGE_SNAPSHOT_TTL в settings, по умолчанию 5 минут)."""
+    return getattr(settings, 'HOMEPAGE_SNAPSHOT_TTL', 300)
+
+
+def _tour_data(tour):
+    return {
+        'id': tour.id,
+        'name': tour.name,
+        'location': tour.location,
+        'price': tour.price,
+        'duration': tour.duration,
+        'avg_rating': tour.avg_rating,
+        'review_count': tour.review_count,
+        'image_url': tour.image.url if tour.image else None,
+        'image_thumbnails': tour.image_thumbnails,
+        # Версия карточки в кэше фрагментов (main/fragments.py)
+        'updated_at': tour.updated_at,
+    }
+
+
+def _guide_data(guide):
+    return {
+        'id': guide.id,
+        'username': guide.user.username,
+        'rating': guide.rating,
+        'experience': guide.experience,
+        'tours_count': guide.tours_count,
+    }
+
+
+def _build_tour_blocks():
+    """
+    Два запроса: счётчики - одним агрегатом, самые дорогие туры - ORDER BY price DESC
+    LIMIT по индексу tour_price_idx.
+    """
+    stats = Tour.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        reviews=Sum('review_count'),
+    )
+    top_price_tours = Tour.objects.order_by('-price', 'id')[:TOP_PRICE_TOURS_LIMIT]
+    return {
+        'total_tours_count': stats['total'],
+        'active_tours_count': stats['active'],
+        'total_reviews_count': stats['reviews'] or 0,
+        'top_price_tours': [_tour_data(tour) for tour in top_price_tours],
+    }
+
+
+def _build_guide_blocks():
+    """
+    Два запроса: число гидов и лучшие гиды - ORDER BY rating DESC, id LIMIT по индексу
+    guide_rating_idx (число туров - подзапросом только для них).
+    """
+    tours_count = GuideTour.objects.filter(guide=OuterRef('pk')).order_by().values('guide').annotate(c=Count('id'))
+    best_guides = (
+        Guide.objects.select_related('user').annotate(
+            tours_count=Coalesce(Subquery(tours_count.values('c')), 0),
+        ).order_by('-rating', 'id')[:BEST_GUIDES_LIMIT]
+    )
+    return {
+        'total_guides_count': Guide.objects.count(),
+        'best_guides': [_guide_data(g) for g in best_guides],
+    }
+
+
+def build_homepage_snapshot():
+    """Собирает блоки, которые показывает index.html, за 5 запросов и возвращает их одним словарём."""
+    snapshot = {}
+    snapshot.update(_build_tour_blocks())
+    snapshot.update(_build_guide_blocks())
+    snapshot['latest_bookings'] = [
+        {
+            'tour_id': booking.tour_id,
+            'tour_name': booking.tour.name,
+            'username': booking.user.username,
+            'date': booking.date,
+            'total_price': booking.total_price,
+        }
+        for booking in Booking.objects.select_related('user', 'tour')
+        .only('tour__name', 'user__username', 'date', 'total_price')
+        .order_by('-date')[:LATEST_BOOKINGS_LIMIT]
+    ]
+    return snapshot
+
+
+def refresh_homepage_snapshot():
+    """Пересобирает снимок и кладёт его в кэш (для планировщика/команды управления)."""
+    # Отметку снимаем до сборки: изменение во время сборки снова пометит снимок устаревшим
+    cache.delete(SNAPSHOT_STALE_KEY)
+    snapshot = build_homepage_snapshot()
+    cache.set(SNAPSHOT_CACHE_KEY, snapshot, get_snapshot_ttl())
+    return snapshot
+
+
+def get_homepage_snapshot():
+    """
+    Возвращает снимок из кэша. Устаревший или отсутствующий снимок пересобирает
+    только запрос, получивший блокировку; остальные отдают прежний снимок, а без
+    него собирают свой, не записывая в кэш.
+    """
+    cached = cache.get_many([SNAPSHOT_CACHE_KEY, SNAPSHOT_STALE_KEY])
+    snapshot = cached.get(SNAPSHOT_CACHE_KEY)
+    if snapshot is not None and SNAPSHOT_STALE_KEY not in cached:
+        return snapshot
+    if cache.add(SNAPSHOT_LOCK_KEY, True, SNAPSHOT_LOCK_TIMEOUT):
+        try:
+            return refresh_homepage_snapshot()
+        finally:
+            cache.delete(SNAPSHOT_LOCK_KEY)
+    return snapshot if snapshot is not None else build_homepage_snapshot()
+
+
+def invalidate_homepage_snapshot():
+    """Помечает снимок устаревшим; его пересоберёт следующий запрос главной страницы."""
+    cache.set(SNAPSHOT_STALE_KEY, True, get_snapshot_ttl())
@@ -0,0 +1,378 @@
+"""
+Массовый импорт велосипедов, туров и аренд из CSV/NDJSON.
+
+Файл читается порциями; для каждой порции справочники (статусы, локации,
+пользователи, велосипеды) подгружаются одним запросом на справочник и кэшируются
+в словарях, строки проверяются в памяти и пишутся одним bulk_create в отдельной
+транзакции. Ошибочные строки пропускаются и попадают в отчёт с номером строки.
+
+С --create-missing неизвестные записи справочников (статусы, локации,
+пользователи) собираются при проверке строк и создаются в той же транзакции,
+что и строки порции. Пробный прогон (--dry-run) ничего не пишет: будущие записи
+справочников только запоминаются, чтобы следующие строки с ними проходили проверку.
+
+bulk_create не вызывает save() и не отправляет сигналы: нормализация из save()
+(обрезка названия тура, неотрицательная цена, текст для поиска велосипеда) повторена здесь,
+кэши главной и страниц туров сбрасываются после импорта.
+"""
+import csv
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .geo import invalidate_location_index
+from .homepage import invalidate_homepage_snapshot
+from .models import Bike, BikeStatus, Location, Rental, Tour, User
+from .tour_cache import invalidate_all_tour_details
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 50
+# BooleanField.to_python понимает только 't'/'True'/'1' - выгрузки таблиц пишут иначе
+TRUE_VALUES = {'true': True, 'yes': True, 'да': True, 'false': False, 'no': False, 'нет': False}
+
+
+class RowError(ValueError):
+    """Строку нельзя импортировать; текст - причина для отчёта."""
+
+
+@dataclass
+class ImportStats:
+    """Итоги импорта."""
+    read: int = 0
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def read_rows(stream, fmt):
+    """Строки файла как (номер строки, словарь). fmt - 'csv' или 'ndjson'."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            row = {'__error__': f'неверный JSON: {exc.msg}'}
+        yield line_number, row
+
+
+def open_source(path):
+    """Файл по пути ('-' - stdin) в текстовом режиме; BOM от Excel пропускается."""
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+    return open(path, encoding='utf-8-sig', newline='')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+class BaseImporter:
+    """Общий конвейер: порции -> справочники -> проверка строк -> bulk_create."""
+    model = None
+
+    def __init__(self, create_missing=False):
+        self.create_missing = create_missing
+        self.dry_run = False
+        # get_current_timezone() на каждое значение заметно тормозит разбор дат
+        self.timezone = timezone.get_current_timezone()
+        self._fields = {}
+
+    # --- разбор значений -------------------------------------------------
+
+    def value(self, row, name, required=True):
+        raw = row.get(name)
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            if required:
+                raise RowError(f'не заполнено поле "{name}"')
+            return None
+        return raw.strip() if isinstance(raw, str) else raw
+
+    def _field(self, name):
+        """Поле модели и множество допустимых значений choices (кэшируются на импорт)."""
+        if name not in self._fields:
+            model_field = self.model._meta.get_field(name)
+            choices = {choice for choice, _ in model_field.flatchoices} if model_field.choices else None
+            self._fields[name] = model_field, choices
+        return self._fields[name]
+
+    def convert(self, row, name, required=True):
+        """Значение через to_python() поля модели (числа, даты, выбор из choices)."""
+        raw = self.value(row, name, required)
+        if raw is None:
+            return None
+        model_field, choices = self._field(name)
+        if isinstance(raw, str) and model_field.get_internal_type() == 'BooleanField':
+            raw = TRUE_VALUES.get(raw.lower(), raw)
+        try:
+            converted = model_field.to_python(raw)
+        except ValidationError as exc:
+            raise RowError(f'{name}: {"; ".join(exc.messages)}')
+        if choices and converted not in choices:
+            raise RowError(f'{name}: недопустимое значение "{raw}"')
+        if isinstance(converted, datetime) and timezone.is_naive(converted):
+            converted = timezone.make_aware(converted, self.timezone)
+        return converted
+
+    def non_negative(self, row, name, required=True):
+        converted = self.convert(row, name, required)
+        if converted is not None and converted < 0:
+            raise RowError(f'{name}: значение не может быть отрицательным')
+        return converted
+
+    def coordinate(self, row, name, limit):
+        """Широта/долгота в пределах [-limit, limit]; пустое значение - 0."""
+        raw = self.value(row, name, required=False)
+        try:
+            converted = float(raw) if raw is not None else 0.0
+        except (TypeError, ValueError):
+            raise RowError(f'{name}: "{raw}" не число')
+        if not -limit <= converted <= limit:
+            raise RowError(f'{name}: значение должно быть от -{limit} до {limit}')
+        return converted
+
+    # --- конвейер --------------------------------------------------------
+
+    def prepare(self, rows):
+        """Подгружает справочники для порции строк (один запрос на справочник); ничего не пишет."""
+
+    def build(self, row):
+        """Экземпляр модели из строки или RowError."""
+        raise NotImplementedError
+
+    def save_lookups(self):
+        """Создаёт записи справочников, собранные build() для порции (внутри её транзакции)."""
+
+    def after_import(self, stats):
+        """Сброс кэшей после записи."""
+        invalidate_homepage_snapshot()
+
+    def run(self, rows, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, max_errors=None, progress=None):
+        self.dry_run = dry_run
+        stats = ImportStats()
+        started = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            stats.read += len(batch)
+            self.prepare([row for _, row in batch if '__error__' not in row])
+            objects = []
+            for line, row in batch:
+                try:
+                    if '__error__' in row:
+                        raise RowError(row['__error__'])
+                    objects.append(self.build(row))
+                except RowError as exc:
+                    stats.add_error(line, str(exc))
+            if max_errors is not None and stats.skipped > max_errors:
+                raise RowError(f'Слишком много ошибок ({stats.skipped}), импорт остановлен')
+            if objects and not dry_run:
+                with transaction.atomic():
+                    self.save_lookups()
+                    self.model.objects.bulk_create(objects, batch_size=batch_size)
+            stats.created += 0 if dry_run else len(objects)
+            stats.elapsed = time.perf_counter() - started
+            if progress:
+                progress(stats)
+        stats.elapsed = time.perf_counter() - started
+        if stats.created:
+            self.after_import(stats)
+        return stats
+
+
+class BikeImporter(BaseImporter):
+    """
+    Колонки: type, status, location, rental_price_hour, rental_price_day.
+    Статус и локация задаются названием; с --create-missing неизвестные создаются
+    (для локации можно передать location_address, latitude, longitude).
+    """
+    model = Bike
+
+    def __init__(self, create_missing=False):
+        super().__init__(create_missing)
+        self.statuses = dict(BikeStatus.objects.values_list('status_name', 'id'))
+        self.locations = dict(Location.objects.values_list('name', 'id'))
+        # Ещё не созданные статусы и локации по названию
+        self.new_statuses = {}
+        self.new_locations = {}
+
+    def _new_location(self, row, name):
+        """Несохранённая локация из колонок строки (координаты проверяются здесь)."""
+        return Location(
+            name=name,
+            address=self.value(row, 'location_address', required=False) or '',
+            latitude=self.coordinate(row, 'latitude', 90),
+            longitude=self.coordinate(row, 'longitude', 180),
+        )
+
+    def build(self, row):
+        status_name = self.value(row, 'status')
+        location_name = self.value(row, 'location')
+        status = None
+        if status_name not in self.statuses:
+            if not self.create_missing:
+                raise RowError(f'неизвестный статус "{status_name}"')
+            status = self.new_statuses.get(status_name) or BikeStatus(status_name=status_name)
+        location = None
+        if location_name not in self.locations:
+            if not self.create_missing:
+                raise RowError(f'неизвестная локация "{location_name}"')
+            location = self.new_locations.get(location_name) or self._new_location(row, location_name)
+        bike_type = self.convert(row, 'type')
+        bike = Bike(
+            type=bike_type,
+            status_id=self.statuses.get(status_name),
+            location_id=self.locations.get(location_name),
+            search_text=Bike.build_search_text(bike_type, location_name),
+            rental_price_hour=self.non_negative(row, 'rental_price_hour'),
+            rental_price_day=self.non_negative(row, 'rental_price_day'),
+        )
+        # Новые записи справочников запоминаются, только когда вся строка прошла проверку;
+        # id им проставит bulk_create перед записью велосипедов
+        if status is not None:
+            bike.status = self.new_statuses.setdefault(status_name, status)
+        if location is not None:
+            bike.location = self.new_locations.setdefault(location_name, location)
+        return bike
+
+    def save_lookups(self):
+        if self.new_statuses:
+            created = BikeStatus.objects.bulk_create(self.new_statuses.values())
+            self.statuses.update({status.status_name: status.id for status in created})
+            self.new_statuses = {}
+        if self.new_locations:
+            created = Location.objects.bulk_create(self.new_locations.values())
+            self.locations.update({location.name: location.id for location in created})
+            self.new_locations = {}
+            invalidate_location_index()
+
+
+class TourImporter(BaseImporter):
+    """
+    Колонки: name, description, duration, price, location; необязательные -
+    is_active, start_time, created_at. Туры с уже существующим названием пропускаются.
+    """
+    model = Tour
+
+    def __init__(self, create_missing=False):
+        super().__init__(create_missing)
+        self.names = set(Tour.objects.values_list('name', flat=True))
+
+    def build(self, row):
+        name = self.value(row, 'name')
+        if name in self.names:
+            raise RowError(f'тур "{name}" уже существует')
+        is_active = self.convert(row, 'is_active', required=False)
+        tour = Tour(
+            name=name,
+            description=self.value(row, 'description'),
+            duration=self.convert(row, 'duration'),
+            price=self.non_negative(row, 'price'),
+            location=self.value(row, 'location'),
+            is_active=True if is_active is None else is_active,
+            start_time=self.convert(row, 'start_time', required=False),
+            created_at=self.convert(row, 'created_at', required=False) or timezone.now(),
+        )
+        self.names.add(name)
+        return tour
+
+    def after_import(self, stats):
+        super().after_import(stats)
+        invalidate_all_tour_details()
+
+
+class RentalImporter(BaseImporter):
+    """
+    Колонки: user (username), bike (id, может быть пустым), start_time, end_time,
+    total_price. С --create-missing неизвестные пользователи создаются без пароля.
+    """
+    model = Rental
+
+    def __init__(self, create_missing=False):
+        super().__init__(create_missing)
+        # Пользователей и велосипедов может быть много - загружаем только упомянутых в порции
+        self.users = {}
+        self.bikes = set()
+        # Ещё не созданные пользователи по имени
+        self.new_users = {}
+
+    def prepare(self, rows):
+        usernames = {str(row.get('user', '')).strip() for row in rows} - set(self.users) - set(self.new_users) - {''}
+        if usernames:
+            self.users.update(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        bike_ids = set()
+        for row in rows:
+            try:
+                bike_ids.add(int(row.get('bike') or 0))
+            except (TypeError, ValueError):
+                continue
+        bike_ids -= self.bikes | {0}
+        if bike_ids:
+            self.bikes.update(Bike.objects.filter(id__in=bike_ids).values_list('id', flat=True))
+
+    def build(self, row):
+        username = self.value(row, 'user')
+        if username not in self.users and not self.create_missing:
+            raise RowError(f'неизвестный пользователь "{username}"')
+        bike_id = self.convert(row, 'bike', required=False)
+        if bike_id is not None and bike_id not in self.bikes:
+            raise RowError(f'неизвестный велосипед {bike_id}')
+        start_time = self.convert(row, 'start_time')
+        end_time = self.convert(row, 'end_time')
+        if end_time <= start_time:
+            raise RowError('end_time должно быть позже start_time')
+        rental = Rental(
+            user_id=self.users.get(username),
+            bike_id=bike_id,
+            start_time=start_time,
+            end_time=end_time,
+            total_price=self.non_negative(row, 'total_price'),
+        )
+        if username not in self.users:
+            if username not in self.new_users:
+                # Пароль не задаётся: make_password(None) не считает хэш, пользователь сможет
+                # восстановить пароль. Хэширование десятков тысяч паролей заняло бы минуты.
+                self.new_users[username] = User(username=username, password=make_password(None), role='Пользователь')
+            rental.user = self.new_users[username]
+        return rental
+
+    def save_lookups(self):
+        if self.new_users:
+            created = User.objects.bulk_create(self.new_users.values())
+            self.users.update({user.username: user.id for user in created})
+            self.new_users = {}
+
+
+IMPORTERS = {
+    'bikes': BikeImporter,
+    'tours': TourImporter,
+    'rentals': RentalImporter,
+}
@@ -0,0 +1,113 @@
+import json
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from main.booking import book_slot
+from main.models import Booking, Guide, Rental, Slot, Tour, User
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк пропускной способности бронирования: потоки параллельно бронируют разные слоты. '
+        'Запускайте с DJANGO_DB_ENGINE=postgres или sqlite (DJANGO_SQLITE_TUNING=0 - без PRAGMA)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Количество параллельных потоков')
+        parser.add_argument('--per-thread', type=int, default=50, help='Бронирований на поток')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        threads_count = options['threads']
+        per_thread = options['per_thread']
+        tour = Tour.objects.filter(is_active=True).first()
+        guide = Guide.objects.first()
+        users = list(User.objects.filter(role='Пользователь')[:threads_count])
+        if not tour or not guide or not users:
+            raise CommandError('Нужны хотя бы один активный тур, гид и пользователь (запустите populate_db)')
+
+        # Отдельное окно далеко в будущем, чтобы не пересекаться с реальными слотами
+        base_time = timezone.now().replace(microsecond=0) + timedelta(days=3650)
+        slots = Slot.objects.bulk_create([
+            Slot(tour=tour, guide=guide, datetime=base_time + timedelta(minutes=i))
+            for i in range(threads_count * per_thread)
+        ])
+        slot_ids = list(Slot.objects.filter(
+            tour=tour, guide=guide, datetime__gte=base_time, is_booked=False,
+        ).order_by('datetime').values_list('pk', flat=True))
+        try:
+            result = self._run(slot_ids, users, threads_count, per_thread)
+        finally:
+            window = (base_time, base_time + timedelta(minutes=len(slots)))
+            with transaction.atomic():
+                Booking.objects.filter(tour=tour, date__range=window).delete()
+                Rental.objects.filter(start_time__range=window, user__in=users).delete()
+                Slot.objects.filter(tour=tour, guide=guide, datetime__range=window).delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False))
+        else:
+            for key, value in result.items():
+                self.stdout.write(f'{key:>16}: {value}')
+        if result['errors'] or result['booked'] != len(slot_ids):
+            raise CommandError('Часть бронирований не удалась')
+
+    def _run(self, slot_ids, users, threads_count, per_thread):
+        """Каждый поток бронирует свою порцию слотов; замеряем общее время и задержки."""
+        barrier = threading.Barrier(threads_count)
+        latencies = []
+        errors = []
+        booked = []
+        lock = threading.Lock()
+
+        def worker(index):
+            user = users[index % len(users)]
+            chunk = slot_ids[index * per_thread:(index + 1) * per_thread]
+            local_latencies, local_booked = [], 0
+            try:
+                barrier.wait()
+                for slot_id in chunk:
+                    started = time.perf_counter()
+                    if book_slot(user, slot_id).success:
+                        local_booked += 1
+                    local_latencies.append(time.perf_counter() - started)
+            except Exception as exc:  # "database is locked" и т.п. - провал бенчмарка
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(local_latencies)
+                    booked.append(local_booked)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            self.stderr.write(f'Первая ошибка: {errors[0]!r}')
+
+        latencies.sort()
+        db = settings.DATABASES['default']
+        return {
+            'backend': connection.vendor,
+            'pool': bool(db.get('OPTIONS', {}).get('pool')),
+            'conn_max_age': db.get('CONN_MAX_AGE', 0),
+            'sqlite_pragmas': bool(getattr(settings, 'SQLITE_PRAGMAS', {})) if connection.vendor == 'sqlite' else None,
+            'threads': threads_count,
+            'booked': sum(booked),
+            'errors': len(errors),
+            'elapsed_s': round(elapsed, 2),
+            'bookings_per_s': round(sum(booked) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0,
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else 0.0,
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        }
@@ -0,0 +1,83 @@
+import json
+import math
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from main.geo import GridIndex, haversine_km
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк поиска локаций в радиусе (main/geo.py): сетка против полного перебора '
+        'на случайных точках в памяти, с проверкой совпадения результатов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations', type=int, default=5000, help='Количество локаций')
+        parser.add_argument('--queries', type=int, default=2000, help='Количество поисков')
+        parser.add_argument('--radius', type=float, default=2.0, help='Радиус поиска, км')
+        parser.add_argument('--spread', type=float, default=0.5,
+                            help='Локации и точки поиска - в квадрате ±spread градусов вокруг центра Москвы')
+        parser.add_argument('--cell', type=float, help='Размер ячейки сетки, градусы (по умолчанию из настроек)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        if options['locations'] < 1 or options['queries'] < 1 or options['radius'] <= 0:
+            raise CommandError('--locations, --queries и --radius должны быть положительными')
+        rng = random.Random(options['seed'])
+        center_lat, center_lng, spread = 55.751244, 37.618423, options['spread']
+
+        def random_point():
+            return center_lat + rng.uniform(-spread, spread), center_lng + rng.uniform(-spread, spread)
+
+        points = [(pk, *random_point()) for pk in range(1, options['locations'] + 1)]
+        queries = [random_point() for _ in range(options['queries'])]
+
+        started = time.perf_counter()
+        index = GridIndex(points, options['cell'])
+        build_ms = (time.perf_counter() - started) * 1000
+
+        radius = options['radius']
+        grid_times, brute_times, found = [], [], []
+        mismatches = 0
+        for lat, lng in queries:
+            started = time.perf_counter()
+            grid = index.within(lat, lng, radius)
+            grid_times.append((time.perf_counter() - started) * 1_000_000)
+
+            started = time.perf_counter()
+            brute = sorted(
+                (distance, pk) for pk, plat, plng in points
+                if (distance := haversine_km(lat, lng, plat, plng)) <= radius
+            )
+            brute_times.append((time.perf_counter() - started) * 1_000_000)
+
+            found.append(len(grid))
+            if [pk for _, pk in grid] != [pk for _, pk in brute] or any(
+                not math.isclose(a, b, abs_tol=1e-9) for (a, _), (b, _) in zip(grid, brute)
+            ):
+                mismatches += 1
+
+        result = {
+            'locations': len(points),
+            'queries': len(queries),
+            'radius_km': radius,
+            'cell_deg': index.cell_deg,
+            'cells': len(index.cells),
+            'build_ms': round(build_ms, 2),
+            'found_mean': round(statistics.fmean(found), 1),
+            'grid_p50_us': round(statistics.median(grid_times), 1),
+            'grid_p99_us': round(sorted(grid_times)[int(len(grid_times) * 0.99)], 1),
+            'brute_p50_us': round(statistics.median(brute_times), 1),
+            'brute_p99_us': round(sorted(brute_times)[int(len(brute_times) * 0.99)], 1),
+            'mismatches': mismatches,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False))
+        else:
+            for key, value in result.items():
+                self.stdout.write(f'{key:>14}: {value}')
+        if mismatches:
+            raise CommandError('Результаты сетки расходятся с полным перебором')
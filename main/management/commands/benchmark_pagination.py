@@ -0,0 +1,119 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from main.middleware import QueryRecorder
+from main.models import Rental, User
+from main.pagination import KeysetPagination
+from main.views import RentalViewSet
+
+BENCH_USERNAME = 'pagination_bench'
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку глубоких страниц api/rentals/: постраничная пагинация (COUNT + OFFSET) '
+        'против ?pagination=cursor. При необходимости досоздаёт аренды до --rows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Сколько аренд должно быть в таблице')
+        parser.add_argument('--page-size', type=int, default=10, help='Размер страницы')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов каждого замера (берётся медиана)')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+        parser.add_argument('--cleanup', action='store_true', help='Удалить созданные бенчмарком аренды и выйти')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Rental.objects.filter(user__username=BENCH_USERNAME).delete()
+            self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
+            return
+
+        self._seed(options['rows'])
+        total = Rental.objects.count()
+        page_size = options['page_size']
+        last_page = max(1, (total + page_size - 1) // page_size)
+
+        client = APIClient()
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for label, page in [('first', 1), ('middle', last_page // 2), ('last', last_page)]:
+                page = max(page, 1)
+                page_url = f'/api/rentals/?page={page}&page_size={page_size}'
+                cursor_url = f'/api/rentals/?pagination=cursor&page_size={page_size}'
+                cursor = self._cursor_before(page, page_size)
+                if cursor:
+                    cursor_url += f'&cursor={cursor}'
+                results.append({
+                    'page': label,
+                    'page_number': page,
+                    'offset': (page - 1) * page_size,
+                    'page_number_mode': self._measure(client, page_url, options['repeat']),
+                    'cursor_mode': self._measure(client, cursor_url, options['repeat']),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps({'rows': total, 'results': results}, ensure_ascii=False))
+            return
+        self.stdout.write(f'Аренд в таблице: {total}, размер страницы {page_size}')
+        for row in results:
+            numbered, cursor = row['page_number_mode'], row['cursor_mode']
+            self.stdout.write(
+                f"{row['page']:>6} (offset {row['offset']}): "
+                f"page={numbered['median_ms']} мс (БД {numbered['db_ms']} мс, запросов {numbered['queries']}), "
+                f"cursor={cursor['median_ms']} мс (БД {cursor['db_ms']} мс, запросов {cursor['queries']})"
+            )
+
+    def _seed(self, rows):
+        """Досоздаёт аренды пачками, пока их не станет rows."""
+        missing = rows - Rental.objects.count()
+        if missing <= 0:
+            return
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'role': 'Пользователь'})
+        start = timezone.now() - timedelta(days=3650)
+        created = Rental.objects.filter(user=user).count()
+        self.stdout.write(f'Создаю {missing} аренд...')
+        batch_size = 10_000
+        for offset in range(0, missing, batch_size):
+            with transaction.atomic():
+                Rental.objects.bulk_create([
+                    Rental(
+                        user=user,
+                        start_time=start + timedelta(minutes=5 * (created + i)),
+                        end_time=start + timedelta(minutes=5 * (created + i) + 60),
+                        total_price=100.0,
+                    )
+                    for i in range(offset, min(offset + batch_size, missing))
+                ], batch_size=batch_size)
+
+    def _cursor_before(self, page, page_size):
+        """Курсор, с которого cursor-режим отдаёт ту же страницу, что и ?page=page."""
+        if page <= 1:
+            return None
+        paginator = KeysetPagination()
+        paginator.ordering = RentalViewSet.keyset_ordering
+        paginator.model = Rental
+        row = Rental.objects.order_by(*paginator.ordering).only(*paginator.ordering)[(page - 1) * page_size - 1]
+        return paginator.encode_cursor(row)
+
+    def _measure(self, client, url, repeat):
+        timings = []
+        recorder = None
+        for _ in range(repeat):
+            recorder = QueryRecorder()
+            started = time.perf_counter()
+            with recorder.record():
+                response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url}: HTTP {response.status_code}')
+        return {
+            'median_ms': round(statistics.median(timings), 1),
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 1),
+        }
@@ -0,0 +1,96 @@
+import json
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from main.models import Task
+from main.taskqueue import Worker, enqueue
+from main.tasks import noop
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк очереди фоновых задач: скорость постановки в очередь и пропускная способность '
+        'нескольких обработчиков на пустых задачах (накладные расходы самой очереди)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000, help='Количество задач')
+        parser.add_argument('--workers', type=int, default=4, help='Параллельных обработчиков (потоков)')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        if options['tasks'] < 1 or options['workers'] < 1:
+            raise CommandError('--tasks и --workers должны быть положительными')
+        if Task.objects.filter(status__in=[Task.QUEUED, Task.RUNNING]).exists():
+            raise CommandError('В очереди есть незавершённые задачи - бенчмарк выполнил бы и их')
+
+        # Как в обработчиках запросов: одна задача - одна транзакция (autocommit)
+        started = time.perf_counter()
+        task_ids = [enqueue(noop, number=number).pk for number in range(options['tasks'])]
+        enqueue_elapsed = time.perf_counter() - started
+        try:
+            result = self._drain(options['workers'])
+            result.update(self._collect(task_ids))
+        finally:
+            Task.objects.filter(pk__in=task_ids).delete()
+        result.update({
+            'backend': connection.vendor,
+            'tasks': len(task_ids),
+            'enqueue_per_s': round(len(task_ids) / enqueue_elapsed, 1),
+        })
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False))
+        else:
+            for key, value in result.items():
+                self.stdout.write(f'{key:>18}: {value}')
+        if result['succeeded'] != len(task_ids) or result['duplicates']:
+            raise CommandError('Часть задач не выполнена или выполнена повторно')
+
+    def _drain(self, workers_count):
+        """Обработчики в потоках разбирают очередь до конца; каждый - со своим соединением."""
+        workers = [Worker(worker_id=f'benchmark-{index}', poll_interval=0.05) for index in range(workers_count)]
+        errors = []
+
+        def run(worker):
+            try:
+                worker.run(burst=True)
+            except Exception as exc:  # "database is locked" и т.п. - провал бенчмарка
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            self.stderr.write(f'Первая ошибка: {errors[0]!r}')
+        processed = sum(worker.processed for worker in workers)
+        return {
+            'workers': workers_count,
+            'errors': len(errors),
+            'drain_s': round(elapsed, 2),
+            'tasks_per_s': round(processed / elapsed, 1) if elapsed else 0.0,
+            'per_worker': [worker.processed for worker in workers],
+        }
+
+    def _collect(self, task_ids):
+        """Итоги по строкам Task: выполнено, повторные захваты, время от захвата до записи результата."""
+        rows = Task.objects.filter(pk__in=task_ids).values_list('status', 'attempts', 'locked_at', 'finished_at')
+        latencies = sorted(
+            (finished - locked).total_seconds() * 1000
+            for status, _, locked, finished in rows if status == Task.SUCCEEDED
+        )
+        return {
+            'succeeded': len(latencies),
+            'duplicates': sum(1 for _, attempts, _, _ in rows if attempts > 1),
+            'run_p50_ms': round(latencies[len(latencies) // 2], 1) if latencies else 0.0,
+            'run_p99_ms': round(latencies[int(len(latencies) * 0.99)], 1) if latencies else 0.0,
+            'run_mean_ms': round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        }
@@ -0,0 +1,118 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from main.benchmarks import build_scenarios, compare, environment, measure, pick_staff_user, pick_user
+from main.models import User
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p99, число SQL-запросов и пиковую память основных страниц и маршрутов API '
+        'на текущей базе (заполните её populate_db --profile ...) и пишет результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark-results.json', help='Файл для результатов JSON')
+        parser.add_argument('--repeat', type=int, default=20, help='Запросов на сценарий (после прогрева)')
+        parser.add_argument('--warmup', type=int, default=2, help='Запросов прогрева на сценарий')
+        parser.add_argument('--cold', action='store_true', help='Очищать кэш Django перед каждым запросом')
+        parser.add_argument('--only', action='append', dest='only',
+                            help='Только сценарии, имя которых начинается с этой строки (можно несколько раз)')
+        parser.add_argument('--user', help='Пользователь для страниц со входом (по умолчанию - с наибольшим числом аренд)')
+        parser.add_argument('--staff-user', help='Сотрудник для /api/users/ (по умолчанию - первый с is_staff)')
+        parser.add_argument('--compare', help='JSON предыдущего прогона: напечатать изменения')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Порог изменения p50 в процентах для пометки в сравнении')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть положительным')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Не удалось прочитать {options["compare"]}: {exc}')
+
+        user = pick_user() if not options['user'] else self._get_user(options['user'])
+        if user is None:
+            raise CommandError('В базе нет пользователей (запустите populate_db)')
+        staff_user = pick_staff_user() if not options['staff_user'] else self._get_user(options['staff_user'])
+        if staff_user is None:
+            self.stdout.write(self.style.WARNING('В базе нет сотрудников (is_staff): сценарии /api/users/ пропущены'))
+        scenarios = build_scenarios(user, staff_user)
+        if options['only']:
+            scenarios = [s for s in scenarios if any(s.name.startswith(prefix) for prefix in options['only'])]
+
+        # Адрес вне INTERNAL_IPS: debug_toolbar в dev-настройках не встраивается в ответы
+        client = Client(raise_request_exception=False, REMOTE_ADDR='192.0.2.1')
+        client.force_login(user)
+        staff_client = None
+        if staff_user is not None:
+            staff_client = Client(raise_request_exception=False, REMOTE_ADDR='192.0.2.1')
+            staff_client.force_login(staff_user)
+        report = {
+            'environment': {
+                **environment(), 'user': user.username, 'staff_user': staff_user.username if staff_user else None,
+                'repeat': options['repeat'], 'cold': options['cold'],
+            },
+            'results': {},
+        }
+        # Трейсбеки и предупреждения о бюджетах не нужны: статус и число запросов есть в отчёте
+        loggers = [logging.getLogger(name) for name in ('django.request', 'main.query_budget')]
+        for logger in loggers:
+            logger.disabled = True
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for scenario in scenarios:
+                    result = measure(
+                        staff_client if scenario.staff else client, scenario,
+                        options['repeat'], options['warmup'], options['cold'],
+                    )
+                    report['results'][scenario.name] = result
+                    self._print_result(scenario.name, result)
+        finally:
+            for logger in loggers:
+                logger.disabled = False
+            client.logout()
+            if staff_client is not None:
+                staff_client.logout()
+
+        with open(options['output'], 'w', encoding='utf-8') as target:
+            json.dump(report, target, ensure_ascii=False, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'Результаты записаны в {options["output"]}'))
+
+        if baseline is not None:
+            self._print_comparison(baseline, report, options['threshold'])
+
+        invalid = [name for name, result in report['results'].items() if not result['valid']]
+        if invalid:
+            raise CommandError(f'Сценарии с ответами не 200 (valid=false в отчёте): {", ".join(invalid)}')
+
+    def _get_user(self, username):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'Пользователь "{username}" не найден')
+        return user
+
+    def _print_result(self, name, result):
+        line = (
+            f'{name:<32} p50 {result["p50_ms"]:>8.2f} мс  p99 {result["p99_ms"]:>8.2f} мс  '
+            f'запросов {result["queries"]:>3}  БД {result["db_ms"]:>7.2f} мс  память {result["peak_memory_kb"]:>8.1f} КБ'
+        )
+        if not result['valid']:
+            line = self.style.ERROR(f'{line}  HTTP {result["status"]}')
+        self.stdout.write(line)
+
+    def _print_comparison(self, baseline, report, threshold):
+        self.stdout.write(f'Сравнение с прогоном {baseline.get("environment", {}).get("git_revision")}:')
+        for name, metric, old, new, change in compare(baseline, report):
+            if metric == 'p50_ms' and abs(change) < threshold:
+                continue
+            if metric != 'p50_ms' and old == new:
+                continue
+            line = f'  {name:<32} {metric:<15} {old} -> {new} ({change:+.1f}%)'
+            self.stdout.write(self.style.ERROR(line) if change > 0 else self.style.SUCCESS(line))
@@ -0,0 +1,87 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from main.explain import EXPLAIN_EXPECTATIONS, explain_request
+from main.homepage import invalidate_homepage_snapshot
+from main.models import Booking, Tour, User
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы SQL-запросов основных страниц (EXPLAIN QUERY PLAN / EXPLAIN) '
+        'и находит полные сканирования таблиц, для которых есть индексы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Имя пользователя для страниц, требующих входа (по умолчанию - с бронированиями)')
+        parser.add_argument('--view', action='append', dest='views', help='Проверить только эту вьюху (url_name)')
+        parser.add_argument('--verbose', action='store_true', help='Печатать SQL и планы всех запросов')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Завершиться с ошибкой при полном сканировании')
+
+    def handle(self, *args, **options):
+        user = self._get_user(options['user'])
+        tour = Tour.objects.order_by('id').first()
+        if tour is None:
+            raise CommandError('В базе нет туров (запустите populate_db)')
+
+        targets = [
+            ('index', reverse('index')),
+            ('tour_list', reverse('tour_list')),
+            ('tour_list', reverse('tour_list') + '?duration=2&min_price=1000&max_price=20000'),
+            ('tour_detail', reverse('tour_detail', args=[tour.id])),
+            ('tour_guides_list', reverse('tour_guides_list')),
+            ('profile', reverse('profile')),
+            ('rental_list', reverse('rental_list')),
+        ]
+        if options['views']:
+            targets = [target for target in targets if target[0] in options['views']]
+
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        problems = []
+        self.stdout.write(f'СУБД: {connection.vendor}, пользователь: {user.username}')
+        # Трейсбеки упавших вьюх не нужны: статус ответа печатается рядом с планом
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = True
+        try:
+            self._explain_targets(client, targets, options['verbose'], problems)
+        finally:
+            request_logger.disabled = False
+            client.logout()
+
+        if problems and options['fail_on_scan']:
+            raise CommandError('Найдены полные сканирования:\n' + '\n'.join(problems))
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('Полных сканирований горячих таблиц нет'))
+
+    def _explain_targets(self, client, targets, verbose, problems):
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for url_name, url in targets:
+                # Снимок главной собирается заново, чтобы увидеть его запросы
+                invalidate_homepage_snapshot()
+                tables = EXPLAIN_EXPECTATIONS.get(url_name, [])
+                response, plans = explain_request(client, url, tables)
+                scans = [(plan, table) for plan in plans for table in plan.full_scans]
+                status = self.style.ERROR('SCAN') if scans else self.style.SUCCESS('OK')
+                self.stdout.write(f'{status} {url} [{response.status_code}]: SELECT-запросов {len(plans)}')
+                for plan in plans:
+                    if verbose or plan.full_scans:
+                        self.stdout.write(f'    {plan.sql}')
+                        for line in plan.plan:
+                            self.stdout.write(f'        {line}')
+                problems.extend(f'{url}: полное сканирование {table}' for _, table in scans)
+
+    def _get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Пользователь "{username}" не найден')
+            return user
+        booking = Booking.objects.select_related('user').order_by('id').first()
+        user = booking.user if booking else User.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        return user
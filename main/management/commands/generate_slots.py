@@ -0,0 +1,55 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from main.models import Bike, Guide, Tour
+from main.slots import SlotRecurrence, generate_slots
+
+class Command(BaseCommand):
+    help = 'Генерирует слоты экскурсий по правилу повторения сразу для многих туров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tour', type=int, action='append', dest='tour_ids',
+                            help='ID тура (можно несколько раз). По умолчанию - все активные туры')
+        parser.add_argument('--guide', type=int, action='append', dest='guide_ids', required=True,
+                            help='ID гида (можно несколько раз)')
+        parser.add_argument('--from', dest='start_date', type=datetime.date.fromisoformat, required=True,
+                            help='Первая дата, ГГГГ-ММ-ДД')
+        parser.add_argument('--to', dest='end_date', type=datetime.date.fromisoformat, required=True,
+                            help='Последняя дата включительно, ГГГГ-ММ-ДД')
+        parser.add_argument('--times', required=True, help='Время начала через запятую, например 10:00,14:30')
+        parser.add_argument('--weekdays', default='0,1,2,3,4,5,6',
+                            help='Дни недели через запятую, 0 - понедельник (по умолчанию все)')
+        parser.add_argument('--bike', type=int, help='ID велосипеда для всех слотов')
+
+    def handle(self, *args, **options):
+        if options['end_date'] < options['start_date']:
+            raise CommandError('Дата окончания раньше даты начала')
+        try:
+            times = [datetime.time.fromisoformat(value.strip()) for value in options['times'].split(',')]
+            weekdays = frozenset(int(value) for value in options['weekdays'].split(','))
+        except ValueError as exc:
+            raise CommandError(f'Неверный формат времени или дней недели: {exc}')
+
+        tours = Tour.objects.filter(pk__in=options['tour_ids']) if options['tour_ids'] else Tour.objects.filter(is_active=True)
+        guides = list(Guide.objects.filter(pk__in=options['guide_ids']))
+        if len(guides) != len(set(options['guide_ids'])):
+            raise CommandError('Некоторые гиды не найдены')
+        bike = None
+        if options['bike']:
+            bike = Bike.objects.filter(pk=options['bike']).first()
+            if bike is None:
+                raise CommandError('Велосипед не найден')
+
+        rule = SlotRecurrence(
+            start_date=options['start_date'],
+            end_date=options['end_date'],
+            times=times,
+            guides=guides,
+            weekdays=weekdays,
+            bike=bike,
+        )
+        started = time.perf_counter()
+        created = generate_slots(tours.only('id'), rule)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Создано слотов: {created} за {elapsed * 1000:.0f} мс'))
@@ -0,0 +1,32 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from main.thumbnails import IMAGE_SPECS, process_image
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры WebP/JPEG для Tour.image и User.avatar, у которых их ещё нет (заполнение после загрузки данных)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Обработать все изображения, даже если manifest уже построен')
+
+    def handle(self, *args, **options):
+        for spec in IMAGE_SPECS.values():
+            model = apps.get_model(spec.model)
+            rows = model.objects.exclude(**{spec.field: ''}).exclude(**{f'{spec.field}__isnull': True})
+            processed = failed = skipped = 0
+            for pk, name, manifest in rows.values_list('pk', spec.field, spec.manifest_field).iterator():
+                if not options['force'] and (manifest or {}).get('source') == name:
+                    skipped += 1
+                    continue
+                try:
+                    manifest = process_image(spec, pk)
+                except FileNotFoundError as exc:
+                    self.stderr.write(str(exc))
+                    manifest = None
+                if manifest is None:
+                    failed += 1
+                else:
+                    processed += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{spec.model}.{spec.field}: обработано {processed}, пропущено {skipped}, ошибок {failed}'
+            ))
@@ -0,0 +1,66 @@
+import datetime
+import json
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from main.datagen import DEFAULT_BATCH_SIZE, DEFAULT_SEED, PROFILES, DatasetGenerator
+from main.homepage import invalidate_homepage_snapshot
+from main.models import Tour, User
+from main.tour_cache import invalidate_all_tour_details
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными по профилю (small/medium/large/xl). '
+        'Одинаковые профиль, --seed и --anchor дают одинаковый набор данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=list(PROFILES), default='small', help='Объём данных (по умолчанию small)')
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Seed генератора случайных чисел')
+        parser.add_argument('--anchor', type=datetime.date.fromisoformat,
+                            help='Опорная дата ГГГГ-ММ-ДД, от которой отсчитываются даты (по умолчанию сегодня)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Строк в одной транзакции')
+        parser.add_argument('--reset', action='store_true',
+                            help='Очистить базу перед заполнением (manage.py flush: удаляются ВСЕ данные, включая админов)')
+        parser.add_argument('--json', action='store_true', help='Вывести итог в JSON')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            call_command('flush', interactive=False, verbosity=0)
+        elif Tour.objects.exists() or User.objects.filter(is_superuser=False).exists():
+            raise CommandError('База уже заполнена: запустите с --reset или на пустой базе')
+
+        anchor = None
+        if options['anchor']:
+            anchor = timezone.make_aware(datetime.datetime.combine(options['anchor'], datetime.time.min))
+        generator = DatasetGenerator(
+            PROFILES[options['profile']],
+            seed=options['seed'],
+            anchor=anchor,
+            batch_size=options['batch_size'],
+            progress=None if options['json'] else self._progress,
+        )
+        started = time.perf_counter()
+        counts = generator.run()
+        elapsed = time.perf_counter() - started
+        invalidate_homepage_snapshot()
+        invalidate_all_tour_details()
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'profile': options['profile'],
+                'seed': options['seed'],
+                'anchor': generator.anchor.isoformat(),
+                'seconds': round(elapsed, 1),
+                'rows': counts,
+            }, ensure_ascii=False))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Профиль {options["profile"]}: создано строк {sum(counts.values())} за {elapsed:.1f} с'
+        ))
+
+    def _progress(self, name, created, elapsed):
+        rate = f' ({created / elapsed:.0f} строк/с)' if elapsed and created > 1000 else ''
+        self.stdout.write(f'  {name}: {created} за {elapsed:.1f} с{rate}')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg
+from main.homepage import invalidate_homepage_snapshot
+from main.models import Guide, Review
+from main.ratings import prior, recompute_guide_ratings
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает байесовский рейтинг гидов по отзывам на их туры одним UPDATE '
+        '(заполнение/восстановление после загрузки данных в обход сигналов)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guide', type=int, action='append', dest='guide_ids',
+                            help='ID гида для пересчёта (можно указать несколько раз). По умолчанию - все гиды')
+
+    def handle(self, *args, **options):
+        queryset = Guide.objects.all()
+        if options['guide_ids']:
+            queryset = queryset.filter(pk__in=options['guide_ids'])
+
+        with transaction.atomic():
+            updated = recompute_guide_ratings(queryset)
+        invalidate_homepage_snapshot()
+
+        mean, weight = prior()
+        observed = Review.objects.aggregate(mean=Avg('rating'))['mean']
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны рейтинги для гидов: {updated}'))
+        # Подсказка для настройки GUIDE_RATING_PRIOR_MEAN
+        self.stdout.write(
+            f'Априорная оценка {mean} с весом {weight:g}; средняя оценка по всем отзывам: '
+            f'{round(observed, 2) if observed is not None else "нет отзывов"}'
+        )
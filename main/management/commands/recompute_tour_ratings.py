@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from main.models import Tour
+from main.tour_cache import invalidate_all_tour_details
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные avg_rating и review_count у туров (заполнение/восстановление)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tour', type=int, action='append', dest='tour_ids',
+                            help='ID тура для пересчёта (можно указать несколько раз). По умолчанию - все туры')
+
+    def handle(self, *args, **options):
+        queryset = Tour.objects.all()
+        if options['tour_ids']:
+            queryset = queryset.filter(pk__in=options['tour_ids'])
+
+        with transaction.atomic():
+            updated = Tour.recompute_review_stats(queryset)
+        invalidate_all_tour_details()
+
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны рейтинги для туров: {updated}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from main.homepage import refresh_homepage_snapshot
+
+class Command(BaseCommand):
+    help = 'Пересобирает снимок главной страницы и кладёт его в кэш (для запуска по расписанию)'
+
+    def handle(self, *args, **options):
+        snapshot = refresh_homepage_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Снимок главной обновлён: туров {snapshot['total_tours_count']}, "
+            f"гидов {snapshot['total_guides_count']}, отзывов {snapshot['total_reviews_count']}"
+        ))
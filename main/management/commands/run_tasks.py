@@ -0,0 +1,60 @@
+import json
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from main.taskqueue import Worker, requeue_stale, retry, stats
+from main.models import Task
+
+class Command(BaseCommand):
+    help = (
+        'Обработчик очереди фоновых задач (main/taskqueue.py). Запускайте один или несколько '
+        'процессов рядом с веб-сервером; --stats показывает состояние очереди'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help='Выйти, когда очередь опустеет')
+        parser.add_argument('--max-tasks', type=int, help='Выйти после стольких задач')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза при пустой очереди, секунды')
+        parser.add_argument('--worker-id', help='Имя обработчика в Task.locked_by (по умолчанию хост:pid)')
+        parser.add_argument('--stats', action='store_true', help='Только показать состояние очереди и выйти')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Снова поставить в очередь все задачи со статусом failed и выйти')
+        parser.add_argument('--json', action='store_true', help='Вывод --stats в JSON')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self._print_stats(options['json'])
+        if options['retry_failed']:
+            count = retry(Task.objects.filter(status=Task.FAILED).values_list('pk', flat=True))
+            self.stdout.write(self.style.SUCCESS(f'Поставлено в очередь повторно: {count}'))
+            return
+        if options['max_tasks'] is not None and options['max_tasks'] < 1:
+            raise CommandError('--max-tasks должен быть положительным')
+
+        worker = Worker(worker_id=options['worker_id'], poll_interval=options['poll_interval'])
+        # Текущая задача доделывается, новая не берётся
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        requeued, failed = requeue_stale()
+        if requeued or failed:
+            self.stdout.write(f'Зависших задач возвращено в очередь: {requeued}, помечено ошибкой: {failed}')
+        self.stdout.write(f'Обработчик {worker.worker_id} запущен')
+        worker.run(max_tasks=options['max_tasks'], burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработчик {worker.worker_id} остановлен: выполнено {worker.processed}, с ошибкой {worker.failed}'
+        ))
+
+    def _print_stats(self, as_json):
+        data = stats()
+        if as_json:
+            self.stdout.write(json.dumps(data, ensure_ascii=False))
+            return
+        labels = dict(Task.STATUS_CHOICES)
+        for status, count in data['counts'].items():
+            self.stdout.write(f'{labels[status]:<12} {count}')
+        if data['oldest_queued_seconds'] is not None:
+            self.stdout.write(f'Самая старая ожидающая задача: {data["oldest_queued_seconds"]} с')
+        for task in Task.objects.filter(status=Task.FAILED).order_by('-finished_at')[:5]:
+            last_line = task.last_error.strip().splitlines()[-1] if task.last_error.strip() else ''
+            self.stdout.write(self.style.ERROR(f'  {task}: {last_line}'))
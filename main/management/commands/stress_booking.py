@@ -0,0 +1,80 @@
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from main.booking import book_slot
+from main.models import Booking, Guide, Rental, Slot, Tour, User
+
+class Command(BaseCommand):
+    help = (
+        'Ручная нагрузочная проверка бронирования на рабочей БД: много потоков одновременно '
+        'бронируют один слот, победитель должен быть ровно один. Автоматически то же проверяет '
+        'main.tests.ConcurrentBookingTest'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Количество параллельных потоков')
+        parser.add_argument('--rounds', type=int, default=5, help='Сколько раз повторить тест на новом слоте')
+
+    def handle(self, *args, **options):
+        threads_count = options['threads']
+        tour = Tour.objects.filter(is_active=True).first()
+        guide = Guide.objects.first()
+        users = list(User.objects.filter(role='Пользователь')[:threads_count])
+        if not tour or not guide or not users:
+            raise CommandError('Нужны хотя бы один активный тур, гид и пользователь (запустите populate_db)')
+
+        for round_number in range(1, options['rounds'] + 1):
+            slot = Slot.objects.create(
+                tour=tour, guide=guide,
+                datetime=timezone.now() + timedelta(days=365, minutes=round_number),
+            )
+            try:
+                winners, losers, errors = self._hammer(slot.pk, users, threads_count)
+                bookings = Booking.objects.filter(tour=tour, date=slot.datetime).count()
+                self.stdout.write(
+                    f'Раунд {round_number}: успешных {winners}, отказов {losers}, ошибок {len(errors)}, '
+                    f'бронирований в БД {bookings}'
+                )
+                if errors:
+                    raise CommandError(f'Ошибки в потоках: {errors[0]!r}')
+                if winners != 1 or bookings != 1:
+                    raise CommandError(f'Ожидался ровно один победитель, получено {winners} (в БД {bookings})')
+            finally:
+                with transaction.atomic():
+                    Booking.objects.filter(tour=tour, date=slot.datetime).delete()
+                    Rental.objects.filter(start_time=slot.datetime, user__in=users).delete()
+                    slot.delete()
+
+        self.stdout.write(self.style.SUCCESS('Двойных бронирований не обнаружено'))
+
+    def _hammer(self, slot_id, users, threads_count):
+        """Запускает потоки одновременно (через барьер) и собирает результаты."""
+        barrier = threading.Barrier(threads_count)
+        results = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(user):
+            try:
+                barrier.wait()
+                result = book_slot(user, slot_id)
+                with lock:
+                    results.append(result.success)
+            except Exception as exc:  # ошибка БД в потоке - тоже провал теста
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(users[i % len(users)],)) for i in range(threads_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        winners = sum(1 for success in results if success)
+        return winners, len(results) - winners, errors
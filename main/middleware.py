@@ -0,0 +1,87 @@
+"""
+Middleware для bike tours: контроль количества SQL-запросов на каждую вьюху.
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('main.query_budget')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Вьюха выполнила больше запросов, чем разрешено в QUERY_BUDGETS."""
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: считает запросы и суммарное время в БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+        self.params = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements.append(sql)
+            self.params.append(params)
+
+    def record(self):
+        """Контекстный менеджер: подключает счётчик ко всем базам из settings.DATABASES."""
+        stack = ExitStack()
+        for alias in settings.DATABASES:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+def get_query_budget(url_name):
+    """Бюджет запросов для имени маршрута (None - бюджет не задан)."""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(url_name)
+
+
+def check_query_budget(url_name, recorder):
+    """
+    Сравнивает число запросов с бюджетом маршрута.
+    При QUERY_BUDGET_RAISE=True бросает QueryBudgetExceeded, иначе пишет предупреждение в лог.
+    """
+    budget = get_query_budget(url_name)
+    if budget is None or recorder.count <= budget:
+        return
+    message = (
+        f'Вьюха "{url_name}" выполнила {recorder.count} SQL-запросов '
+        f'(бюджет {budget}, время в БД {recorder.duration * 1000:.1f} мс)'
+    )
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает SQL-запросы и время в БД для каждого запроса, добавляет заголовки
+    X-DB-Queries / X-DB-Time и сверяет результат с QUERY_BUDGETS (по url_name).
+    Предназначено для разработки и тестов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+
+        response['X-DB-Queries'] = str(recorder.count)
+        response['X-DB-Time'] = f'{recorder.duration * 1000:.2f}ms'
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            check_query_budget(match.url_name, recorder)
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:07
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_stats(apps, schema_editor):
+    Tour = apps.get_model('main', 'Tour')
+    Review = apps.get_model('main', 'Review')
+    reviews = Review.objects.filter(tour=OuterRef('pk')).order_by().values('tour')
+    Tour.objects.update(
+        review_count=Coalesce(Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+        avg_rating=Coalesce(
+            Subquery(reviews.annotate(a=Avg('rating')).values('a'), output_field=models.FloatField()),
+            Value(0.0),
+        ),
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_alter_rental_bike'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tour',
+            name='avg_rating',
+            field=models.FloatField(db_index=True, default=0.0, verbose_name='Средний рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='tour',
+            name='review_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_slots(apps, schema_editor):
+    # Из каждой группы дублей оставляем один слот, предпочитая уже забронированный
+    Slot = apps.get_model('main', 'Slot')
+    duplicates = (
+        Slot.objects.values('tour_id', 'guide_id', 'datetime')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for group in duplicates:
+        same_slots = Slot.objects.filter(
+            tour_id=group['tour_id'], guide_id=group['guide_id'], datetime=group['datetime'],
+        )
+        keep_id = same_slots.order_by('-is_booked', 'id').values_list('id', flat=True).first()
+        same_slots.exclude(id=keep_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_tour_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='slot',
+            constraint=models.UniqueConstraint(fields=('tour', 'guide', 'datetime'), name='unique_slot_tour_guide_datetime'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_slot_unique_tour_guide_datetime'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'date'], name='booking_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['user', '-start_time'], name='rental_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['tour', 'datetime'], name='slot_free_tour_dt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['-created_at'], name='tour_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='tour_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['duration', 'price'], name='tour_duration_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['price'], name='tour_price_idx'),
+        ),
+    ]
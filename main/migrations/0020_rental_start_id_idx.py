@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['start_time', 'id'], name='rental_start_id_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+from main.search import install_bike_search_index, uninstall_bike_search_index
+
+
+def fill_search_text(apps, schema_editor):
+    # Текст зависит только от типа и локации: по одному UPDATE на пару, без чтения велосипедов
+    from main.models import Bike as CurrentBike
+
+    Bike = apps.get_model('main', 'Bike')
+    Location = apps.get_model('main', 'Location')
+    for location_id, name in Location.objects.values_list('id', 'name'):
+        for bike_type, _ in CurrentBike.BIKE_TYPES:
+            Bike.objects.filter(location_id=location_id, type=bike_type).update(
+                search_text=CurrentBike.build_search_text(bike_type, name),
+            )
+
+
+def create_search_index(apps, schema_editor):
+    install_bike_search_index(schema_editor.connection, rebuild=True)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_bike_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_rental_start_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bike',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Текст для поиска'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_bike_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tour',
+            name='image_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры изображения'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры аватара'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:03
+
+from django.db import migrations, models
+from django.db.models import F, Func, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from main.ratings import smoothed_rating
+
+
+def backfill_guide_ratings(apps, schema_editor):
+    # То же, что main.ratings.recompute_guide_ratings, на исторических моделях
+    Guide = apps.get_model('main', 'Guide')
+    GuideTour = apps.get_model('main', 'GuideTour')
+    Review = apps.get_model('main', 'Review')
+    Slot = apps.get_model('main', 'Slot')
+    guide_ref = OuterRef(OuterRef('pk'))
+    reviews = Review.objects.filter(
+        Q(tour_id__in=GuideTour.objects.filter(guide_id=guide_ref).values('tour_id'))
+        | Q(tour_id__in=Slot.objects.filter(guide_id=guide_ref).values('tour_id'))
+    ).order_by()
+
+    def aggregate(function):
+        values = reviews.annotate(value=Func(F('rating'), function=function)).values('value')[:1]
+        return Coalesce(Subquery(values, output_field=models.IntegerField()), 0)
+
+    review_sum, review_count = aggregate('SUM'), aggregate('COUNT')
+    Guide.objects.update(
+        review_sum=review_sum, review_count=review_count, rating=smoothed_rating(review_sum, review_count),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_task_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guide',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Отзывов на туры гида'),
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='review_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.AlterField(
+            model_name='guide',
+            name='rating',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Рейтинг'),
+        ),
+        migrations.AddIndex(
+            model_name='guide',
+            index=models.Index(fields=['-rating', 'id'], name='guide_rating_idx'),
+        ),
+        migrations.RunPython(backfill_guide_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_guide_rating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(fields=['bike', 'end_time', 'start_time'], name='rental_bike_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(condition=models.Q(('bike__isnull', False)), fields=['bike', 'datetime'], name='slot_bike_dt_idx'),
+        ),
+    ]
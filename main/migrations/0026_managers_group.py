@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 21:00
+
+from django.db import migrations
+
+
+def add_role_managers_to_group(apps, schema_editor):
+    # Права менеджера теперь дают только группа Managers и is_superuser (main/capabilities.py):
+    # пользователи с ролью «Менеджер» переносятся в группу, чтобы не потерять права
+    Group = apps.get_model('auth', 'Group')
+    User = apps.get_model('main', 'User')
+    group, _ = Group.objects.get_or_create(name='Managers')
+    Membership = User.groups.through
+    existing = set(Membership.objects.filter(group_id=group.pk).values_list('user_id', flat=True))
+    Membership.objects.bulk_create([
+        Membership(user_id=user_id, group_id=group.pk)
+        for user_id in User.objects.filter(role='Менеджер').values_list('pk', flat=True)
+        if user_id not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('main', '0025_availability_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_role_managers_to_group, migrations.RunPython.noop),
+    ]
@@ -6,7 +6,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
-from django.db.models import Avg
+from django.db.models import Avg, Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 
 def create_manager_group():
     """Создает группу менеджеров и назначает ей необходимые права"""
@@ -36,6 +37,8 @@ class User(AbstractUser):
     # Поле для загрузки изображения пользователя
     # upload_to указывает подпапку в MEDIA_ROOT, куда будут сохраняться изображения
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True, verbose_name='Аватар')
+    # Уменьшенные копии аватара (main/thumbnails.py), заполняется в фоне после загрузки
+    avatar_thumbnails = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Миниатюры аватара')
     
     gender = models.CharField(max_length=7, choices=GENDER_CHOICES, blank=True, null=True, verbose_name='Пол')
     date_of_birth = models.DateField(blank=True, null=True, verbose_name='Дата рождения')
@@ -59,7 +62,11 @@ class Guide(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name='Пользователь', related_name='guide_profile')
     experience = models.IntegerField(verbose_name='Опыт работы (лет)')
     languages = models.CharField(max_length=200, verbose_name='Знание языков')
-    rating = models.FloatField(default=0.0, verbose_name='Рейтинг')
+    # Байесовский рейтинг по отзывам на туры гида и его агрегаты: поддерживаются сигналами
+    # Review/GuideTour/Slot (main/ratings.py)
+    rating = models.FloatField(default=0.0, editable=False, verbose_name='Рейтинг')
+    review_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Отзывов на туры гида')
+    review_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок')
     # лаба 1: Демонстрация использования FileField
     resume = models.FileField(upload_to='guides/resumes/', verbose_name='Резюме', null=True, blank=True)
     # лаба 1: Демонстрация использования URLField
@@ -70,6 +77,10 @@ class Guide(models.Model):
     class Meta:
         verbose_name = 'Гид'
         verbose_name_plural = 'Гиды'
+        indexes = [
+            # Лучшие гиды на главной: ORDER BY rating DESC, id LIMIT N по индексу
+            models.Index(fields=['-rating', 'id'], name='guide_rating_idx'),
+        ]
 
     def __str__(self):
         """Строковое представление гида с опытом работы."""
@@ -119,6 +130,11 @@ class Bike(models.Model):
     rental_price_hour = models.FloatField(verbose_name='Цена за час')
     rental_price_day = models.FloatField(verbose_name='Цена за день')
     location = models.ForeignKey(Location, on_delete=models.CASCADE, verbose_name='Локация', related_name='bikes')
+    # Тип (название и код) и название локации для полнотекстового поиска (main/search.py).
+    # Заполняется в save(), при bulk_create - через build_search_text(), при переименовании
+    # локации - сигналом (main/signals.py)
+    search_text = models.CharField(max_length=255, blank=True, default='', editable=False,
+                                   verbose_name='Текст для поиска')
 
     class Meta:
         verbose_name = 'Велосипед'
@@ -128,10 +144,20 @@ class Bike(models.Model):
         """Строковое представление велосипеда с типом и локацией."""
         return f"{self.get_type_display()} - {self.location.name}"
 
+    @classmethod
+    def build_search_text(cls, bike_type, location_name):
+        """Текст для поиска: название типа, код типа и локация в нижнем регистре."""
+        type_label = dict(cls.BIKE_TYPES).get(bike_type, '')
+        return f"{type_label} {bike_type} {location_name}".lower()
+
     def save(self, *args, **kwargs):
-        """Сохраняет велосипед, не позволяя отрицательную цену за час."""
+        """Сохраняет велосипед, не позволяя отрицательную цену за час, и обновляет текст для поиска."""
         if self.rental_price_hour < 0:
             self.rental_price_hour = 0
+        self.search_text = self.build_search_text(self.type, self.location.name if self.location_id else '')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'type', 'location', 'location_id'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
         super().save(*args, **kwargs)
 
 # лаба 1: Демонстрация использования сеансов Django
@@ -146,6 +172,14 @@ class Rental(models.Model):
     class Meta:
         verbose_name = 'Аренда'
         verbose_name_plural = 'Аренды'
+        indexes = [
+            # rental_list: аренды пользователя, новые сверху
+            models.Index(fields=['user', '-start_time'], name='rental_user_start_idx'),
+            # api/rentals?pagination=cursor: keyset по (start_time, id)
+            models.Index(fields=['start_time', 'id'], name='rental_start_id_idx'),
+            # main/availability.py: пересечение аренд велосипеда с интервалом (end_time > начала)
+            models.Index(fields=['bike', 'end_time', 'start_time'], name='rental_bike_end_idx'),
+        ]
 
     def __str__(self):
         """Строковое представление аренды: пользователь и велосипед."""
@@ -165,6 +199,8 @@ class Tour(models.Model):
         (12, '12 часов'),
         (24, '24 часа (сутки)'),
     ]
+    # Подписи длительностей для __str__ - словарь строится один раз, а не на каждый вызов
+    DURATION_LABELS = dict(DURATION_CHOICES)
     
     name = models.CharField(max_length=200, verbose_name='Название')
     description = models.TextField(verbose_name='Описание')
@@ -172,14 +208,19 @@ class Tour(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена')
     location = models.CharField(max_length=200, verbose_name='Местоположение')
     image = models.ImageField(upload_to='tours/', verbose_name='Изображение', null=True, blank=True)
+    # Уменьшенные копии изображения (main/thumbnails.py), заполняется в фоне после загрузки
+    image_thumbnails = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Миниатюры изображения')
     created_at = models.DateTimeField(default=timezone.now, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     is_active = models.BooleanField(default=True, verbose_name='Активен')
     start_time = models.DateTimeField(null=True, blank=True, verbose_name='Дата и время начала экскурсии')
+    # Денормализованные агрегаты по отзывам: поддерживаются сигналами Review (main/signals.py)
+    avg_rating = models.FloatField(default=0.0, db_index=True, verbose_name='Средний рейтинг')
+    review_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name='Количество отзывов')
 
     def __str__(self):
         """Строковое представление тура с длительностью."""
-        duration_display = dict(self.DURATION_CHOICES).get(self.duration, f"{self.duration} ч.")
+        duration_display = self.DURATION_LABELS.get(self.duration, f"{self.duration} ч.")
         return f"{self.name} ({duration_display})"
 
     def get_age(self):
@@ -197,10 +238,38 @@ class Tour(models.Model):
 
     def is_highly_rated(self):
         """Проверяет, имеет ли тур высокий рейтинг (средний рейтинг >= 4.5)."""
-        avg_rating = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        if avg_rating is None:
+        if not self.review_count:
             return False
-        return avg_rating >= 4.5
+        return self.avg_rating >= 4.5
+
+    @classmethod
+    def apply_review_delta(cls, tour_id, rating_delta, count_delta):
+        """
+        Инкрементально пересчитывает avg_rating и review_count одним UPDATE.
+        rating_delta - изменение суммы оценок, count_delta - изменение числа отзывов.
+        """
+        new_count = F('review_count') + count_delta
+        return cls.objects.filter(pk=tour_id).update(
+            avg_rating=Case(
+                When(review_count__lte=-count_delta, then=Value(0.0)),
+                default=(F('avg_rating') * F('review_count') + rating_delta) / new_count,
+                output_field=models.FloatField(),
+            ),
+            review_count=new_count,
+        )
+
+    @classmethod
+    def recompute_review_stats(cls, queryset=None):
+        """Полностью пересчитывает агрегаты по отзывам одним UPDATE с подзапросами."""
+        reviews = Review.objects.filter(tour=OuterRef('pk')).order_by().values('tour')
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            review_count=Coalesce(Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+            avg_rating=Coalesce(
+                Subquery(reviews.annotate(a=Avg('rating')).values('a'), output_field=models.FloatField()),
+                Value(0.0),
+            ),
+        )
 
     def get_next_tours(self, count=3):
         """Возвращает следующие туры по дате создания."""
@@ -219,6 +288,17 @@ class Tour(models.Model):
         verbose_name = 'Маршрут'
         verbose_name_plural = 'Маршруты'
         ordering = ['-created_at']
+        indexes = [
+            # Сортировка по умолчанию для всех списков туров
+            models.Index(fields=['-created_at'], name='tour_created_idx'),
+            # Только активные туры (api/tours?is_active=True, счётчики), новые сверху
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_active=True), name='tour_active_created_idx',
+            ),
+            # TourListView: фильтры по длительности и диапазону цены
+            models.Index(fields=['duration', 'price'], name='tour_duration_price_idx'),
+            models.Index(fields=['price'], name='tour_price_idx'),
+        ]
 
 # лаба 1: Демонстрация использования сеансов Django
 class GuideTour(models.Model):
@@ -243,6 +323,10 @@ class Booking(models.Model):
     class Meta:
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
+        indexes = [
+            # profile: бронирования пользователя и проверка недавних по дате
+            models.Index(fields=['user', 'date'], name='booking_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.tour.name}"
@@ -292,7 +376,58 @@ class Slot(models.Model):
         verbose_name = 'Слот экскурсии'
         verbose_name_plural = 'Слоты экскурсий'
         ordering = ['datetime']
+        constraints = [
+            models.UniqueConstraint(fields=['tour', 'guide', 'datetime'], name='unique_slot_tour_guide_datetime'),
+        ]
+        indexes = [
+            # BookingForm: свободные слоты тура по времени - в индекс попадают только незанятые
+            models.Index(
+                fields=['tour', 'datetime'], condition=models.Q(is_booked=False), name='slot_free_tour_dt_idx',
+            ),
+            # main/availability.py: слоты туров с велосипедом по времени
+            models.Index(
+                fields=['bike', 'datetime'], condition=models.Q(bike__isnull=False), name='slot_bike_dt_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.tour.name} | {self.guide.user.get_full_name()} | {self.datetime.strftime('%d.%m.%Y %H:%M')}"
 
+
+class Task(models.Model):
+    """Фоновая задача очереди из main/taskqueue.py: путь к функции с @task и её аргументы"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (SUCCEEDED, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+    name = models.CharField(max_length=200, verbose_name='Обработчик')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Аргументы')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name='Максимум попыток')
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Запуск не раньше')
+    locked_by = models.CharField(max_length=100, blank=True, default='', verbose_name='Обработчик очереди')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Взята в работу')
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    last_error = models.TextField(blank=True, default='', verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершена')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            # Выбор следующей задачи воркером: только ожидающие, по времени запуска
+            models.Index(fields=['run_at', 'id'], condition=models.Q(status='queued'), name='task_queued_run_at_idx'),
+            # Поиск зависших задач (воркер упал, не завершив работу)
+            models.Index(fields=['locked_at'], condition=models.Q(status='running'), name='task_running_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.get_status_display()})"
@@ -0,0 +1,191 @@
+"""
+Пагинация REST API.
+
+По умолчанию - постраничная (page/page_size): COUNT(*) и OFFSET на каждой странице.
+С параметром ?pagination=cursor - keyset-пагинация по индексированным полям:
+следующая страница выбирается условием WHERE (start_time, id) > (последняя строка),
+без COUNT(*) и OFFSET, поэтому глубокие страницы стоят столько же, сколько первая.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+PAGINATION_QUERY_PARAM = 'pagination'
+CURSOR_MODE = 'cursor'
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по набору полей view.keyset_ordering (по умолчанию ('id',)).
+    Поля должны быть NOT NULL, а их набор - уникальным (последним полем ставьте id).
+    Курсор - base64 от JSON с значениями полей граничной строки и направлением.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+    display_page_controls = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', ('id',)))
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        position, reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*(self._reversed(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Пришли с курсором - в обратную сторону страница точно есть
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self._link(self.encode_cursor(self.last_row, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_row is None:
+            return None
+        return self._link(self.encode_cursor(self.first_row, reverse=True))
+
+    def _link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, row, reverse=False):
+        """Курсор, указывающий на строку row (следующая страница начнётся после неё)."""
+        values = []
+        for name in self.ordering:
+            field = self.model._meta.get_field(name.lstrip('-'))
+            values.append(field.value_to_string(row))
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """(значения полей, reverse) из параметра cursor; (None, False) - первая страница."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            raw_values = payload['v']
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, raw_values)
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, position, reverse):
+        """
+        Условие «строго после позиции» в порядке self.ordering:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...) - раскрытое сравнение кортежей.
+        Избыточное a >= x даёт планировщику диапазон по первому полю индекса: без него
+        SQLite разбирает OR по отдельности и сортирует весь хвост таблицы.
+        """
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, position):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            condition |= Q(**equal, **{f'{field}__{"lt" if descending else "gt"}': value})
+            equal[field] = value
+        first = self.ordering[0]
+        descending = first.startswith('-') != reverse
+        return Q(**{f'{first.lstrip("-")}__{"lte" if descending else "gte"}': position[0]}) & condition
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+class SelectablePagination(BasePagination):
+    """
+    Выбор режима по параметру запроса: ?pagination=cursor - KeysetPagination,
+    иначе StandardResultsSetPagination (совместимо с существующими клиентами).
+    """
+    page_number_class = StandardResultsSetPagination
+    keyset_class = KeysetPagination
+
+    def __init__(self):
+        self.page_number = self.page_number_class()
+        self.keyset = self.keyset_class()
+        self.active = self.page_number
+
+    @property
+    def display_page_controls(self):
+        return self.active.display_page_controls
+
+    def paginate_queryset(self, queryset, request, view=None):
+        use_cursor = request.query_params.get(PAGINATION_QUERY_PARAM) == CURSOR_MODE
+        self.active = self.keyset if use_cursor else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.active.to_html()
+
+    def get_schema_fields(self, view):
+        return self.page_number.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number.get_schema_operation_parameters(view)
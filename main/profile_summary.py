@@ -0,0 +1,156 @@
+"""
+Сводка профиля пользователя: последние бронирования и отзывы, счётчики и флаги
+«Быстрой информации». Собирается двумя запросами и хранится в кэше по пользователю.
+
+Счётчики считаются оконными агрегатами с условием (COUNT(...) FILTER (WHERE ...) OVER ())
+в тех же запросах, что выбирают строки списков: окно видит все бронирования
+(отзывы) пользователя, а LIMIT обрезает только возвращаемые строки. Нет строк -
+нет и бронирований (отзывов), счётчики равны нулю.
+
+Запись сбрасывается сигналами Booking и Review пользователя (main/signals.py);
+изменение туров (название, цена) сдвигает общее поколение. Флаг недавних
+бронирований зависит от текущего времени, поэтому не хранится, а вычисляется при
+каждом чтении по дате самого позднего бронирования (оно первое в списке).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q, Window
+from django.utils import timezone
+
+from .models import Booking, Review
+
+KEY_PREFIX = 'profile_summary'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+
+# Сколько последних бронирований и отзывов показывать в профиле
+PROFILE_LIST_LIMIT = 20
+# Бронирование дороже - «дорогой тур»
+EXPENSIVE_TOUR_PRICE = 5000
+RECENT_BOOKING_DAYS = 30
+
+
+def get_summary_ttl():
+    """Время жизни сводки (PROFILE_SUMMARY_TTL в settings, по умолчанию 10 минут)."""
+    return getattr(settings, 'PROFILE_SUMMARY_TTL', 600)
+
+
+def _user_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def _current_generation(cached):
+    generation = cached.get(GENERATION_KEY)
+    if generation is None:
+        generation = int(time.time() * 1000)
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def _total(condition=None):
+    """COUNT по всем строкам пользователя (окно без PARTITION BY), с необязательным условием."""
+    return Window(Count('pk', filter=condition))
+
+
+def _bookings(user_id):
+    """Последние бронирования и счётчики по всем бронированиям пользователя - один запрос."""
+    reviewed = Review.objects.filter(user_id=user_id, tour_id=OuterRef('tour_id'))
+    rows = list(
+        Booking.objects.filter(user_id=user_id)
+        .annotate(
+            booking_count=_total(),
+            expensive_booking_count=_total(Q(tour__price__gt=EXPENSIVE_TOUR_PRICE)),
+            unreviewed_booking_count=_total(~Exists(reviewed)),
+        )
+        .order_by('-date', '-id')
+        .values(
+            'id', 'tour_id', 'tour__name', 'date', 'total_price',
+            'booking_count', 'expensive_booking_count', 'unreviewed_booking_count',
+        )[:PROFILE_LIST_LIMIT]
+    )
+    counts = rows[0] if rows else {}
+    bookings = [
+        {
+            'id': row['id'],
+            'tour_id': row['tour_id'],
+            'tour_name': row['tour__name'],
+            'date': row['date'],
+            'total_price': row['total_price'],
+        }
+        for row in rows
+    ]
+    return bookings, counts
+
+
+def _reviews(user_id):
+    """Последние отзывы пользователя и их общее число - один запрос."""
+    rows = list(
+        Review.objects.filter(user_id=user_id)
+        .annotate(review_count=_total())
+        .order_by('-created_at', '-id')
+        .values('id', 'tour_id', 'tour__name', 'rating', 'comment', 'created_at', 'review_count')[:PROFILE_LIST_LIMIT]
+    )
+    reviews = [
+        {
+            'id': row['id'],
+            'tour_id': row['tour_id'],
+            'tour_name': row['tour__name'],
+            'rating': row['rating'],
+            'comment': row['comment'],
+            'created_at': row['created_at'],
+        }
+        for row in rows
+    ]
+    return reviews, rows[0]['review_count'] if rows else 0
+
+
+def _has_recent_bookings(bookings, now):
+    """Бронирования идут от поздних к ранним - достаточно проверить первое."""
+    return bool(bookings) and bookings[0]['date'] >= now - timezone.timedelta(days=RECENT_BOOKING_DAYS)
+
+
+def build_profile_summary(user_id):
+    """Сводка профиля из БД (два запроса), без кэша."""
+    bookings, counts = _bookings(user_id)
+    reviews, review_count = _reviews(user_id)
+    booking_count = counts.get('booking_count', 0)
+    return {
+        'bookings': bookings,
+        'reviews': reviews,
+        'booking_count': booking_count,
+        'review_count': review_count,
+        'has_reviews': review_count > 0,
+        'has_recent_bookings': _has_recent_bookings(bookings, timezone.now()),
+        'has_expensive_tours': counts.get('expensive_booking_count', 0) > 0,
+        # Все забронированные туры оценены (без бронирований - тоже да)
+        'has_reviewed_all_tours': counts.get('unreviewed_booking_count', 0) == 0,
+    }
+
+
+def get_profile_summary(user_id):
+    """Сводка профиля из кэша; при промахе или смене поколения - из БД."""
+    key = _user_key(user_id)
+    cached = cache.get_many([GENERATION_KEY, key])
+    generation = _current_generation(cached)
+    stored = cached.get(key)
+    if stored is not None and stored[0] == generation:
+        summary = stored[1]
+        return {**summary, 'has_recent_bookings': _has_recent_bookings(summary['bookings'], timezone.now())}
+    summary = build_profile_summary(user_id)
+    cache.set(key, (generation, summary), get_summary_ttl())
+    return summary
+
+
+def invalidate_profile_summary(*user_ids):
+    """Бронирования или отзывы этих пользователей изменились."""
+    cache.delete_many([_user_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def invalidate_all_profile_summaries():
+    """Туры изменились (в том числе массовым update()): сводки всех пользователей устарели."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time() * 1000), None)
@@ -0,0 +1,113 @@
+"""
+Рейтинг гида по отзывам на туры, которые он ведёт (назначение GuideTour или
+слоты тура с этим гидом).
+
+Guide.review_count / review_sum - денормализованные число и сумма оценок таких
+отзывов, Guide.rating - байесовское среднее:
+
+    rating = (C * m + сумма) / (C + число),
+
+где m (GUIDE_RATING_PRIOR_MEAN) - априорная оценка, C (GUIDE_RATING_PRIOR_WEIGHT) -
+её вес в «отзывах». Гид с парой пятёрок не обгонит гида с сотней отзывов
+со средним 4.8. Без отзывов рейтинг 0 - гид в конце списка лучших.
+
+Отзыв (main/signals.py) меняет агрегаты всех гидов тура одним UPDATE с разницей,
+без пересчёта по всем отзывам. Назначение гида на тур или снятие с него
+пересчитывает только этого гида - после коммита и один раз за транзакцию.
+Полный пересчёт - один UPDATE с коррелированными подзапросами
+(recompute_guide_ratings, команда recompute_guide_ratings).
+"""
+import threading
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Func, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+
+from .homepage import invalidate_homepage_snapshot
+from .models import Guide, GuideTour, Review, Slot
+
+_pending = threading.local()
+
+
+def prior():
+    """(m, C): априорная оценка и её вес."""
+    return (
+        float(getattr(settings, 'GUIDE_RATING_PRIOR_MEAN', 3.5)),
+        float(getattr(settings, 'GUIDE_RATING_PRIOR_WEIGHT', 10)),
+    )
+
+
+def smoothed_rating(review_sum, review_count):
+    """Выражение байесовского рейтинга по выражениям суммы и числа оценок."""
+    mean, weight = prior()
+    return Case(
+        When(Exact(review_count, 0), then=Value(0.0)),
+        default=(Value(weight * mean) + review_sum) / (Value(weight) + review_count),
+        output_field=models.FloatField(),
+    )
+
+
+def guides_of_tour(tour_id):
+    """Гиды, которым засчитываются отзывы на тур: назначенные и ведущие его слоты."""
+    return Guide.objects.filter(
+        Q(pk__in=GuideTour.objects.filter(tour_id=tour_id).values('guide_id'))
+        | Q(pk__in=Slot.objects.filter(tour_id=tour_id).values('guide_id'))
+    )
+
+
+def apply_review_delta(tour_id, rating_delta, count_delta):
+    """Добавляет изменение суммы и числа оценок отзывов тура всем его гидам одним UPDATE."""
+    # В SET справа используются старые значения полей - рейтинг считается по уже новым суммам
+    review_sum = F('review_sum') + rating_delta
+    review_count = F('review_count') + count_delta
+    return guides_of_tour(tour_id).update(
+        review_sum=review_sum,
+        review_count=review_count,
+        rating=smoothed_rating(review_sum, review_count),
+    )
+
+
+def _review_aggregate(guide_ref, function):
+    """Подзапрос: COUNT/SUM оценок отзывов на туры гида (без GROUP BY - одна строка)."""
+    reviews = Review.objects.filter(
+        Q(tour_id__in=GuideTour.objects.filter(guide_id=guide_ref).values('tour_id'))
+        | Q(tour_id__in=Slot.objects.filter(guide_id=guide_ref).values('tour_id'))
+    ).order_by()
+    aggregate = reviews.annotate(value=Func(F('rating'), function=function)).values('value')[:1]
+    return Coalesce(Subquery(aggregate, output_field=models.IntegerField()), 0)
+
+
+def recompute_guide_ratings(queryset=None):
+    """Полный пересчёт агрегатов и рейтинга гидов одним UPDATE; возвращает число гидов."""
+    queryset = Guide.objects.all() if queryset is None else queryset
+    review_sum = _review_aggregate(OuterRef(OuterRef('pk')), 'SUM')
+    review_count = _review_aggregate(OuterRef(OuterRef('pk')), 'COUNT')
+    return queryset.update(
+        review_sum=review_sum,
+        review_count=review_count,
+        rating=smoothed_rating(review_sum, review_count),
+    )
+
+
+def schedule_guide_recompute(*guide_ids):
+    """
+    Пересчитать гидов после коммита: набор их туров изменился. Вызовы в одной
+    транзакции (каскадное удаление слотов тура) сливаются: первый обработчик
+    после коммита пересчитывает всех накопленных гидов одним UPDATE, остальные
+    ничего не делают. После отката гиды пересчитаются со следующим коммитом - лишняя,
+    но безвредная работа.
+    """
+    pending = _pending.__dict__.setdefault('ids', set())
+    pending.update(guide_id for guide_id in guide_ids if guide_id is not None)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    guide_ids = _pending.__dict__.get('ids')
+    if guide_ids:
+        _pending.ids = set()
+        recompute_guide_ratings(Guide.objects.filter(pk__in=guide_ids))
+        # UPDATE не отправляет сигналы, а рейтинг виден в «лучших гидах» главной
+        invalidate_homepage_snapshot()
@@ -0,0 +1,223 @@
+"""
+Полнотекстовый поиск по турам (название, описание, местоположение) с ранжированием
+и по велосипедам (тип, местоположение - колонка Bike.search_text).
+
+SQLite: виртуальные таблицы FTS5 с внешним содержимым (content='main_tour'/'main_bike'),
+синхронизируются триггерами на INSERT/UPDATE/DELETE, поэтому их не обходят ни save()/delete(),
+ни массовые update() и bulk_create(). PostgreSQL: GIN-индексы по выражениям tsvector.
+На остальных бэкендах поиск откатывается к icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+TOUR_FTS_TABLE = 'main_tour_fts'
+
+# Веса колонок: совпадение в названии важнее, чем в местоположении и описании
+SQLITE_RANK = f'bm25({TOUR_FTS_TABLE}, 10.0, 1.0, 5.0)'
+
+SQLITE_SETUP_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TOUR_FTS_TABLE} USING fts5(
+        name, description, location,
+        content='main_tour', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TOUR_FTS_TABLE}_ai AFTER INSERT ON main_tour BEGIN
+        INSERT INTO {TOUR_FTS_TABLE}(rowid, name, description, location)
+        VALUES (new.id, new.name, new.description, new.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TOUR_FTS_TABLE}_ad AFTER DELETE ON main_tour BEGIN
+        INSERT INTO {TOUR_FTS_TABLE}({TOUR_FTS_TABLE}, rowid, name, description, location)
+        VALUES ('delete', old.id, old.name, old.description, old.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TOUR_FTS_TABLE}_au AFTER UPDATE OF name, description, location ON main_tour BEGIN
+        INSERT INTO {TOUR_FTS_TABLE}({TOUR_FTS_TABLE}, rowid, name, description, location)
+        VALUES ('delete', old.id, old.name, old.description, old.location);
+        INSERT INTO {TOUR_FTS_TABLE}(rowid, name, description, location)
+        VALUES (new.id, new.name, new.description, new.location);
+    END""",
+]
+SQLITE_TEARDOWN_SQL = [
+    f'DROP TRIGGER IF EXISTS {TOUR_FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {TOUR_FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {TOUR_FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {TOUR_FTS_TABLE}',
+]
+
+# Выражение должно совпадать с индексом, иначе PostgreSQL его не использует
+POSTGRES_VECTOR = (
+    "(setweight(to_tsvector('russian', coalesce(main_tour.name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(main_tour.location, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(main_tour.description, '')), 'C'))"
+)
+POSTGRES_SETUP_SQL = [
+    f'CREATE INDEX IF NOT EXISTS main_tour_search_gin ON main_tour USING GIN ({POSTGRES_VECTOR})',
+]
+POSTGRES_TEARDOWN_SQL = ['DROP INDEX IF EXISTS main_tour_search_gin']
+
+# Велосипеды: одна колонка search_text ("обычный standard центральный парк"), без ранжирования
+BIKE_FTS_TABLE = 'main_bike_fts'
+
+BIKE_SQLITE_SETUP_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {BIKE_FTS_TABLE} USING fts5(
+        search_text, content='main_bike', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {BIKE_FTS_TABLE}_ai AFTER INSERT ON main_bike BEGIN
+        INSERT INTO {BIKE_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {BIKE_FTS_TABLE}_ad AFTER DELETE ON main_bike BEGIN
+        INSERT INTO {BIKE_FTS_TABLE}({BIKE_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {BIKE_FTS_TABLE}_au AFTER UPDATE OF search_text ON main_bike BEGIN
+        INSERT INTO {BIKE_FTS_TABLE}({BIKE_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text);
+        INSERT INTO {BIKE_FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text);
+    END""",
+]
+BIKE_SQLITE_TEARDOWN_SQL = [
+    f'DROP TRIGGER IF EXISTS {BIKE_FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {BIKE_FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {BIKE_FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {BIKE_FTS_TABLE}',
+]
+# 'simple' - без стемминга: в тексте названия типов и мест, а не фразы
+BIKE_POSTGRES_VECTOR = "to_tsvector('simple', main_bike.search_text)"
+BIKE_POSTGRES_SETUP_SQL = [
+    f'CREATE INDEX IF NOT EXISTS main_bike_search_gin ON main_bike USING GIN ({BIKE_POSTGRES_VECTOR})',
+]
+BIKE_POSTGRES_TEARDOWN_SQL = ['DROP INDEX IF EXISTS main_bike_search_gin']
+
+
+def _install_index(conn, fts_table, sqlite_sql, postgres_sql, rebuild):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{fts_table}_%'],
+            )
+            triggers_missing = cursor.fetchone()[0] < 3
+            for statement in sqlite_sql:
+                cursor.execute(statement)
+            if rebuild or triggers_missing:
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        elif conn.vendor == 'postgresql':
+            for statement in postgres_sql:
+                cursor.execute(statement)
+
+
+def _uninstall_index(conn, sqlite_sql, postgres_sql):
+    statements = {'sqlite': sqlite_sql, 'postgresql': postgres_sql}.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install_search_index(using_connection=None, rebuild=False):
+    """
+    Создаёт (идемпотентно) поисковый индекс туров для текущего бэкенда.
+    Вызывается из миграции и после каждой migrate: пересоздание таблицы main_tour
+    в SQLite удаляет триггеры, поэтому при их отсутствии индекс перестраивается.
+    """
+    _install_index(using_connection or connection, TOUR_FTS_TABLE, SQLITE_SETUP_SQL, POSTGRES_SETUP_SQL, rebuild)
+
+
+def uninstall_search_index(using_connection=None):
+    """Удаляет поисковый индекс туров (обратная операция для миграции)."""
+    _uninstall_index(using_connection or connection, SQLITE_TEARDOWN_SQL, POSTGRES_TEARDOWN_SQL)
+
+
+def install_bike_search_index(using_connection=None, rebuild=False):
+    """То же для индекса велосипедов по Bike.search_text."""
+    _install_index(
+        using_connection or connection, BIKE_FTS_TABLE, BIKE_SQLITE_SETUP_SQL, BIKE_POSTGRES_SETUP_SQL, rebuild,
+    )
+
+
+def uninstall_bike_search_index(using_connection=None):
+    _uninstall_index(using_connection or connection, BIKE_SQLITE_TEARDOWN_SQL, BIKE_POSTGRES_TEARDOWN_SQL)
+
+
+def _terms(query):
+    """Разбивает пользовательский запрос на слова (без спецсимволов FTS)."""
+    return re.findall(r'\w+', query.lower())
+
+
+def build_fts_query(query):
+    """Строит выражение MATCH для FTS5: все слова обязательны, каждое ищется как префикс."""
+    terms = _terms(query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_tours(queryset, query):
+    """
+    Фильтрует queryset туров по полнотекстовому запросу и сортирует по релевантности.
+    Добавляет аннотацию search_rank (больше - релевантнее).
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset
+
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        # Таблица FTS присоединяется к main_tour один раз: MATCH выполняется одним проходом
+        # по индексу, а bm25() считается для каждой найденной строки в том же проходе.
+        # Коррелированный подзапрос в SELECT повторял бы MATCH для каждой строки тура.
+        return queryset.extra(
+            select={'search_rank': f'-{SQLITE_RANK}'},
+            tables=[TOUR_FTS_TABLE],
+            where=[f'{TOUR_FTS_TABLE} MATCH %s', f'{TOUR_FTS_TABLE}.rowid = main_tour.id'],
+            params=[build_fts_query(query)],
+        ).order_by('-search_rank', '-created_at')
+
+    if vendor == 'postgresql':
+        tsquery = "to_tsquery('russian', %s)"
+        pg_query = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.filter(
+            RawSQL(f'{POSTGRES_VECTOR} @@ {tsquery}', [pg_query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({POSTGRES_VECTOR}, {tsquery})', [pg_query], output_field=FloatField())
+        ).order_by('-search_rank', '-created_at')
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term)
+    return queryset.filter(condition)
+
+
+def search_bike_ids(query):
+    """
+    Подзапрос id велосипедов, в search_text которых есть все слова запроса (как префиксы),
+    для фильтров вида bike_id__in=...; None, если в запросе нет слов.
+    """
+    terms = _terms(query)
+    if not terms:
+        return None
+
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        return RawSQL(
+            f'SELECT rowid FROM {BIKE_FTS_TABLE} WHERE {BIKE_FTS_TABLE} MATCH %s', [build_fts_query(query)],
+        )
+    if vendor == 'postgresql':
+        pg_query = ' & '.join(f'{term}:*' for term in terms)
+        return RawSQL(
+            f"SELECT id FROM main_bike WHERE {BIKE_POSTGRES_VECTOR} @@ to_tsquery('simple', %s)", [pg_query],
+        )
+
+    from .models import Bike
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_text__icontains=term)
+    return Bike.objects.filter(condition).values('id')
+
+
+class TourSearchFilter(BaseFilterBackend):
+    """Фильтр DRF: ?search=... через полнотекстовый индекс с сортировкой по релевантности."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_tours(queryset, query)
@@ -2,13 +2,14 @@
 Сериализаторы для bike tours: преобразование моделей в JSON и обратно.
 """
 from rest_framework import serializers
-from .models import Bike, Rental, User
+from .models import Bike, Rental, Tour, User
 
 class BikeSerializer(serializers.ModelSerializer):
     """Пример докстринга для сериализатора. Добавь аналогично ко всем классам и методам."""
     class Meta:
         model = Bike
-        fields = '__all__'
+        # search_text - служебное поле поискового индекса
+        exclude = ['search_text']
 
 class RentalSerializer(serializers.ModelSerializer):
     """Пример докстринга для сериализатора. Добавь аналогично ко всем классам и методам."""
@@ -20,4 +21,14 @@ class UserSerializer(serializers.ModelSerializer):
     """Пример докстринга для сериализатора. Добавь аналогично ко всем классам и методам."""
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'role'] 
\ No newline at end of file
+        fields = ['id', 'username', 'email', 'role']
+        read_only_fields = ['role']
+
+class TourSerializer(serializers.ModelSerializer):
+    """Тур для API; search_rank заполняется только при полнотекстовом поиске."""
+    search_rank = serializers.FloatField(read_only=True, required=False)
+
+    class Meta:
+        model = Tour
+        fields = ['id', 'name', 'description', 'duration', 'price', 'location', 'image',
+                  'avg_rating', 'review_count', 'is_active', 'created_at', 'search_rank']
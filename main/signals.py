@@ -0,0 +1,334 @@
+"""
+Сигналы для bike tours: поддержка денормализованных полей в актуальном состоянии
+и настройка соединений с БД.
+"""
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .capabilities import forget_user_capabilities, invalidate_all_groups, invalidate_user_groups
+from .geo import invalidate_location_index
+from .homepage import invalidate_homepage_snapshot
+from .profile_summary import invalidate_all_profile_summaries, invalidate_profile_summary
+from .models import Bike, Booking, Guide, GuideTour, Location, Review, Slot, Tour, User
+from .ratings import (
+    apply_review_delta as apply_guide_review_delta, guides_of_tour, recompute_guide_ratings,
+    schedule_guide_recompute,
+)
+from .search import BIKE_FTS_TABLE, TOUR_FTS_TABLE, install_bike_search_index, install_search_index
+from .thumbnails import IMAGE_SPECS, needs_processing, schedule_thumbnails
+from .tour_cache import invalidate_tour_catalog, invalidate_tour_detail
+
+
+def _loaded_values(instance, *attnames):
+    """
+    Значения полей, загруженных вместе с объектом; None - объект не из БД или поле
+    отложено (only()/defer()): обращение к нему в post_init запросило бы БД и
+    снова вызвало бы post_init.
+    """
+    if instance.pk is None:
+        return None
+    values = instance.__dict__
+    if any(attname not in values for attname in attnames):
+        return None
+    return tuple(values[attname] for attname in attnames)
+
+
+@receiver(post_init, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Запоминает сохранённые тур и оценку, чтобы потом посчитать разницу без лишнего запроса."""
+    instance._stored_state = _loaded_values(instance, 'tour_id', 'rating')
+
+
+def _apply_review_delta(tour_id, rating_delta, count_delta):
+    """Разница оценок отзыва - в агрегаты тура и всех его гидов."""
+    Tour.apply_review_delta(tour_id, rating_delta, count_delta)
+    apply_guide_review_delta(tour_id, rating_delta, count_delta)
+
+
+@receiver(post_save, sender=Review)
+def update_tour_rating_on_save(sender, instance, created, **kwargs):
+    """Обновляет avg_rating/review_count тура и рейтинг его гидов при создании или изменении отзыва."""
+    previous = None if created else getattr(instance, '_stored_state', None)
+    if created:
+        _apply_review_delta(instance.tour_id, instance.rating, 1)
+    elif previous is None:
+        # Прежние тур и оценка не загружались - агрегаты тура и гидов пересчитываются полностью
+        Tour.recompute_review_stats(Tour.objects.filter(pk=instance.tour_id))
+        recompute_guide_ratings(guides_of_tour(instance.tour_id))
+    else:
+        old_tour_id, old_rating = previous
+        if old_tour_id != instance.tour_id:
+            _apply_review_delta(old_tour_id, -old_rating, -1)
+            _apply_review_delta(instance.tour_id, instance.rating, 1)
+            # Отзыв ушёл со страницы прежнего тура
+            invalidate_tour_detail(old_tour_id, 'reviews')
+        elif old_rating != instance.rating:
+            _apply_review_delta(instance.tour_id, instance.rating - old_rating, 0)
+    instance._stored_state = (instance.tour_id, instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def update_tour_rating_on_delete(sender, instance, **kwargs):
+    """Убирает удалённый отзыв из агрегатов тура и его гидов."""
+    tour_id, rating = getattr(instance, '_stored_state', None) or (instance.tour_id, instance.rating)
+    _apply_review_delta(tour_id, -rating, -1)
+
+
+@receiver(post_init, sender=Slot)
+def remember_slot_state(sender, instance, **kwargs):
+    """Сохранённые тур и гид слота: их смена меняет набор туров гида."""
+    instance._stored_pair = _loaded_values(instance, 'tour_id', 'guide_id')
+
+
+@receiver(pre_save, sender=Slot)
+def load_slot_state(sender, instance, raw=False, **kwargs):
+    """Слот загружен без тура или гида (only()/defer()): прежняя пара читается перед сохранением."""
+    if raw or instance.pk is None or getattr(instance, '_stored_pair', None) is not None:
+        return
+    instance._stored_pair = Slot.objects.filter(pk=instance.pk).values_list('tour_id', 'guide_id').first()
+
+
+@receiver(post_save, sender=Slot)
+def update_guide_rating_on_slot_save(sender, instance, created, raw=False, **kwargs):
+    """Новый слот или смена гида/тура: отзывы засчитываются гидам по их слотам."""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_stored_pair', None)
+    current = (instance.tour_id, instance.guide_id)
+    if created or (previous is not None and previous != current):
+        schedule_guide_recompute(instance.guide_id, previous[1] if previous else None)
+    instance._stored_pair = current
+
+
+@receiver(post_save, sender=GuideTour)
+@receiver(post_delete, sender=GuideTour)
+@receiver(post_delete, sender=Slot)
+def update_guide_rating_on_assignment(sender, instance, raw=False, **kwargs):
+    """Гида назначили на тур или сняли с него - пересчитываем его рейтинг после коммита."""
+    if not raw:
+        schedule_guide_recompute(instance.guide_id)
+
+
+@receiver(m2m_changed, sender=GuideTour)
+def update_guide_rating_on_guides_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    """guide.tours.add()/remove()/clear() и tour.guides.* - без post_save для GuideTour."""
+    if action == 'pre_clear' and isinstance(instance, Tour):
+        # После clear() уже не узнать, какие гиды были у тура
+        instance._cleared_guide_ids = list(instance.guides.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if isinstance(instance, Guide):
+            schedule_guide_recompute(instance.pk)
+        elif action == 'post_clear':
+            schedule_guide_recompute(*getattr(instance, '_cleared_guide_ids', []))
+        else:
+            schedule_guide_recompute(*(pk_set or []))
+
+
+@receiver([post_save, post_delete], sender=Tour)
+@receiver([post_save, post_delete], sender=Guide)
+@receiver([post_save, post_delete], sender=GuideTour)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Booking)
+def reset_homepage_snapshot(sender, **kwargs):
+    """Любое изменение данных, показанных на главной, помечает её снимок устаревшим."""
+    invalidate_homepage_snapshot()
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=Review)
+def reset_profile_summary(sender, instance, **kwargs):
+    """Бронирования и отзывы в сводке профиля пользователя (main/profile_summary.py)."""
+    invalidate_profile_summary(instance.user_id)
+
+
+@receiver(post_init, sender=Tour)
+def remember_tour_summary_fields(sender, instance, **kwargs):
+    """Сохранённые название и цена тура - только они попадают в сводки профилей."""
+    instance._stored_summary_fields = _loaded_values(instance, 'name', 'price')
+
+
+@receiver(post_save, sender=Tour)
+def reset_profile_summaries_on_tour_change(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Названия и цены туров в сводках профилей: поколение сдвигается, только если
+    они изменились. У нового тура бронирований и отзывов ещё нет, а при удалении
+    тура каскадно удалённые Booking и Review сбрасывают сводки своих пользователей.
+    """
+    previous = getattr(instance, '_stored_summary_fields', None)
+    current = (instance.name, instance.price)
+    instance._stored_summary_fields = current
+    if created or (update_fields is not None and not {'name', 'price'} & set(update_fields)):
+        return
+    # Прежние значения не загружались (only()/defer()) - считаем, что изменились
+    if previous is None or previous != current:
+        invalidate_all_profile_summaries()
+
+
+@receiver([post_save, post_delete], sender=Tour)
+def reset_tour_detail_on_tour_change(sender, instance, **kwargs):
+    """Изменение тура сбрасывает его страницу и списки похожих туров у остальных."""
+    invalidate_tour_detail(instance.pk, 'info', 'related')
+    invalidate_tour_catalog()
+
+
+@receiver([post_save, post_delete], sender=Review)
+def reset_tour_detail_on_review_change(sender, instance, **kwargs):
+    """Отзывы и рейтинг тура (перенос отзыва на другой тур - в update_tour_rating_on_save)."""
+    invalidate_tour_detail(instance.tour_id, 'reviews')
+
+
+@receiver([post_save, post_delete], sender=Slot)
+def reset_tour_detail_on_slot_change(sender, instance, **kwargs):
+    """Расписание ближайших свободных слотов тура."""
+    invalidate_tour_detail(instance.tour_id, 'schedule')
+
+
+@receiver([post_save, post_delete], sender=GuideTour)
+def reset_tour_detail_on_guide_assignment(sender, instance, **kwargs):
+    """Список гидов тура."""
+    invalidate_tour_detail(instance.tour_id, 'info')
+
+
+@receiver(m2m_changed, sender=GuideTour)
+def reset_tour_detail_on_guides_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    """guide.tours.add()/remove()/clear() и tour.guides.* не отправляют post_save для GuideTour."""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if isinstance(instance, Tour):
+        tour_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # После clear() уже не узнать, какие туры были у гида
+        instance._cleared_tour_ids = list(instance.tours.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        tour_ids = getattr(instance, '_cleared_tour_ids', [])
+    else:
+        tour_ids = pk_set or []
+    for tour_id in tour_ids:
+        invalidate_tour_detail(tour_id, 'info')
+
+
+# Поля пользователя, из которых строятся имена гидов и авторов отзывов на странице тура
+USER_NAME_FIELDS = ('first_name', 'last_name', 'username')
+
+
+@receiver(post_init, sender=User)
+def remember_user_names(sender, instance, **kwargs):
+    """Сохранённые имя, фамилия и логин: их смена меняет страницы туров пользователя."""
+    instance._stored_names = _loaded_values(instance, *USER_NAME_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def reset_tour_details_on_user_rename(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Имена гидов (часть info) и авторов отзывов (часть reviews) на страницах туров.
+    Сбрасываются только туры, которые пользователь ведёт или оценил; last_login при
+    входе и прочие поля ничего не сбрасывают.
+    """
+    previous = getattr(instance, '_stored_names', None)
+    current = tuple(getattr(instance, name) for name in USER_NAME_FIELDS)
+    instance._stored_names = current
+    if created or raw or previous == current:
+        return
+    if update_fields is not None and not set(USER_NAME_FIELDS) & set(update_fields):
+        return
+    for tour_id in GuideTour.objects.filter(guide__user=instance).values_list('tour_id', flat=True).distinct():
+        invalidate_tour_detail(tour_id, 'info')
+    for tour_id in Review.objects.filter(user=instance).values_list('tour_id', flat=True).distinct():
+        invalidate_tour_detail(tour_id, 'reviews')
+    # Логины лучших гидов и авторов последних бронирований на главной
+    invalidate_homepage_snapshot()
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """
+    SQLite пересоздаёт таблицы main_tour и main_bike при многих AlterField/AddField и теряет триггеры FTS.
+    После migrate восстанавливаем их (и перестраиваем индекс, если триггеры пропали).
+    """
+    if sender.name != 'main':
+        return
+    conn = connections[using]
+    tables = conn.introspection.table_names()
+    if TOUR_FTS_TABLE in tables:
+        install_search_index(conn)
+    if BIKE_FTS_TABLE in tables:
+        install_bike_search_index(conn)
+
+
+@receiver(post_save, sender=Location)
+def update_bike_search_text(sender, instance, created, raw=False, **kwargs):
+    """Название локации входит в Bike.search_text: обновляем её велосипеды (по UPDATE на тип)."""
+    if created or raw:
+        return
+    for bike_type, _ in Bike.BIKE_TYPES:
+        search_text = Bike.build_search_text(bike_type, instance.name)
+        Bike.objects.filter(location=instance, type=bike_type).exclude(search_text=search_text).update(
+            search_text=search_text,
+        )
+
+
+@receiver([post_save, post_delete], sender=Location)
+def reset_location_index(sender, **kwargs):
+    """Сетка для поиска ближайших локаций (main/geo.py) пересоберётся во всех процессах."""
+    invalidate_location_index()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    """user.groups.add()/remove()/clear() и group.user_set.*: группы для прав (main/capabilities.py)."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_user_groups(instance.pk)
+        forget_user_capabilities(instance)
+    elif action == 'post_clear':
+        # Участники группы после clear() уже неизвестны
+        invalidate_all_groups()
+    else:
+        invalidate_user_groups(*(pk_set or []))
+
+
+@receiver([post_save, post_delete], sender=Group)
+def reset_all_user_groups(sender, **kwargs):
+    """Переименование или удаление группы меняет права всех её участников."""
+    invalidate_all_groups()
+
+
+@receiver(post_save, sender=User)
+def reset_user_capabilities(sender, instance, **kwargs):
+    """Роль или is_superuser могли измениться: набор прав на этом объекте пересчитается."""
+    forget_user_capabilities(instance)
+
+
+@receiver(post_save, sender=Tour)
+@receiver(post_save, sender=User)
+def schedule_image_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Новое изображение: сбрасываем устаревшие миниатюры и ставим генерацию в очередь фоновых задач."""
+    if raw:
+        return
+    deferred = instance.get_deferred_fields()
+    for spec in IMAGE_SPECS.values():
+        if spec.model != sender._meta.label or spec.field in deferred:
+            continue
+        if update_fields is not None and spec.field not in update_fields:
+            continue
+        if not needs_processing(instance, spec):
+            continue
+        if getattr(instance, spec.manifest_field):
+            sender.objects.filter(pk=instance.pk).update(**{spec.manifest_field: {}})
+            setattr(instance, spec.manifest_field, {})
+        schedule_thumbnails(spec, instance.pk)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Применяет settings.SQLITE_PRAGMAS к каждому новому соединению SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
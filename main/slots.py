@@ -0,0 +1,75 @@
+"""
+Генерация расписания слотов по правилу повторения.
+
+Существующие слоты окна читаются одним запросом, разница считается в памяти,
+новые слоты вставляются через bulk_create(ignore_conflicts=True). Уникальное
+ограничение (tour, guide, datetime) страхует от дублей при параллельной генерации.
+"""
+import datetime
+from dataclasses import dataclass, field
+
+from django.utils import timezone
+
+from .models import Slot
+from .ratings import schedule_guide_recompute
+from .tour_cache import invalidate_tour_detail
+
+ALL_WEEKDAYS = frozenset(range(7))
+
+
+@dataclass
+class SlotRecurrence:
+    """Правило повторения: дни недели (0 - понедельник), время начала, диапазон дат, гиды и велосипед."""
+    start_date: datetime.date
+    end_date: datetime.date
+    times: list
+    guides: list
+    weekdays: frozenset = field(default=ALL_WEEKDAYS)
+    bike: object = None
+
+    def datetimes(self):
+        """Все моменты начала слотов по правилу (aware, в текущем часовом поясе)."""
+        tz = timezone.get_current_timezone()
+        day = self.start_date
+        while day <= self.end_date:
+            if day.weekday() in self.weekdays:
+                for start in sorted(self.times):
+                    yield timezone.make_aware(datetime.datetime.combine(day, start), tz)
+            day += datetime.timedelta(days=1)
+
+
+def generate_slots(tours, rule, batch_size=1000):
+    """
+    Создаёт недостающие слоты для всех туров и гидов по правилу.
+    Возвращает количество созданных слотов.
+    """
+    tours = list(tours)
+    moments = list(rule.datetimes())
+    if not tours or not rule.guides or not moments:
+        return 0
+
+    guide_ids = [getattr(guide, 'pk', guide) for guide in rule.guides]
+    tour_ids = [getattr(tour, 'pk', tour) for tour in tours]
+    existing = set(
+        Slot.objects.filter(
+            tour_id__in=tour_ids,
+            guide_id__in=guide_ids,
+            datetime__gte=min(moments),
+            datetime__lte=max(moments),
+        ).values_list('tour_id', 'guide_id', 'datetime')
+    )
+    bike_id = getattr(rule.bike, 'pk', rule.bike)
+    new_slots = [
+        Slot(tour_id=tour_id, guide_id=guide_id, datetime=moment, bike_id=bike_id)
+        for tour_id in tour_ids
+        for guide_id in guide_ids
+        for moment in moments
+        if (tour_id, guide_id, moment) not in existing
+    ]
+    Slot.objects.bulk_create(new_slots, batch_size=batch_size, ignore_conflicts=True)
+    # bulk_create не отправляет post_save
+    for tour_id in {slot.tour_id for slot in new_slots}:
+        invalidate_tour_detail(tour_id, 'schedule')
+    # Слоты засчитывают гидам отзывы на туры (main/ratings.py)
+    schedule_guide_recompute(*{slot.guide_id for slot in new_slots})
+    return len(new_slots)
@@ -0,0 +1,239 @@
+"""
+Очередь фоновых задач в базе данных - без внешних брокеров.
+
+Задача - строка модели Task: путь к функции, помеченной @task, и JSON-аргументы.
+enqueue() пишет строку в той же транзакции, что и изменения запроса: задача
+появляется в очереди только вместе с ними и не теряется при падении процесса.
+Воркер (команда run_tasks) забирает задачи условным UPDATE status='queued' ->
+'running' - способ одинаково работает на SQLite и PostgreSQL, и одну задачу не
+возьмут два воркера. Функция выполняется в транзакции; при исключении задача
+возвращается в очередь с экспоненциальной задержкой, пока не кончатся попытки.
+Задачи, зависшие в 'running' дольше TASK_LEASE_SECONDS (воркер упал), снова
+ставятся в очередь.
+
+TASKS_EAGER=True - задачи выполняются сразу после коммита в текущем процессе
+(разработка без воркера, команды управления).
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_ATTEMPTS = 5
+ERROR_LENGTH = 5000
+
+
+class PermanentTaskError(Exception):
+    """Ошибка, которую бессмысленно повторять: задача сразу помечается как failed."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Число попыток и задержка перед повтором: retry_delay * backoff ** (попытка - 1) секунд."""
+    max_attempts: int = 3
+    retry_delay: float = 10.0
+    backoff: float = 2.0
+
+    def delay(self, attempt):
+        return timedelta(seconds=self.retry_delay * self.backoff ** (attempt - 1))
+
+
+def task(func=None, *, max_attempts=3, retry_delay=10.0, backoff=2.0):
+    """
+    Помечает функцию как задачу очереди. Аргументы - только именованные и
+    JSON-совместимые, результат тоже сохраняется в JSON.
+
+        @task(max_attempts=5)
+        def send_report(user_id): ...
+
+        enqueue(send_report, user_id=user.pk)
+    """
+    def decorator(function):
+        function.retry_policy = RetryPolicy(max_attempts, retry_delay, backoff)
+        function.task_name = f'{function.__module__}.{function.__qualname__}'
+        return function
+    return decorator(func) if func is not None else decorator
+
+
+def resolve(name):
+    """Функция задачи по пути; выполняются только функции с @task."""
+    try:
+        function = import_string(name)
+    except ImportError as exc:
+        raise PermanentTaskError(f'Обработчик {name} не найден') from exc
+    if not hasattr(function, 'retry_policy'):
+        raise PermanentTaskError(f'{name} не помечен @task')
+    return function
+
+
+def enqueue(function, *, delay=None, **kwargs):
+    """Ставит задачу в очередь (в текущей транзакции) и возвращает строку Task."""
+    if not hasattr(function, 'retry_policy'):
+        raise TypeError(f'{function!r} не помечен @task')
+    run_at = timezone.now() + delay if delay else timezone.now()
+    queued = Task.objects.create(
+        name=function.task_name, payload=kwargs,
+        max_attempts=function.retry_policy.max_attempts, run_at=run_at,
+    )
+    if getattr(settings, 'TASKS_EAGER', False) and not delay:
+        transaction.on_commit(lambda: run_task(queued.pk))
+    return queued
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker_id, task_id=None):
+    """Забирает следующую готовую задачу (или задачу task_id); None - очередь пуста."""
+    now = timezone.now()
+    queued = Task.objects.filter(status=Task.QUEUED)
+    for _ in range(CLAIM_ATTEMPTS):
+        if task_id is None:
+            candidate = queued.filter(run_at__lte=now).order_by('run_at', 'id').first()
+        else:
+            candidate = queued.filter(pk=task_id).first()
+        if candidate is None:
+            return None
+        claimed = queued.filter(pk=candidate.pk).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            # Поля, изменённые UPDATE, - без повторного чтения строки
+            candidate.status, candidate.locked_by, candidate.locked_at = Task.RUNNING, worker_id, now
+            candidate.attempts += 1
+            return candidate
+        if task_id is not None:
+            return None
+        # Задачу перехватил другой воркер - берём следующую
+    return None
+
+
+def execute(claimed):
+    """Выполняет взятую задачу и записывает результат, повтор или ошибку."""
+    started = time.perf_counter()
+    policy = RetryPolicy(max_attempts=claimed.max_attempts)
+    try:
+        function = resolve(claimed.name)
+        policy = function.retry_policy
+        with transaction.atomic():
+            result = function(**claimed.payload)
+    except Exception as exc:
+        _record_failure(claimed, exc, policy)
+        return False
+    try:
+        Task.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by).update(
+            status=Task.SUCCEEDED, result=result, last_error='', finished_at=timezone.now(),
+        )
+    except TypeError as exc:
+        _record_failure(claimed, PermanentTaskError(f'Результат не сериализуется в JSON: {exc}'), policy)
+        return False
+    logger.info('Задача #%s %s выполнена за %.1f мс', claimed.pk, claimed.name, (time.perf_counter() - started) * 1000)
+    return True
+
+
+def _record_failure(claimed, exc, policy):
+    error = ''.join(traceback.format_exception(exc))[-ERROR_LENGTH:]
+    now = timezone.now()
+    queryset = Task.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by)
+    if isinstance(exc, PermanentTaskError) or claimed.attempts >= claimed.max_attempts:
+        queryset.update(status=Task.FAILED, last_error=error, finished_at=now)
+        logger.error('Задача #%s %s завершилась ошибкой после %s попыток: %s',
+                     claimed.pk, claimed.name, claimed.attempts, exc)
+        return
+    run_at = now + policy.delay(claimed.attempts)
+    queryset.update(status=Task.QUEUED, last_error=error, run_at=run_at, locked_by='', locked_at=None)
+    logger.warning('Задача #%s %s: ошибка (попытка %s из %s), повтор в %s: %s',
+                   claimed.pk, claimed.name, claimed.attempts, claimed.max_attempts, run_at, exc)
+
+
+def run_task(task_id, worker_id='eager'):
+    """Немедленное выполнение одной задачи (TASKS_EAGER и повтор из админки)."""
+    claimed = claim(worker_id, task_id=task_id)
+    return execute(claimed) if claimed is not None else None
+
+
+def requeue_stale(lease_seconds=None):
+    """Возвращает в очередь задачи, которые слишком долго числятся выполняющимися."""
+    lease_seconds = lease_seconds or getattr(settings, 'TASK_LEASE_SECONDS', 600)
+    now = timezone.now()
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - timedelta(seconds=lease_seconds))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, last_error='Истёк срок выполнения (воркер остановлен?)', finished_at=now,
+    )
+    requeued = stale.update(status=Task.QUEUED, locked_by='', locked_at=None, run_at=now)
+    return requeued, failed
+
+
+def retry(task_ids):
+    """Снова ставит завершившиеся ошибкой задачи в очередь с обнулённым счётчиком попыток."""
+    return Task.objects.filter(pk__in=task_ids, status=Task.FAILED).update(
+        status=Task.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None, locked_by='', locked_at=None,
+    )
+
+
+def stats():
+    """Число задач по статусам и возраст самой старой готовой к запуску задачи (секунды)."""
+    counts = dict(Task.objects.values_list('status').annotate(count=Count('id')).order_by())
+    oldest = Task.objects.filter(status=Task.QUEUED, run_at__lte=timezone.now()).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'counts': {status: counts.get(status, 0) for status, _ in Task.STATUS_CHOICES},
+        'oldest_queued_seconds': round((timezone.now() - oldest).total_seconds(), 1) if oldest else None,
+    }
+
+
+class Worker:
+    """Цикл обработки очереди: забрать задачу, выполнить, при пустой очереди подождать."""
+
+    def __init__(self, worker_id=None, poll_interval=1.0, lease_seconds=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.stopping = False
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self, *args):
+        """Завершить работу после текущей задачи (обработчик SIGINT/SIGTERM)."""
+        self.stopping = True
+
+    def run_once(self):
+        """Одна задача; False - очередь пуста."""
+        close_old_connections()
+        claimed = claim(self.worker_id)
+        if claimed is None:
+            return False
+        if execute(claimed):
+            self.processed += 1
+        else:
+            self.failed += 1
+        return True
+
+    def run(self, max_tasks=None, burst=False):
+        """burst=True - выйти, когда очередь опустеет; max_tasks - выйти после стольких задач."""
+        last_requeue = 0.0
+        while not self.stopping:
+            if time.monotonic() - last_requeue > self.poll_interval * 30:
+                requeue_stale(self.lease_seconds)
+                last_requeue = time.monotonic()
+            if max_tasks is not None and self.processed + self.failed >= max_tasks:
+                break
+            if self.run_once():
+                continue
+            if burst:
+                break
+            time.sleep(self.poll_interval)
+        close_old_connections()
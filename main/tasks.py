@@ -0,0 +1,74 @@
+"""
+Фоновые задачи, которые раньше выполнялись прямо в обработчиках запросов:
+массовые операции над турами и создание слотов на неделю. Ставятся в очередь
+через main.taskqueue.enqueue, выполняются воркером run_tasks.
+Миниатюры изображений - задача generate_thumbnails в main/thumbnails.py.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .homepage import invalidate_homepage_snapshot
+from .models import Tour
+from .profile_summary import invalidate_all_profile_summaries
+from .slots import SlotRecurrence, generate_slots
+from .taskqueue import task
+from .tour_cache import invalidate_all_tour_details
+
+
+# Снижение цены не идемпотентно: повтор после сбоя снизил бы её ещё раз. Поэтому одна
+# попытка (зависшая задача не возвращается в очередь - requeue_stale помечает её
+# ошибкой), а все изменения - в одной транзакции: при ошибке туры остаются как были,
+# и задачу можно осознанно перезапустить вручную.
+@task(max_attempts=1)
+def bulk_tour_actions():
+    """Массовые update() и delete() над турами; результат - число затронутых туров по операциям."""
+    # update() не трогает auto_now - updated_at (версия карточки в кэше фрагментов) задаём сами
+    now = timezone.now()
+    with transaction.atomic():
+        # Деактивируем все туры старше 30 дней
+        old_tours_count = Tour.objects.filter(
+            created_at__lte=now - timezone.timedelta(days=30)
+        ).update(is_active=False, updated_at=now)
+
+        # Снижаем цену коротких туров на 10%
+        short_tours_updated = Tour.objects.filter(duration__lte=2).update(price=F('price') * 0.9, updated_at=now)
+
+        # Удаляем все неактивные туры без отзывов
+        deleted_tours, _ = Tour.objects.filter(is_active=False, reviews__isnull=True).delete()
+
+        moscow_tours_updated = Tour.objects.filter(
+            location__icontains='Москва'
+        ).update(description='Обновлено: Доступна новая система скидок для московских туров!', updated_at=now)
+
+    # update() не отправляет сигналы - сбрасываем снимок главной, страницы туров и сводки профилей вручную
+    invalidate_homepage_snapshot()
+    invalidate_all_tour_details()
+    invalidate_all_profile_summaries()
+    return {
+        'old_tours_count': old_tours_count,
+        'short_tours_updated': short_tours_updated,
+        'deleted_tours': deleted_tours,
+        'moscow_tours_updated': moscow_tours_updated,
+    }
+
+
+@task(max_attempts=5, retry_delay=5)
+def create_week_slots(tour_id, guide_id, time, start_date):
+    """Слоты тура с гидом на 7 дней начиная со start_date (ISO-дата) в time (ЧЧ:ММ)."""
+    start = datetime.date.fromisoformat(start_date)
+    rule = SlotRecurrence(
+        start_date=start,
+        end_date=start + datetime.timedelta(days=6),
+        times=[datetime.time.fromisoformat(time)],
+        guides=[guide_id],
+    )
+    return {'created': generate_slots([tour_id], rule)}
+
+
+@task(max_attempts=1)
+def noop(**payload):
+    """Пустая задача для замера пропускной способности очереди (benchmark_tasks)."""
+    return None
@@ -0,0 +1,19 @@
+"""
+Шаблонные теги для кэша HTML-фрагментов карточек (main/fragments.py).
+"""
+from django import template
+
+from main.fragments import render_fragments as render_cached_fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def render_fragments(items, template_name, kind):
+    """
+    {% render_fragments tours 'main/partials/tour_card.html' 'tour' as cards %}
+    {% for card in cards %}{{ card }}{% endfor %}
+
+    Все фрагменты страницы берутся из кэша одним запросом, рендерятся только отсутствующие.
+    """
+    return render_cached_fragments(items, template_name, kind)
@@ -0,0 +1,31 @@
+"""
+Шаблонные теги для адаптивных изображений: <picture> с WebP/JPEG srcset по manifest
+из main/thumbnails.py.
+"""
+from django import template
+from django.utils.html import format_html
+
+from main.thumbnails import srcset, thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(url, thumbnails, alt='', sizes='100vw', css_class=''):
+    """
+    {% responsive_image tour.image.url tour.image_thumbnails alt=tour.name sizes="(min-width: 992px) 33vw, 100vw" %}
+
+    url - оригинал (если миниатюр ещё нет), thumbnails - manifest из JSON-поля модели
+    или закэшированного словаря. Браузер сам выбирает ширину по sizes и плотности экрана.
+    """
+    if not thumbnails or not thumbnails.get('widths'):
+        return format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', url, css_class, alt)
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        srcset(thumbnails, 'webp'), sizes,
+        thumbnail_url(thumbnails, thumbnails['widths'][0], 'jpeg'), srcset(thumbnails, 'jpeg'), sizes,
+        css_class, alt,
+    )
@@ -0,0 +1,83 @@
+"""
+Помощники для тестов: замер количества SQL-запросов и проверка бюджетов из QUERY_BUDGETS.
+
+Пример:
+    class TourViewsTest(QueryBudgetTestMixin, TestCase):
+        def test_tour_list_budget(self):
+            self.assertViewWithinBudget('tour_list')
+
+        def test_cached_summary(self):
+            with self.assertMaxQueries(0):
+                get_profile_summary(user_id)
+"""
+from contextlib import contextmanager
+
+from django.test import override_settings
+from django.urls import reverse
+
+from .middleware import QueryBudgetExceeded, QueryRecorder, get_query_budget
+
+
+@contextmanager
+def max_queries(limit):
+    """Проверяет, что блок кода выполнил не больше limit SQL-запросов."""
+    recorder = QueryRecorder()
+    with recorder.record():
+        yield recorder
+    if recorder.count > limit:
+        statements = '\n'.join(f'  {sql}' for sql in recorder.statements)
+        raise QueryBudgetExceeded(f'Выполнено {recorder.count} запросов при лимите {limit}:\n{statements}')
+
+
+def measure_view(client, url_name, args=None, kwargs=None, method='get', data=None):
+    """Выполняет запрос к вьюхе через тестовый клиент и возвращает (response, recorder)."""
+    url = reverse(url_name, args=args, kwargs=kwargs)
+    recorder = QueryRecorder()
+    with recorder.record():
+        response = getattr(client, method)(url, data or {})
+    return response, recorder
+
+
+def assert_view_within_budget(client, url_name, budget=None, **request_kwargs):
+    """Проверяет вьюху по бюджету из settings.QUERY_BUDGETS (или явно переданному budget)."""
+    budget = get_query_budget(url_name) if budget is None else budget
+    if budget is None:
+        raise AssertionError(f'Для маршрута "{url_name}" не задан бюджет в QUERY_BUDGETS')
+    response, recorder = measure_view(client, url_name, **request_kwargs)
+    if recorder.count > budget:
+        statements = '\n'.join(f'  {sql}' for sql in recorder.statements)
+        raise QueryBudgetExceeded(
+            f'Вьюха "{url_name}" выполнила {recorder.count} запросов при бюджете {budget}:\n{statements}'
+        )
+    return response, recorder
+
+
+class QueryBudgetTestMixin:
+    """
+    Миксин для django.test.TestCase с проверками бюджетов запросов. На время тестов
+    класса включает QUERY_BUDGET_RAISE: превышение бюджета в QueryBudgetMiddleware
+    роняет запрос, а не только пишет предупреждение.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        raise_on_budget = override_settings(QUERY_BUDGET_RAISE=True)
+        raise_on_budget.enable()
+        cls.addClassCleanup(raise_on_budget.disable)
+
+    def assertViewWithinBudget(self, url_name, budget=None, client=None, **request_kwargs):
+        try:
+            response, recorder = assert_view_within_budget(client or self.client, url_name, budget, **request_kwargs)
+        except QueryBudgetExceeded as exc:
+            self.fail(str(exc))
+        return response
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        """Контекст: блок выполняет не больше limit SQL-запросов, иначе тест падает."""
+        try:
+            with max_queries(limit) as recorder:
+                yield recorder
+        except QueryBudgetExceeded as exc:
+            self.fail(str(exc))
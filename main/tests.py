@@ -0,0 +1,679 @@
+"""
+Тесты приложения main: число SQL-запросов страниц, бюджеты из QUERY_BUDGETS,
+конкурентное бронирование слота, кэш расписания тура и сводки профиля.
+"""
+import importlib
+import tempfile
+import threading
+from datetime import timedelta
+from itertools import count
+from urllib.parse import urlsplit
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .availability import (
+    AVAILABLE_STATUS, RENTAL, SLOT, SLOT_MAX_DURATION, Interval, busy_intervals, free_windows, merge_intervals,
+    rental_conflict,
+)
+from .booking import SLOT_EXPIRED, SLOT_UNAVAILABLE, TOUR_INACTIVE, book_slot
+from .forms import BookingForm
+from .homepage import SNAPSHOT_CACHE_KEY, SNAPSHOT_LOCK_KEY, get_homepage_snapshot
+from .importers import BikeImporter, RentalImporter
+from .middleware import QueryBudgetExceeded
+from .models import Bike, BikeStatus, Booking, Guide, GuideTour, Location, Rental, Review, Slot, Task, Tour, User
+from .profile_summary import EXPENSIVE_TOUR_PRICE, PROFILE_LIST_LIMIT, RECENT_BOOKING_DAYS, get_profile_summary
+from .search import search_tours
+from .taskqueue import run_task
+from .testing import QueryBudgetTestMixin
+from .tour_cache import SCHEDULE_LIMIT, get_tour_detail
+from .views import TOUR_GUIDES_PAGE_SIZE
+
+_sequence = count(1)
+
+
+def make_user(**fields):
+    number = next(_sequence)
+    fields.setdefault('username', f'user{number}')
+    # Без пароля: хэширование заметно тормозит тесты, вход - через force_login
+    return User.objects.create(**fields)
+
+
+def make_tour(**fields):
+    number = next(_sequence)
+    fields.setdefault('name', f'Тур {number}')
+    fields.setdefault('description', 'Описание тура')
+    fields.setdefault('duration', 2)
+    fields.setdefault('price', 1000)
+    fields.setdefault('location', 'Москва')
+    return Tour.objects.create(**fields)
+
+
+def make_guide(tours=(), **fields):
+    fields.setdefault('experience', 3)
+    fields.setdefault('languages', 'русский')
+    guide = Guide.objects.create(user=make_user(role='Гид'), **fields)
+    for tour in tours:
+        GuideTour.objects.create(guide=guide, tour=tour)
+    return guide
+
+
+class CacheResetMixin:
+    """Кэш Django общий для тестов процесса - каждый тест начинает с пустого."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+
+class TourGuidesListQueriesTest(CacheResetMixin, TestCase):
+    """Страница гидов по турам: число запросов не зависит от числа туров и гидов."""
+
+    def add_tours_with_guides(self, count):
+        for _ in range(count):
+            tour = make_tour()
+            make_guide(tours=[tour])
+            make_guide(tours=[tour])
+
+    def test_queries_do_not_grow_with_tours_and_guides(self):
+        url = reverse('tour_guides_list')
+        self.add_tours_with_guides(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['tours']), 3)
+
+        # Вдвое больше туров и гидов (все на одной странице) - столько же запросов
+        self.add_tours_with_guides(3)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['tours']), 6)
+        for guide in Guide.objects.select_related('user'):
+            self.assertContains(response, guide.user.username)
+
+    def test_cursor_pages_keep_filters(self):
+        guide = make_guide()
+        tours = [make_tour(name=f'Прогулка & {number}') for number in range(TOUR_GUIDES_PAGE_SIZE + 2)]
+        for tour in tours:
+            GuideTour.objects.create(guide=guide, tour=tour)
+        make_tour(name='Прогулка & без гида')
+        params = {'tour_search': 'Прогулка &', 'guide_id': guide.pk}
+
+        response = self.client.get(reverse('tour_guides_list'), params)
+        self.assertEqual(response.context['tours'], tours[:TOUR_GUIDES_PAGE_SIZE])
+        self.assertIsNone(response.context['previous_link'])
+        next_query = QueryDict(urlsplit(response.context['next_link']).query)
+        self.assertEqual(next_query['tour_search'], 'Прогулка &')
+        self.assertEqual(next_query['guide_id'], str(guide.pk))
+
+        response = self.client.get(reverse('tour_guides_list'), next_query)
+        self.assertEqual(response.context['tours'], tours[TOUR_GUIDES_PAGE_SIZE:])
+        self.assertIsNone(response.context['next_link'])
+        self.assertEqual(QueryDict(urlsplit(response.context['first_link']).query).dict(), {
+            'tour_search': 'Прогулка &', 'guide_id': str(guide.pk),
+        })
+
+
+class QueryBudgetViewsTest(CacheResetMixin, QueryBudgetTestMixin, TestCase):
+    """Страницы с бюджетом в QUERY_BUDGETS укладываются в него с пустым кэшем и из кэша."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user()
+        reviewer = make_user()
+        now = timezone.now()
+        cls.tours = [make_tour(price=1000 * (number + 1)) for number in range(5)]
+        for number, tour in enumerate(cls.tours):
+            guide = make_guide(tours=[tour])
+            for hours in (24, 48):
+                Slot.objects.create(tour=tour, guide=guide, datetime=now + timedelta(hours=hours + number))
+            Booking.objects.create(user=cls.customer, tour=tour, date=now - timedelta(days=number), total_price=tour.price)
+            Review.objects.create(user=cls.customer, tour=tour, rating=5, comment='Отлично')
+            Review.objects.create(user=reviewer, tour=tour, rating=4, comment='Хорошо')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.customer)
+
+    def assertCachedViewWithinBudget(self, url_name, cached_budget, **request_kwargs):
+        """Первый запрос - в бюджет из QUERY_BUDGETS, повторный (из кэша) - в cached_budget."""
+        self.assertEqual(self.assertViewWithinBudget(url_name, **request_kwargs).status_code, 200)
+        self.assertEqual(self.assertViewWithinBudget(url_name, cached_budget, **request_kwargs).status_code, 200)
+
+    def test_index(self):
+        self.assertViewWithinBudget('index')
+        # Снимок главной уже в кэше
+        with self.assertMaxQueries(0):
+            get_homepage_snapshot()
+
+    def test_middleware_raises_over_budget(self):
+        with override_settings(QUERY_BUDGETS={'index': 0}), self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('index'))
+
+    def test_tour_list(self):
+        response = self.assertViewWithinBudget('tour_list')
+        self.assertEqual(response.status_code, 200)
+        self.assertViewWithinBudget('tour_list', data={'rating': 4, 'location': 'Москва'})
+
+    def test_tour_detail(self):
+        self.assertCachedViewWithinBudget('tour_detail', 4, kwargs={'tour_id': self.tours[0].pk})
+
+    def test_profile(self):
+        self.assertCachedViewWithinBudget('profile', 2)
+        with self.assertMaxQueries(0):
+            get_profile_summary(self.customer.pk)
+
+
+class HomepageSnapshotTest(CacheResetMixin, TestCase):
+    """Изменения помечают снимок главной устаревшим; пересобирает его один запрос под блокировкой."""
+
+    def test_stale_snapshot_is_rebuilt_once(self):
+        make_tour(price=100)
+        self.assertEqual(get_homepage_snapshot()['total_tours_count'], 1)
+        make_tour(price=200)  # сигнал помечает снимок устаревшим, но не удаляет его
+        self.assertIsNotNone(cache.get(SNAPSHOT_CACHE_KEY))
+
+        # Пока другой процесс держит блокировку, отдаётся прежний снимок без запросов к БД
+        cache.add(SNAPSHOT_LOCK_KEY, True)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_homepage_snapshot()['total_tours_count'], 1)
+        cache.delete(SNAPSHOT_LOCK_KEY)
+
+        with self.assertNumQueries(5):
+            self.assertEqual(get_homepage_snapshot()['total_tours_count'], 2)
+        with self.assertNumQueries(0):
+            snapshot = get_homepage_snapshot()
+        self.assertEqual([tour['price'] for tour in snapshot['top_price_tours']], [200, 100])
+        self.assertIsNone(cache.get(SNAPSHOT_LOCK_KEY))
+
+
+class SearchToursTest(TestCase):
+    """Полнотекстовый поиск туров: один MATCH на запрос, совпадение в названии выше."""
+
+    def test_rank_from_single_match(self):
+        in_description = make_tour(name='Вечерняя прогулка', description='Маршрут вдоль набережной')
+        in_name = make_tour(name='Набережная и мосты')
+        make_tour(name='Парк Горького')
+        tours = search_tours(Tour.objects.all(), 'набережн')
+        with CaptureQueriesContext(connection) as queries:
+            found = list(tours)
+        self.assertEqual(found, [in_name, in_description])
+        self.assertGreater(found[0].search_rank, found[1].search_rank)
+        if connection.vendor == 'sqlite':
+            self.assertEqual(queries[0]['sql'].count('MATCH'), 1)
+
+
+class TourScheduleCacheTest(CacheResetMixin, TestCase):
+    """Расписание страницы тура из кэша не показывает наступившие слоты."""
+
+    def test_past_slots_are_dropped_on_read(self):
+        tour = make_tour()
+        guide = make_guide(tours=[tour])
+        now = timezone.now()
+        dates = [now + timedelta(hours=hours) for hours in range(1, SCHEDULE_LIMIT + 3)]
+        for date in dates:
+            Slot.objects.create(tour=tour, guide=guide, datetime=date)
+        self.assertEqual(get_tour_detail(tour.pk)['upcoming_dates'], dates[:SCHEDULE_LIMIT])
+
+        # Через два с половиной часа два первых слота уже прошли - кэш не сброшен, но их нет
+        later = now + timedelta(hours=2, minutes=30)
+        with mock.patch('main.tour_cache.timezone.now', return_value=later), self.assertNumQueries(0):
+            upcoming = get_tour_detail(tour.pk)['upcoming_dates']
+        self.assertEqual(upcoming, dates[2:SCHEDULE_LIMIT + 2])
+
+
+class TourDetailUserNamesTest(CacheResetMixin, TestCase):
+    """Смена имени гида или автора отзыва сбрасывает только части страниц их туров."""
+
+    def test_rename_resets_guide_and_review_parts(self):
+        tour, other = make_tour(), make_tour()
+        guide = make_guide(tours=[tour])
+        author = make_user()
+        Review.objects.create(user=author, tour=tour, rating=5, comment='Отлично')
+        get_tour_detail(tour.pk)
+        get_tour_detail(other.pk)
+
+        # Вход обновляет только last_login - кэш страниц не сбрасывается
+        author.last_login = timezone.now()
+        author.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            get_tour_detail(tour.pk)
+
+        guide.user.first_name, guide.user.last_name = 'Анна', 'Гидова'
+        guide.user.save()
+        author.username = 'renamed_author'
+        author.save()
+        with self.assertNumQueries(0):
+            get_tour_detail(other.pk)
+        detail = get_tour_detail(tour.pk)
+        self.assertEqual(detail['tour']['guides'], ['Анна Гидова'])
+        self.assertEqual([review['author'] for review in detail['reviews']], ['renamed_author'])
+
+
+class ConcurrentBookingTest(CacheResetMixin, TransactionTestCase):
+    """
+    Одновременные бронирования одного слота из разных потоков (у каждого своё
+    соединение с БД): успешно ровно одно, второй Booking и Rental не появляются.
+    TransactionTestCase - потоки должны видеть закоммиченные данные друг друга.
+    """
+    threads = 8
+
+    def book_concurrently(self, slot, users):
+        barrier = threading.Barrier(len(users))
+        results = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker(user):
+            try:
+                barrier.wait()
+                result = book_slot(user, slot.pk)
+                with lock:
+                    results.append(result)
+            except Exception as exc:  # ошибка БД в потоке - тоже провал
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_exactly_one_booking_wins(self):
+        tour = make_tour()
+        slot = Slot.objects.create(tour=tour, guide=make_guide(tours=[tour]), datetime=timezone.now() + timedelta(days=1))
+        users = [make_user() for _ in range(self.threads)]
+
+        results, errors = self.book_concurrently(slot, users)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(result.success for result in results), 1)
+        self.assertEqual(len(results), self.threads)
+        self.assertTrue(Slot.objects.get(pk=slot.pk).is_booked)
+        self.assertEqual(Booking.objects.filter(tour=tour).count(), 1)
+        self.assertEqual(Rental.objects.filter(start_time=slot.datetime).count(), 1)
+
+
+class BookingRulesTest(CacheResetMixin, TestCase):
+    """Прошедшие слоты и слоты неактивных туров не бронируются ни через API, ни через форму."""
+
+    def setUp(self):
+        super().setUp()
+        self.tour = make_tour()
+        self.guide = make_guide(tours=[self.tour])
+        self.client.force_login(make_user())
+
+    def make_slot(self, hours):
+        return Slot.objects.create(tour=self.tour, guide=self.guide, datetime=timezone.now() + timedelta(hours=hours))
+
+    def book(self, slot):
+        return self.client.post(reverse('api_book_slot', args=[slot.pk]))
+
+    def assertRejected(self, slot, code):
+        response = self.book(slot)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['code'], code)
+        self.assertFalse(Slot.objects.get(pk=slot.pk).is_booked)
+        self.assertFalse(Booking.objects.filter(tour=self.tour).exists())
+
+    def test_future_slot_is_booked(self):
+        response = self.book(self.make_slot(24))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['code'], 'ok')
+
+    def test_past_slot_is_expired(self):
+        self.assertRejected(self.make_slot(-1), SLOT_EXPIRED)
+
+    def test_inactive_tour_slot(self):
+        slot = self.make_slot(24)
+        Tour.objects.filter(pk=self.tour.pk).update(is_active=False)
+        self.assertRejected(slot, TOUR_INACTIVE)
+
+    def test_booked_slot_is_unavailable(self):
+        slot = self.make_slot(24)
+        self.assertEqual(self.book(slot).status_code, 201)
+        response = self.book(slot)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['code'], SLOT_UNAVAILABLE)
+
+    def test_form_offers_only_future_slots(self):
+        past, future = self.make_slot(-1), self.make_slot(24)
+        form = BookingForm(tour=self.tour.pk)
+        self.assertEqual(form.available_slots, [future])
+        self.assertFalse(BookingForm({'slot': past.pk}, tour=self.tour.pk).is_valid())
+
+
+class ProfileSummaryTest(CacheResetMixin, TestCase):
+    """Сводка профиля: счётчики по всем строкам, а не по обрезанным спискам, и сброс кэша."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.other = make_user()
+        now = timezone.now()
+        bookings = PROFILE_LIST_LIMIT + 5
+        tours = [make_tour(price=EXPENSIVE_TOUR_PRICE + 1000 if number % 7 == 0 else 1000) for number in range(bookings)]
+        for number, tour in enumerate(tours):
+            Booking.objects.create(user=cls.user, tour=tour, date=now - timedelta(days=number * 2), total_price=tour.price)
+        # Отзывов тоже больше лимита списка, но два тура остались без отзыва
+        for tour in tours[:-2]:
+            Review.objects.create(user=cls.user, tour=tour, rating=4, comment='Хорошо')
+        Booking.objects.create(user=cls.other, tour=tours[0], date=now, total_price=tours[0].price)
+
+    def test_counts_match_plain_queries(self):
+        summary = get_profile_summary(self.user.pk)
+        bookings = Booking.objects.filter(user=self.user)
+        reviews = Review.objects.filter(user=self.user)
+        self.assertGreater(bookings.count(), PROFILE_LIST_LIMIT)
+        self.assertGreater(reviews.count(), PROFILE_LIST_LIMIT)
+
+        self.assertEqual(summary['booking_count'], bookings.count())
+        self.assertEqual(summary['review_count'], reviews.count())
+        self.assertEqual(len(summary['bookings']), PROFILE_LIST_LIMIT)
+        self.assertEqual(len(summary['reviews']), PROFILE_LIST_LIMIT)
+        self.assertEqual(summary['has_reviews'], reviews.exists())
+        self.assertEqual(
+            summary['has_expensive_tours'], bookings.filter(tour__price__gt=EXPENSIVE_TOUR_PRICE).exists(),
+        )
+        self.assertEqual(
+            summary['has_recent_bookings'],
+            bookings.filter(date__gte=timezone.now() - timedelta(days=RECENT_BOOKING_DAYS)).exists(),
+        )
+        unreviewed = bookings.exclude(tour__in=reviews.values('tour')).count()
+        self.assertEqual(unreviewed, 2)
+        self.assertFalse(summary['has_reviewed_all_tours'])
+
+    def test_recent_bookings_flag_follows_current_time(self):
+        self.assertTrue(get_profile_summary(self.user.pk)['has_recent_bookings'])
+        later = timezone.now() + timedelta(days=RECENT_BOOKING_DAYS + 1)
+        # Сводка из кэша (без запросов), но флаг считается по текущему времени
+        with mock.patch('main.profile_summary.timezone.now', return_value=later), self.assertNumQueries(0):
+            self.assertFalse(get_profile_summary(self.user.pk)['has_recent_bookings'])
+
+    def test_booking_and_review_save_invalidate_only_own_summary(self):
+        tour = make_tour()
+        for create in (
+            lambda: Booking.objects.create(user=self.user, tour=tour, date=timezone.now(), total_price=tour.price),
+            lambda: Review.objects.create(user=self.user, tour=tour, rating=5, comment='Отлично'),
+        ):
+            before = get_profile_summary(self.user.pk)
+            get_profile_summary(self.other.pk)
+            create()
+            # Сводка другого пользователя осталась в кэше, своя - перестроена двумя запросами
+            with self.assertNumQueries(0):
+                get_profile_summary(self.other.pk)
+            with self.assertNumQueries(2):
+                after = get_profile_summary(self.user.pk)
+            self.assertEqual(
+                (after['booking_count'], after['review_count']),
+                (Booking.objects.filter(user=self.user).count(), Review.objects.filter(user=self.user).count()),
+            )
+            self.assertNotEqual(
+                (before['booking_count'], before['review_count']), (after['booking_count'], after['review_count']),
+            )
+
+
+    def test_tour_save_invalidates_only_on_name_or_price_change(self):
+        tour = Booking.objects.filter(user=self.user).select_related('tour').first().tour
+        get_profile_summary(self.user.pk)
+        tour.description = 'Новое описание'
+        tour.save()
+        with self.assertNumQueries(0):
+            get_profile_summary(self.user.pk)
+
+        tour.name = 'Переименованный тур'
+        tour.save()
+        with self.assertNumQueries(2):
+            summary = get_profile_summary(self.user.pk)
+        self.assertIn('Переименованный тур', [booking['tour_name'] for booking in summary['bookings']])
+
+class ManagerCapabilitiesTest(CacheResetMixin, TestCase):
+    """Права менеджера дают только суперпользователь и группа Managers, а не поле role."""
+
+    def assertManagerPages(self, user, status_code):
+        self.client.force_login(user)
+        for url in (reverse('tour_create'), reverse('export_data', args=['rentals', 'csv'])):
+            self.assertEqual(self.client.get(url).status_code, status_code, url)
+
+    def test_role_does_not_grant_manager_rights(self):
+        self.assertManagerPages(make_user(role='Менеджер'), 403)
+
+    def test_managers_group_and_superuser(self):
+        member = make_user()
+        member.groups.add(Group.objects.get_or_create(name='Managers')[0])
+        self.assertManagerPages(member, 200)
+        self.assertManagerPages(make_user(is_superuser=True), 200)
+
+    def test_migration_moves_role_managers_to_group(self):
+        migration = importlib.import_module('main.migrations.0026_managers_group')
+        manager = make_user(role='Менеджер')
+        # Повторный запуск не дублирует членство в группе
+        migration.add_role_managers_to_group(apps, None)
+        migration.add_role_managers_to_group(apps, None)
+        self.assertEqual(list(manager.groups.values_list('name', flat=True)), ['Managers'])
+        self.assertManagerPages(manager, 200)
+
+    def test_users_api_does_not_change_role(self):
+        user = make_user()
+        url = f'/api/users/{user.pk}/'
+        self.assertEqual(self.client.patch(url, {'role': 'Менеджер'}, content_type='application/json').status_code, 403)
+        self.client.force_login(make_user(is_staff=True))
+        self.client.patch(url, {'role': 'Менеджер'}, content_type='application/json')
+        user.refresh_from_db()
+        self.assertEqual(user.role, 'Пользователь')
+
+
+class DeferredReviewSignalsTest(CacheResetMixin, TestCase):
+    """post_init отзыва не обращается к отложенным полям (only()/defer())."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tour = make_tour()
+        cls.review = Review.objects.create(user=make_user(), tour=cls.tour, rating=4, comment='Хорошо')
+
+    def test_loading_deferred_review_is_one_query(self):
+        with self.assertNumQueries(1):
+            review = Review.objects.only('id', 'comment').get(pk=self.review.pk)
+        self.assertIsNone(review._stored_state)
+
+    def test_saving_deferred_review_keeps_tour_aggregates(self):
+        review = Review.objects.only('id', 'comment').get(pk=self.review.pk)
+        review.comment = 'Отлично'
+        review.save()
+        self.tour.refresh_from_db()
+        self.assertEqual((self.tour.review_count, self.tour.avg_rating), (1, 4.0))
+
+    def test_exclude_examples_page(self):
+        self.assertEqual(self.client.get(reverse('exclude_examples')).status_code, 200)
+
+
+class DeferredSlotSignalsTest(CacheResetMixin, TestCase):
+    """post_init слота не обращается к отложенным тура и гиду; смена гида всё равно замечается."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tour = make_tour()
+        cls.guide = make_guide(tours=[cls.tour])
+        cls.slot = Slot.objects.create(tour=cls.tour, guide=cls.guide, datetime=timezone.now() + timedelta(days=1))
+
+    def test_loading_deferred_slot_is_one_query(self):
+        with self.assertNumQueries(1):
+            slot = Slot.objects.defer('tour', 'guide').get(pk=self.slot.pk)
+        self.assertIsNone(slot._stored_pair)
+
+    def test_guide_change_on_deferred_slot_recomputes_both_guides(self):
+        other = make_guide()
+        slot = Slot.objects.only('id', 'datetime').get(pk=self.slot.pk)
+        slot.guide = other
+        with mock.patch('main.signals.schedule_guide_recompute') as recompute:
+            slot.save()
+        recompute.assert_called_once_with(other.pk, self.guide.pk)
+
+
+class BulkImportTest(CacheResetMixin, TestCase):
+    """Массовый импорт: пробный прогон ничего не пишет, ошибки строк не роняют порцию."""
+
+    def bike_rows(self):
+        row = {'type': 'standard', 'status': 'Новый', 'location': 'Парк', 'rental_price_hour': '100',
+               'rental_price_day': '500', 'latitude': '55.7', 'longitude': '37.6'}
+        return [
+            (2, row),
+            (3, {**row, 'location': 'Набережная', 'latitude': 'север'}),
+            (4, {**row, 'location': 'Полюс', 'latitude': '95'}),
+            (5, {**row, 'type': 'electric'}),
+        ]
+
+    def test_dry_run_with_create_missing_writes_nothing(self):
+        stats = BikeImporter(create_missing=True).run(self.bike_rows(), dry_run=True)
+        self.assertEqual((stats.read, stats.skipped, stats.created), (4, 2, 0))
+        self.assertFalse(BikeStatus.objects.exists())
+        self.assertFalse(Location.objects.exists())
+
+        rows = [(2, {'user': 'new_user', 'start_time': '2026-01-01 10:00', 'end_time': '2026-01-01 12:00',
+                     'total_price': '300'})]
+        stats = RentalImporter(create_missing=True).run(rows, dry_run=True)
+        self.assertEqual(stats.skipped, 0)
+        self.assertFalse(User.objects.filter(username='new_user').exists())
+
+    def test_bad_coordinates_skip_only_their_rows(self):
+        stats = BikeImporter(create_missing=True).run(self.bike_rows(), batch_size=1)
+        self.assertEqual(stats.created, 2)
+        self.assertEqual([line for line, _ in stats.errors], [3, 4])
+        self.assertEqual(list(Location.objects.values_list('name', 'latitude')), [('Парк', 55.7)])
+        self.assertEqual(Bike.objects.filter(status__status_name='Новый', location__name='Парк').count(), 2)
+
+
+class ThumbnailTaskTest(CacheResetMixin, TestCase):
+    """Задача миниатюр без исходного файла в хранилище повторяется и завершается ошибкой."""
+
+    def test_missing_source_file_fails_task(self):
+        with self.settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())):
+            tour = make_tour(image='tours/missing.jpg')
+            queued = Task.objects.get(name='main.thumbnails.generate_thumbnails', payload__pk=tour.pk)
+            with self.assertLogs('main.taskqueue', 'WARNING'):
+                for _ in range(queued.max_attempts):
+                    self.assertFalse(run_task(queued.pk))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertIn('FileNotFoundError', queued.last_error)
+
+
+class AvailabilityTest(TestCase):
+    """Занятость велосипедов (main/availability.py): интервалы [a, b), окна и слоты туров."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.status = BikeStatus.objects.create(status_name=AVAILABLE_STATUS)
+        location = Location.objects.create(name='Парк', address='Москва', latitude=55.75, longitude=37.61)
+        cls.bike = Bike.objects.create(
+            type='standard', status=cls.status, rental_price_hour=100, rental_price_day=1000, location=location,
+        )
+        cls.user = make_user()
+        cls.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        cls.end = cls.start + timedelta(hours=8)
+
+    def at(self, hours):
+        return self.start + timedelta(hours=hours)
+
+    def rental(self, start_hours, end_hours):
+        return Rental.objects.create(
+            user=self.user, bike=self.bike, total_price=100,
+            start_time=self.at(start_hours), end_time=self.at(end_hours),
+        )
+
+    def slot(self, start, duration=2):
+        tour = make_tour(duration=duration)
+        return Slot.objects.create(tour=tour, guide=make_guide(tours=[tour]), bike=self.bike, datetime=start)
+
+    def busy(self):
+        return busy_intervals([self.bike.pk], self.start, self.end).get(self.bike.pk, [])
+
+    def test_busy_intervals_sorted_rentals_and_slots(self):
+        slot = self.slot(self.at(3))
+        rental = self.rental(1, 2)
+        self.assertEqual(self.busy(), [
+            Interval(rental.start_time, rental.end_time, RENTAL, rental.pk),
+            Interval(slot.datetime, slot.datetime + timedelta(hours=2), SLOT, slot.pk),
+        ])
+
+    def test_adjacent_intervals_do_not_overlap(self):
+        rental = self.rental(2, 3)
+        self.assertIsNone(rental_conflict(self.bike.pk, self.at(1), rental.start_time))
+        self.assertIsNone(rental_conflict(self.bike.pk, rental.end_time, self.at(4)))
+        conflict = rental_conflict(self.bike.pk, rental.end_time - timedelta(minutes=1), self.at(4))
+        self.assertEqual(conflict.pk, rental.pk)
+
+    def test_slot_started_before_range(self):
+        running = self.slot(self.at(-1))
+        self.slot(self.at(-2))  # закончился ровно в начале диапазона
+        self.assertEqual([interval.pk for interval in self.busy()], [running.pk])
+
+    def test_slot_max_duration_window(self):
+        hours = int(SLOT_MAX_DURATION.total_seconds() // 3600)
+        longest = self.slot(self.start - SLOT_MAX_DURATION + timedelta(minutes=1), duration=hours)
+        self.slot(self.start - SLOT_MAX_DURATION, duration=hours)  # вне окна поиска
+        self.assertEqual(self.busy(), [
+            Interval(longest.datetime, self.start + timedelta(minutes=1), SLOT, longest.pk),
+        ])
+
+    def test_merge_intervals(self):
+        intervals = [
+            Interval(self.at(0), self.at(2), RENTAL, 1),
+            Interval(self.at(1), self.at(3), SLOT, 2),  # пересекается
+            Interval(self.at(3), self.at(4), RENTAL, 3),  # смежный
+            Interval(self.at(3), self.at(3.5), RENTAL, 4),  # вложенный
+            Interval(self.at(5), self.at(6), RENTAL, 5),
+        ]
+        self.assertEqual(merge_intervals(intervals), [(self.at(0), self.at(4)), (self.at(5), self.at(6))])
+        self.assertEqual(merge_intervals([]), [])
+
+    def test_free_windows(self):
+        self.assertEqual(free_windows([], self.at(0), self.at(8)), [(self.at(0), self.at(8))])
+        intervals = [
+            Interval(self.at(-1), self.at(1), SLOT, 1),  # начался до диапазона
+            Interval(self.at(3), self.at(4), RENTAL, 2),
+            Interval(self.at(7), self.at(9), RENTAL, 3),  # кончается после диапазона
+        ]
+        self.assertEqual(free_windows(intervals, self.at(0), self.at(8)), [(self.at(1), self.at(3)), (self.at(4), self.at(7))])
+        self.assertEqual(free_windows([Interval(self.at(-1), self.at(9), RENTAL, 1)], self.at(0), self.at(8)), [])
+
+    def test_exclude_rental_on_update(self):
+        rental = self.rental(1, 3)
+        self.assertEqual(rental_conflict(self.bike.pk, rental.start_time, rental.end_time).pk, rental.pk)
+        # Правка аренды не конфликтует сама с собой, но видит остальные
+        self.assertIsNone(rental_conflict(self.bike.pk, rental.start_time, rental.end_time, exclude_rental=rental.pk))
+        other = self.rental(3, 4)
+        conflict = rental_conflict(
+            self.bike.pk, rental.start_time, rental.end_time + timedelta(minutes=30), exclude_rental=rental.pk,
+        )
+        self.assertEqual(conflict.pk, other.pk)
+
+    def test_api_rejects_overlapping_rental(self):
+        existing = self.rental(1, 3)
+        self.client.force_login(self.user)
+
+        def create(start_hours, end_hours):
+            return self.client.post(reverse('rental-list'), {
+                'user': self.user.pk, 'bike': self.bike.pk, 'total_price': 100,
+                'start_time': self.at(start_hours).isoformat(),
+                'end_time': self.at(end_hours).isoformat(),
+            })
+
+        response = create(2, 4)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Велосипед занят', response.json()['error'])
+        self.assertEqual(list(Rental.objects.filter(bike=self.bike)), [existing])
+        # Смежная аренда [3, 4) не пересекается с [1, 3)
+        self.assertEqual(create(3, 4).status_code, 201)
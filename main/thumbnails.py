@@ -0,0 +1,176 @@
+"""
+Уменьшенные копии загруженных изображений (Tour.image, User.avatar) в WebP и JPEG.
+
+После сохранения модели с новым файлом сигнал (main/signals.py) ставит обработку
+в очередь фоновых задач (main/taskqueue.py) - запрос не ждёт Pillow. Копии кладутся в хранилище под именем
+от SHA-256 содержимого (thumbs/ab/<хэш>-<ширина>.<формат>): одинаковый файл,
+загруженный повторно, не обрабатывается заново, а изменённый получает новые URL,
+которые можно кэшировать «навсегда». Готовый набор ширин записывается в JSON-поле
+модели (manifest), по нему шаблонный тег responsive_image строит srcset.
+Пока копий нет, страница показывает оригинал.
+"""
+import hashlib
+import io
+import logging
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .taskqueue import enqueue, task
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbs'
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+HASH_LENGTH = 20
+
+
+@dataclass(frozen=True)
+class ImageSpec:
+    """Поле изображения модели, JSON-поле для manifest и ширины копий (под 1x/2x/3x экраны)."""
+    model: str
+    field: str
+    manifest_field: str
+    widths: tuple
+
+
+IMAGE_SPECS = {
+    ('main.Tour', 'image'): ImageSpec('main.Tour', 'image', 'image_thumbnails', (320, 640, 960)),
+    ('main.User', 'avatar'): ImageSpec('main.User', 'avatar', 'avatar_thumbnails', (96, 192, 384)),
+}
+
+def content_hash(field_file):
+    """SHA-256 содержимого файла (читается порциями)."""
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def thumbnail_name(digest, width, fmt):
+    return f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{width}.{fmt}'
+
+
+def _target_widths(original_width, widths):
+    """Ширины не больше оригинала (увеличение бессмысленно); узкий оригинал - одна копия своей ширины."""
+    return [width for width in widths if width <= original_width] or [original_width]
+
+
+def _encode(image, width, fmt):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+    pil_format, options = FORMATS[fmt]
+    if pil_format == 'JPEG' and resized.mode != 'RGB':
+        # У JPEG нет прозрачности: подкладываем белый фон
+        background = Image.new('RGB', resized.size, (255, 255, 255))
+        rgba = resized.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        resized = background
+    buffer = io.BytesIO()
+    resized.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_thumbnails(field_file, widths):
+    """
+    Создаёт недостающие копии файла и возвращает manifest:
+    {'source': имя оригинала, 'hash': ..., 'width': ..., 'height': ..., 'widths': [...], 'formats': [...]}.
+    """
+    digest = content_hash(field_file)
+    field_file.open('rb')
+    try:
+        with Image.open(field_file) as opened:
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    finally:
+        field_file.close()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    target_widths = _target_widths(image.width, widths)
+    for width in target_widths:
+        for fmt in FORMATS:
+            name = thumbnail_name(digest, width, fmt)
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(_encode(image, width, fmt)))
+    return {
+        'source': field_file.name,
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'widths': target_widths,
+        'formats': list(FORMATS),
+    }
+
+
+def process_image(spec, pk):
+    """Строит копии для объекта pk и сохраняет manifest, если файл за это время не сменился."""
+    model = apps.get_model(spec.model)
+    instance = model.objects.filter(pk=pk).only('pk', spec.field).first()
+    field_file = getattr(instance, spec.field, None) if instance else None
+    if not field_file:
+        return None
+    if not field_file.storage.exists(field_file.name):
+        # Не ошибка изображения, а недоступное хранилище (например, у обработчика очереди
+        # не подключён том с MEDIA_ROOT): задача должна повториться и завершиться ошибкой
+        raise FileNotFoundError(f'Файл {field_file.name} для {spec.model} #{pk} не найден в хранилище')
+    try:
+        manifest = build_thumbnails(field_file, spec.widths)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('Не удалось обработать изображение %s для %s #%s', field_file.name, spec.model, pk, exc_info=True)
+        return None
+    # UPDATE вместо save(): без сигналов и без гонки с новой загрузкой того же объекта
+    changes = {spec.manifest_field: manifest}
+    if spec.model == 'main.Tour':
+        # updated_at - версия карточки тура в кэше фрагментов (main/fragments.py)
+        changes['updated_at'] = timezone.now()
+    model.objects.filter(pk=pk, **{spec.field: field_file.name}).update(**changes)
+    if spec.model == 'main.Tour':
+        from .homepage import invalidate_homepage_snapshot
+        from .tour_cache import invalidate_tour_catalog, invalidate_tour_detail
+        invalidate_tour_detail(pk, 'info')
+        invalidate_tour_catalog()
+        invalidate_homepage_snapshot()
+    return manifest
+
+
+@task(max_attempts=3, retry_delay=30)
+def generate_thumbnails(model, field, pk):
+    """
+    Задача очереди: копии изображения объекта; результат - построенные ширины.
+    Отсутствующий в хранилище файл - исключение: задача повторяется, затем помечается ошибкой.
+    """
+    manifest = process_image(IMAGE_SPECS[(model, field)], pk)
+    return {'widths': manifest['widths'] if manifest else []}
+
+
+def schedule_thumbnails(spec, pk):
+    """Ставит обработку в очередь фоновых задач (в текущей транзакции)."""
+    return enqueue(generate_thumbnails, model=spec.model, field=spec.field, pk=pk)
+
+
+def needs_processing(instance, spec):
+    """Файл есть, а manifest построен для другого файла (или ещё не построен)."""
+    field_file = getattr(instance, spec.field)
+    manifest = getattr(instance, spec.manifest_field) or {}
+    return bool(field_file) and manifest.get('source') != field_file.name
+
+
+def thumbnail_url(manifest, width, fmt):
+    return default_storage.url(thumbnail_name(manifest['hash'], width, fmt))
+
+
+def srcset(manifest, fmt):
+    """Строка srcset для формата из manifest."""
+    return ', '.join(f'{thumbnail_url(manifest, width, fmt)} {width}w' for width in manifest['widths'])
@@ -0,0 +1,223 @@
+"""
+Кэш страницы тура: неизменяемые для пользователя части tour_detail хранятся в кэше
+Django по id тура и версии. Форма бронирования строится поверх них на каждый запрос.
+
+Части страницы и то, что их сбрасывает (см. main/signals.py):
+    info     - поля тура и гиды             -> Tour, GuideTour, имя пользователя-гида
+    reviews  - отзывы, средний рейтинг       -> Review, имя автора отзыва
+    schedule - ближайшие свободные слоты     -> Slot, book_slot(); прошедшие слоты
+               отбрасываются при каждом чтении
+    related  - соседние и похожие туры       -> любое изменение Tour (версия каталога)
+
+Сброс не удаляет ключи, а увеличивает номер версии: старые записи просто перестают
+читаться и вытесняются по TTL. Все данные - обычные словари, без моделей.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Guide, Review, Slot, Tour
+
+PARTS = ('info', 'reviews', 'schedule', 'related')
+KEY_PREFIX = 'tour_detail'
+# Меняется при массовых update() туров, которые не отправляют сигналы
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+# Меняется при любом сохранении/удалении тура: от него зависят списки похожих туров
+CATALOG_KEY = f'{KEY_PREFIX}:catalog'
+
+NEIGHBOUR_TOURS_LIMIT = 3
+SIMILAR_TOURS_LIMIT = 4
+PRICE_SIMILAR_LIMIT = 3
+SCHEDULE_LIMIT = 5
+# Слотов в кэше с запасом: при чтении прошедшие отбрасываются, и показывать есть что
+SCHEDULE_CACHE_LIMIT = SCHEDULE_LIMIT * 4
+# Поля тура, нужные _tour_data (списки соседних и похожих туров)
+TOUR_CARD_FIELDS = ('id', 'name', 'location', 'price', 'duration', 'image', 'image_thumbnails', 'created_at')
+
+
+def get_tour_cache_ttl():
+    """Время жизни частей страницы тура (TOUR_DETAIL_CACHE_TTL в settings, по умолчанию час)."""
+    return getattr(settings, 'TOUR_DETAIL_CACHE_TTL', 60 * 60)
+
+
+def _version_key(tour_id, part):
+    return f'{KEY_PREFIX}:{tour_id}:{part}:version'
+
+
+def _new_version():
+    # Начальное значение от времени: если ключ версии вытеснен из кэша раньше данных,
+    # старые записи с маленьким номером не прочитаются
+    return int(time.time() * 1000)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def _tour_data(tour):
+    return {
+        'id': tour.id,
+        'name': tour.name,
+        'location': tour.location,
+        'price': tour.price,
+        'duration': tour.duration,
+        'image_url': tour.image.url if tour.image else None,
+        'image_thumbnails': tour.image_thumbnails,
+    }
+
+
+def _build_info(tour_id):
+    tour = Tour.objects.filter(pk=tour_id).first()
+    if tour is None:
+        return None
+    guides = Guide.objects.filter(guide_tours__tour_id=tour_id).select_related('user').order_by('user__username')
+    return {
+        **_tour_data(tour),
+        'description': tour.description,
+        'duration_display': tour.get_duration_display(),
+        'created_at': tour.created_at,
+        'is_active': tour.is_active,
+        'guides': [guide.user.get_full_name() or guide.user.username for guide in guides],
+    }
+
+
+def _build_reviews(tour_id):
+    tour = Tour.objects.filter(pk=tour_id).only('avg_rating', 'review_count').first()
+    if tour is None:
+        return None
+    reviews = Review.objects.filter(tour_id=tour_id).select_related('user').order_by('-created_at')
+    return {
+        'avg_rating': tour.avg_rating,
+        'review_count': tour.review_count,
+        'is_highly_rated': tour.is_highly_rated(),
+        'reviews': [
+            {
+                'author': review.user.get_full_name() or review.user.username,
+                'rating': review.rating,
+                'comment': review.comment,
+                'created_at': review.created_at,
+            }
+            for review in reviews
+        ],
+    }
+
+
+def _build_schedule(tour_id):
+    dates = list(Slot.objects.filter(
+        tour_id=tour_id, is_booked=False, datetime__gte=timezone.now(),
+    ).order_by('datetime').values_list('datetime', flat=True)[:SCHEDULE_CACHE_LIMIT])
+    # complete - в кэше все будущие свободные слоты тура, за последним больше нет
+    return {'dates': dates, 'complete': len(dates) < SCHEDULE_CACHE_LIMIT}
+
+
+def _upcoming_dates(schedule, now):
+    """
+    Ближайшие даты из закэшированного расписания, ещё не наступившие к now.
+    None - после отбрасывания прошедших дат не хватает, а в БД могут быть более поздние:
+    расписание нужно перестроить.
+    """
+    dates = [date for date in schedule.get('dates', ()) if date >= now]
+    if len(dates) < SCHEDULE_LIMIT and not schedule.get('complete'):
+        return None
+    return dates[:SCHEDULE_LIMIT]
+
+
+def _build_related(tour_id):
+    tour = Tour.objects.filter(pk=tour_id).only('created_at', 'duration', 'location', 'price').first()
+    if tour is None:
+        return None
+    price_range = (float(tour.price) * 0.8, float(tour.price) * 1.2)
+    others = Tour.objects.exclude(pk=tour_id).only(*TOUR_CARD_FIELDS)
+    return {
+        'next_tours': [_tour_data(t) for t in tour.get_next_tours(NEIGHBOUR_TOURS_LIMIT).only(*TOUR_CARD_FIELDS)],
+        'prev_tours': [_tour_data(t) for t in tour.get_prev_tours(NEIGHBOUR_TOURS_LIMIT).only(*TOUR_CARD_FIELDS)],
+        'similar_tours': [
+            _tour_data(t) for t in others.filter(
+                Q(duration=tour.duration) | Q(location__icontains=tour.location)
+            )[:SIMILAR_TOURS_LIMIT]
+        ],
+        'price_similar_tours': [
+            _tour_data(t) for t in others.filter(
+                price__range=price_range
+            ).exclude(duration=tour.duration)[:PRICE_SIMILAR_LIMIT]
+        ],
+    }
+
+
+BUILDERS = {
+    'info': _build_info,
+    'reviews': _build_reviews,
+    'schedule': _build_schedule,
+    'related': _build_related,
+}
+
+
+def get_tour_detail(tour_id):
+    """
+    Возвращает контекст страницы тура (словарь) или None, если тура нет.
+    Обычно - два обращения к кэшу (версии и данные) и ни одного запроса к БД.
+    """
+    version_keys = {part: _version_key(tour_id, part) for part in PARTS}
+    versions = cache.get_many([*version_keys.values(), GENERATION_KEY, CATALOG_KEY])
+    missing = {key: _new_version() for key in [*version_keys.values(), GENERATION_KEY, CATALOG_KEY]
+               if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    generation = versions[GENERATION_KEY]
+    data_keys = {}
+    for part, version_key in version_keys.items():
+        version = versions[version_key]
+        if part == 'related':
+            version = f'{version}.{versions[CATALOG_KEY]}'
+        data_keys[part] = f'{KEY_PREFIX}:{tour_id}:{part}:{generation}:{version}'
+
+    cached = cache.get_many(list(data_keys.values()))
+    now = timezone.now()
+    context = {}
+    fresh = {}
+    for part, key in data_keys.items():
+        data = cached.get(key)
+        if part == 'schedule' and data is not None and _upcoming_dates(data, now) is None:
+            data = None
+        if data is None:
+            data = BUILDERS[part](tour_id)
+            if data is None:
+                return None
+            fresh[key] = data
+        context[part] = data
+    if fresh:
+        cache.set_many(fresh, get_tour_cache_ttl())
+
+    return {
+        'tour': context['info'],
+        'reviews': context['reviews']['reviews'],
+        'avg_rating': context['reviews']['avg_rating'],
+        'review_count': context['reviews']['review_count'],
+        'is_highly_rated': context['reviews']['is_highly_rated'],
+        'upcoming_dates': _upcoming_dates(context['schedule'], now),
+        **context['related'],
+    }
+
+
+def invalidate_tour_detail(tour_id, *parts):
+    """Сбрасывает указанные части страницы тура (по умолчанию - все)."""
+    for part in parts or PARTS:
+        _bump(_version_key(tour_id, part))
+
+
+def invalidate_tour_catalog():
+    """Сбрасывает списки соседних и похожих туров на всех страницах."""
+    _bump(CATALOG_KEY)
+
+
+def invalidate_all_tour_details():
+    """Сбрасывает кэш всех страниц туров (после массовых update()/delete())."""
+    _bump(GENERATION_KEY)
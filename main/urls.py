@@ -23,6 +23,7 @@ urlpatterns = [
     path('rentals/create/', RentalCreateView.as_view(), name='rental_create'),
     path('rentals/<int:pk>/delete/', views.RentalDeleteView.as_view(), name='rental_delete'),
     path('rentals/<int:pk>/edit/', views.RentalUpdateView.as_view(), name='rental_update'),
+    path('exports/<slug:dataset>.<slug:fmt>', views.export_data, name='export_data'),
     path('tour-guides/', views.tour_guides_list, name='tour_guides_list'),
     path('exclude-examples/', views.exclude_examples, name='exclude_examples'),
     path('count-exists-examples/', views.count_exists_example, name='count_exists_examples'),
@@ -37,12 +38,17 @@ urlpatterns = [
     path('tours/<int:tour_id>/slot/add/', slot_create, name='slot_create'),
     path('slot/<int:slot_id>/edit/', slot_update, name='slot_update'),
     path('slot/<int:slot_id>/delete/', slot_delete, name='slot_delete'),
+    path('api/slots/<int:slot_id>/book/', views.book_slot_api, name='api_book_slot'),
+    path('api/locations/nearby/', views.nearby_locations_api, name='api_nearby_locations'),
+    path('api/locations/<int:location_id>/availability/', views.location_availability_api,
+         name='api_location_availability'),
 ]
 
 router = DefaultRouter()
 router.register(r'api/bikes', views.BikeViewSet)
 router.register(r'api/rentals', views.RentalViewSet)
 router.register(r'api/users', views.UserViewSet)
+router.register(r'api/tours', views.TourViewSet)
 
 urlpatterns += router.urls
 
@@ -52,6 +58,9 @@ def api_root(request, format=None):
         'bikes': request.build_absolute_uri('/api/bikes/'),
         'rentals': request.build_absolute_uri('/api/rentals/'),
         'users': request.build_absolute_uri('/api/users/'),
+        'tours': request.build_absolute_uri('/api/tours/'),
+        'locations_nearby': request.build_absolute_uri('/api/locations/nearby/'),
+        'users_me_summary': request.build_absolute_uri('/api/users/me/summary/'),
     })
 
 urlpatterns += [
@@ -2,120 +2,84 @@
 Вьюхи для bike tours: отображение туров, бронирований, профилей и т.д.
 """
 
-import datetime
-from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
-from django.db.models import Count, Avg, Q, F
+from django.db.models import Count, Avg, Q, F, Prefetch
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, login
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.forms import UserCreationForm
 from django.utils import timezone
+from django.utils.dateparse import parse_time
+from django.db import transaction
 from django.db.models import Subquery
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.core.exceptions import PermissionDenied
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.paginator import Paginator
 from rest_framework import viewsets, filters, status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.decorators import action
-from django.http import HttpResponseForbidden
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.http import Http404, HttpResponseBadRequest, HttpResponseForbidden
 from django.utils.decorators import method_decorator
 
-from .models import Tour, Review, Rental, Guide, Booking, User, create_manager_group, Bike, Slot
+from .models import Tour, Review, Rental, Guide, Booking, User, create_manager_group, Bike, Location, Slot, Task
 from .forms import TourForm, ReviewForm, UserProfileForm, CustomUserCreationForm, BookingForm, SlotForm, RentalForm
-from .serializers import BikeSerializer, RentalSerializer, UserSerializer
-
-class ManagerRequiredMixin(UserPassesTestMixin):
-    """Миксин для проверки прав менеджера или суперпользователя"""
-    def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='Managers').exists()
-
-    def handle_no_permission(self):
-        raise PermissionDenied("У вас нет прав для выполнения этого действия")
+from .serializers import BikeSerializer, RentalSerializer, UserSerializer, TourSerializer
+from .homepage import get_homepage_snapshot, invalidate_homepage_snapshot
+from .profile_summary import get_profile_summary
+from .search import search_bike_ids, search_tours, TourSearchFilter
+from .booking import book_slot, SLOT_NOT_FOUND
+from . import tasks
+from .taskqueue import enqueue
+from .pagination import KeysetPagination, SelectablePagination, StandardResultsSetPagination
+from .exports import EXPORTS, EXPORT_FORMATS, export_response, parse_export_date
+from .tour_cache import get_tour_detail, invalidate_all_tour_details
+from .geo import nearby_available_bikes, nearby_locations, parse_nearby_params
+from .availability import bike_availability, location_availability, lock_and_check, parse_range_params
+from .capabilities import (
+    BOOK_TOURS, EXPORT_DATA, MANAGE_RENTALS, MANAGE_TOURS, CapabilityRequiredMixin, capability_required,
+    has_capability,
+)
+
+class ManagerRequiredMixin(CapabilityRequiredMixin):
+    """Миксин для проверки прав менеджера (main/capabilities.py): по умолчанию - управление турами"""
+    required_capabilities = (MANAGE_TOURS,)
 
 def index(request):
-    # Популярные туры: по количеству отзывов (top 5)
-    popular_tours = Tour.objects.annotate(num_reviews=Count('reviews')).order_by('-num_reviews', '-price')[:5]
-    # Лучшие гиды: по рейтингу (top 5)
-    best_guides = Guide.objects.order_by('-rating')[:5]
-    # Последние бронирования (top 5)
-    latest_bookings = Booking.objects.select_related('user', 'tour').order_by('-date')[:5]
-    
-    # Пример 1: Использование __ для доступа к полям связанной модели
-    # Получаем туры с рейтингом отзывов выше 4
-    highly_rated_tours = Tour.objects.filter(reviews__rating__gte=4).distinct()
-    
-    # Пример 2: Получаем пользователей, которые забронировали туры с ценой выше 5000
-    users_with_expensive_bookings = User.objects.filter(bookings__tour__price__gt=5000).distinct()
-    
-    # Примеры использования exclude():
-    
-    # Пример 1: Короткие туры (исключаем туры длительностью более 3 часов)
-    short_tours = Tour.objects.exclude(duration__gt=3)[:3]
-    
-    # Пример 2: Недорогие туры (исключаем туры дороже 5000)
-    affordable_tours = Tour.objects.exclude(price__gt=5000)[:3]
-    
-    # Пример 3: Туры без отзывов (exclude + связанная модель)
-    tours_without_reviews = Tour.objects.exclude(reviews__isnull=False)[:3]
-    
-    # Пример 4: Свободные гиды (exclude + связанная модель через ManyToMany)
-    free_guides = Guide.objects.exclude(guide_tours__isnull=False)[:3]
-    
-    # Пример использования count() - простая статистика для главной страницы
-    total_tours_count = Tour.objects.count()
-    active_tours_count = Tour.objects.filter(is_active=True).count()
-    total_guides_count = Guide.objects.count()
-    total_reviews_count = Review.objects.count()
-    
-    return render(request, 'main/index.html', {
-        'popular_tours': popular_tours,
-        'best_guides': best_guides,
-        'latest_bookings': latest_bookings,
-        'highly_rated_tours': highly_rated_tours,
-        'users_with_expensive_bookings': users_with_expensive_bookings,
-        'short_tours': short_tours,
-        'affordable_tours': affordable_tours,
-        'tours_without_reviews': tours_without_reviews,
-        'free_guides': free_guides,
-        # Добавляем статистику для отображения на странице
-        'total_tours_count': total_tours_count,
-        'active_tours_count': active_tours_count,
-        'total_guides_count': total_guides_count,
-        'total_reviews_count': total_reviews_count,
-    })
+    # Все блоки главной страницы (статистика count(), примеры exclude(), популярные туры,
+    # лучшие гиды, последние бронирования) берутся из заранее собранного снимка,
+    # см. main/homepage.py - при попадании в кэш страница не делает запросов к БД.
+    return render(request, 'main/index.html', get_homepage_snapshot())
 
 # Демонстрация select_related
 # Выводит список аренд с оптимизацией запросов к user и bike
 
 def rental_list(request):
-    rentals = Rental.objects.select_related('user', 'bike').all()
+    # Новые аренды сверху; id - для стабильной пагинации (индекс rental_user_start_idx).
+    # bike__location - для str(rental.bike) в шаблоне без запроса на каждую строку
+    rentals = Rental.objects.select_related('user', 'bike__location').order_by('-start_time', '-id')
     user_search = request.GET.get('user_search', '').strip()
     bike_search = request.GET.get('bike_search', '').strip()
 
     # Фильтрация по пользователю
-    if not request.user.is_superuser and getattr(request.user, 'role', None) != 'Менеджер':
+    if not has_capability(request.user, MANAGE_RENTALS):
         rentals = rentals.filter(user=request.user)
 
     if user_search:
         rentals = rentals.filter(user__username__icontains=user_search)
     if bike_search:
-        words = bike_search.lower().split()
-        q = Q()
-        for word in words:
-            q &= (Q(bike__type__icontains=word) | Q(bike__location__name__icontains=word))
+        # Полнотекстовый индекс по типу (код и название) и локации велосипеда, см. main/search.py;
+        # число - ещё и номер велосипеда. Фильтр остаётся в SQL, пагинация - в БД
+        matching_bikes = search_bike_ids(bike_search)
+        q = Q(bike_id__in=matching_bikes) if matching_bikes is not None else Q(pk__in=[])
         if bike_search.isdigit():
-            q |= Q(bike__id=int(bike_search))
-        rentals_qs = rentals.filter(q)
-        if rentals_qs.exists():
-            rentals = rentals_qs
-        else:
-            rentals = [r for r in rentals if bike_search.lower() in str(r.bike).lower()]
+            q |= Q(bike_id=int(bike_search))
+        rentals = rentals.filter(q)
 
     # Пагинация
     paginator = Paginator(rentals, 10)
@@ -124,12 +88,43 @@ def rental_list(request):
 
     return render(request, 'main/rental_list.html', {'page_obj': page_obj})
 
+TOUR_GUIDES_PAGE_SIZE = 12
+
 # Демонстрация prefetch_related
 # Выводит список туров и всех гидов для каждого тура
-
 def tour_guides_list(request):
-    tours = Tour.objects.prefetch_related('guides').all()
-    return render(request, 'main/tour_guides_list.html', {'tours': tours})
+    tour_search = request.GET.get('tour_search', '').strip()
+    guide_search = request.GET.get('guide_search', '').strip()
+    guide_id = request.GET.get('guide_id', '')
+
+    # Гиды подгружаются одним запросом вместе с пользователями (без запроса на каждого гида)
+    guides = Guide.objects.select_related('user').only('id', 'user__id', 'user__username').order_by('user__username')
+    tours = Tour.objects.only('id', 'name').prefetch_related(Prefetch('guides', queryset=guides))
+
+    if tour_search:
+        tours = tours.filter(name__icontains=tour_search)
+    if guide_search:
+        tours = tours.filter(guides__user__username__icontains=guide_search).distinct()
+    if guide_id.isdigit():
+        tours = tours.filter(guide_tours__guide_id=int(guide_id)).distinct()
+
+    # Keyset-пагинация по id (main/pagination.py): WHERE id > последний id вместо OFFSET и
+    # без COUNT(*); ссылки сохраняют все параметры фильтра
+    paginator = KeysetPagination()
+    paginator.page_size = TOUR_GUIDES_PAGE_SIZE
+    try:
+        tours_page = paginator.paginate_queryset(tours, Request(request))
+    except NotFound:
+        raise Http404('Неверный курсор')
+    # Первая страница - те же фильтры без курсора
+    first_query = request.GET.copy()
+    first_query.pop(paginator.cursor_query_param, None)
+    return render(request, 'main/tour_guides_list.html', {
+        'tours': tours_page,
+        'first_link': f'?{first_query.urlencode()}',
+        'next_link': paginator.get_next_link(),
+        'previous_link': paginator.get_previous_link(),
+    })
 
 # CRUD операции для маршрутов
 class TourListView(ListView):
@@ -162,9 +157,8 @@ class TourListView(ListView):
 
         # Применяем фильтры
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search)
-            )
+            # Полнотекстовый поиск по названию, описанию и местоположению (main/search.py)
+            queryset = search_tours(queryset, search)
         
         if location:
             queryset = queryset.filter(location__icontains=location)
@@ -185,7 +179,7 @@ class TourListView(ListView):
             queryset = queryset.filter(created_at__lte=created_before)
         
         if rating:
-            queryset = queryset.filter(rating__gte=rating)
+            queryset = queryset.filter(avg_rating__gte=rating)
         
         if name_starts_with:
             queryset = queryset.filter(name__istartswith=name_starts_with)
@@ -197,14 +191,14 @@ class TourListView(ListView):
             queryset = queryset.filter(price__lte=10000)
         
         if hide_without_reviews:
-            queryset = queryset.exclude(reviews__isnull=True)
+            queryset = queryset.filter(review_count__gt=0)
         
         if hide_new:
             seven_days_ago = timezone.now() - timezone.timedelta(days=7)
             queryset = queryset.exclude(created_at__gte=seven_days_ago)
         
         if highly_rated:
-            queryset = queryset.filter(rating__gte=4.5)
+            queryset = queryset.filter(review_count__gt=0, avg_rating__gte=4.5)
         
         if exclude_duration:
             queryset = queryset.exclude(duration=exclude_duration)
@@ -213,11 +207,12 @@ class TourListView(ListView):
             queryset = queryset.exclude(location__icontains=exclude_location)
         
         if has_guide == '1':
-            queryset = queryset.filter(guides__isnull=False)
+            # JOIN с гидами размножает строки - только здесь нужен DISTINCT
+            queryset = queryset.filter(guides__isnull=False).distinct()
         elif has_guide == '0':
             queryset = queryset.filter(guides__isnull=True)
 
-        return queryset.distinct()
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -275,7 +270,7 @@ class TourUpdateView(LoginRequiredMixin, ManagerRequiredMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated and self.request.user.role == 'Менеджер':
+        if has_capability(self.request.user, MANAGE_TOURS):
             if 'slot_form' not in context:
                 context['slot_form'] = SlotForm()
             context['guides'] = self.object.guides.all()
@@ -284,26 +279,26 @@ class TourUpdateView(LoginRequiredMixin, ManagerRequiredMixin, UpdateView):
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         form = self.get_form()
-        slot_form = SlotForm(request.POST) if 'add_slot' in request.POST else SlotForm()
+        slot_form = SlotForm(request.POST, instance=Slot(tour=self.object)) if 'add_slot' in request.POST else SlotForm()
         # Массовое создание слотов на 7 дней вперёд
-        if 'add_week_slots' in request.POST and (request.user.is_superuser or request.user.role == 'Менеджер'):
+        if 'add_week_slots' in request.POST:
             guide_id = request.POST.get('week_guide')
-            time_str = request.POST.get('week_time')
-            if guide_id and time_str:
-                guide = Guide.objects.get(id=guide_id)
-                hour, minute = map(int, time_str.split(':'))
-                today = timezone.now().date()
-                created = 0
-                for i in range(7):
-                    dt = timezone.make_aware(datetime.datetime.combine(today + timedelta(days=i), datetime.time(hour, minute)))
-                    if not Slot.objects.filter(tour=self.object, guide=guide, datetime=dt).exists():
-                        Slot.objects.create(tour=self.object, guide=guide, datetime=dt)
-                        created += 1
-                messages.success(request, f'Создано {created} слотов на 7 дней вперёд!')
+            try:
+                week_time = parse_time(request.POST.get('week_time') or '')
+            except ValueError:
+                week_time = None
+            if guide_id and week_time:
+                guide = get_object_or_404(Guide, id=guide_id)
+                # Слоты создаёт фоновая задача (main/tasks.py), запрос возвращается сразу
+                enqueue(
+                    tasks.create_week_slots, tour_id=self.object.pk, guide_id=guide.pk,
+                    time=week_time.isoformat(), start_date=timezone.localdate().isoformat(),
+                )
+                messages.success(request, 'Создание слотов на 7 дней вперёд поставлено в очередь')
             else:
                 messages.error(request, 'Выберите гида и время!')
             return redirect('tour_edit', pk=self.object.pk)
-        if 'add_slot' in request.POST and (request.user.is_superuser or request.user.role == 'Менеджер'):
+        if 'add_slot' in request.POST:
             if slot_form.is_valid():
                 slot = slot_form.save(commit=False)
                 slot.tour = self.object
@@ -369,49 +364,10 @@ def create_review(request, tour_id):
 
 @login_required
 def profile(request):
-    user = request.user
-    
-    # Стандартные запросы с использованием filter()
-    user_bookings = Booking.objects.filter(user=user).select_related('tour')
-    user_reviews = Review.objects.filter(user=user).select_related('tour')
-    
-    # Запросы с использованием exclude()
-    
-    # Пример 1: Не забронированные пользователем туры
-    available_tours = Tour.objects.exclude(bookings__user=user)[:5]
-    
-    # Пример 2: Туры, на которые пользователь не оставлял отзывы
-    tours_without_user_reviews = Tour.objects.exclude(reviews__user=user)[:5]
-    
-    # Пример 3: Последние туры, кроме слишком дорогих для пользователя
-    affordable_new_tours = Tour.objects.order_by('-created_at').exclude(price__gt=5000)[:5]
-    
-    # Пример 4: Гиды без назначений на туры
-    unassigned_guides = Guide.objects.exclude(guide_tours__isnull=False)[:3]
-    
-    # Примеры использования exists() - проверка наличия записей
-    has_reviews = Review.objects.filter(user=user).exists()
-    has_recent_bookings = Booking.objects.filter(
-        user=user, 
-        date__gte=timezone.now() - timezone.timedelta(days=30)
-    ).exists()
-    has_expensive_tours = user_bookings.filter(tour__price__gt=5000).exists()
-    has_reviewed_all_tours = not Tour.objects.exclude(reviews__user=user).exists()
-    
-    return render(request, 'main/profile.html', {
-        'user': user,
-        'bookings': user_bookings,
-        'reviews': user_reviews,
-        'available_tours': available_tours,
-        'tours_without_user_reviews': tours_without_user_reviews,
-        'affordable_new_tours': affordable_new_tours,
-        'unassigned_guides': unassigned_guides,
-        # Добавляем результаты проверок exists()
-        'has_reviews': has_reviews,
-        'has_recent_bookings': has_recent_bookings,
-        'has_expensive_tours': has_expensive_tours,
-        'has_reviewed_all_tours': has_reviewed_all_tours,
-    })
+    # Бронирования, отзывы и флаги «Быстрой информации» - из сводки пользователя в кэше
+    # (main/profile_summary.py): при промахе два запроса, при попадании - ни одного
+    context = get_profile_summary(request.user.pk)
+    return render(request, 'main/profile.html', {**context, 'user': request.user, 'now': timezone.now()})
 
 @login_required
 def update_profile(request):
@@ -477,12 +433,9 @@ def exclude_examples(request):
         id__in=Subquery(recent_bookings.values('tour_id'))
     )[:3]
     
-    # 6. Exclude с агрегацией
-    from django.db.models import Count
-    # Туры с менее чем 3 отзывами
-    popular_tours = Tour.objects.annotate(
-        review_count=Count('reviews')
-    ).exclude(review_count__lt=3)[:3]
+    # 6. Exclude по агрегату
+    # Туры с менее чем 3 отзывами (review_count - денормализованное число отзывов тура)
+    popular_tours = Tour.objects.exclude(review_count__lt=3)[:3]
     
     # 7. Exclude с диапазоном дат
     # Туры, не созданные в последние 7 дней
@@ -528,112 +481,67 @@ def count_exists_example(request):
 
 # Представление для детального просмотра тура
 def tour_detail(request, tour_id):
-    tour = get_object_or_404(Tour, id=tour_id)
-    next_tours = tour.get_next_tours(3)
-    prev_tours = tour.get_prev_tours(3)
-    reviews = tour.reviews.select_related('user').order_by('-created_at')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-    similar_tours = Tour.objects.filter(
-        Q(duration=tour.duration) | Q(location__icontains=tour.location)
-    ).exclude(id=tour.id)[:4]
-    price_range_min = float(tour.price) * 0.8
-    price_range_max = float(tour.price) * 1.2
-    price_similar_tours = Tour.objects.filter(
-        price__range=(price_range_min, price_range_max)
-    ).exclude(duration=tour.duration).distinct()[:3]
-    
+    # Описание, гиды, отзывы, расписание и похожие туры берутся из кэша (main/tour_cache.py),
+    # вживую строится только форма бронирования текущего пользователя
+    context = get_tour_detail(tour_id)
+    if context is None:
+        raise Http404('Тур не найден')
+
     booking_form = None
     booking_success = False
     booking_error = None
-    if request.user.is_authenticated and request.user.role == 'Пользователь':
+    if has_capability(request.user, BOOK_TOURS):
         if request.method == 'POST' and 'book_tour' in request.POST:
-            booking_form = BookingForm(request.POST, tour=tour)
+            booking_form = BookingForm(request.POST, tour=tour_id)
             if booking_form.is_valid():
                 slot = booking_form.cleaned_data['slot']
-                # Проверка: слот не занят
-                if slot.is_booked:
-                    booking_error = 'Этот слот уже занят. Пожалуйста, выберите другой.'
-                else:
-                    Booking.objects.create(user=request.user, tour=tour, date=slot.datetime, total_price=float(tour.price))
-                    # Создаём Rental для пользователя по бронированию тура
-                    Rental.objects.create(
-                        user=request.user,
-                        bike=slot.bike if hasattr(slot, 'bike') else None,
-                        start_time=slot.datetime,
-                        end_time=slot.datetime + timedelta(hours=tour.duration),
-                        total_price=float(tour.price)
-                    )
-                    slot.is_booked = True
-                    slot.save()
+                # Атомарный захват слота: двойное бронирование невозможно (main/booking.py)
+                result = book_slot(request.user, slot)
+                if result.success:
                     booking_success = True
-                    booking_form = BookingForm(tour=tour)  # сброс формы
+                    booking_form = BookingForm(tour=tour_id)  # сброс формы
+                    # Слот занят - ближайшие даты изменились
+                    context = get_tour_detail(tour_id)
+                else:
+                    booking_error = result.error
             else:
                 booking_error = 'Проверьте правильность заполнения формы.'
         else:
-            booking_form = BookingForm(tour=tour)
+            booking_form = BookingForm(tour=tour_id)
 
     return render(request, 'main/tour_detail.html', {
-        'tour': tour,
-        'next_tours': next_tours,
-        'prev_tours': prev_tours,
-        'reviews': reviews,
-        'avg_rating': avg_rating,
-        'similar_tours': similar_tours,
-        'price_similar_tours': price_similar_tours,
-        'is_highly_rated': tour.is_highly_rated(),
+        **context,
         'booking_form': booking_form,
         'booking_success': booking_success,
         'booking_error': booking_error,
     })
 
 def bulk_tour_actions(request):
-    """Представление для демонстрации массовых операций update() и delete()"""
-    
-    # Пример 1: Массовое обновление с update()
-    # Деактивируем все туры старше 30 дней
-    old_tours_count = Tour.objects.filter(
-        created_at__lte=timezone.now() - timezone.timedelta(days=30)
-    ).update(is_active=False)
-    
-    # Пример 2: Массовое обновление цен для коротких туров
-    short_tours_updated = Tour.objects.filter(
-        duration__lte=2
-    ).update(price=F('price') * 0.9)  # Снижаем цену на 10%
-    
-    # Пример 3: Массовое удаление с delete()
-    # Удаляем все неактивные туры без отзывов
-    deleted_tours = Tour.objects.filter(
-        is_active=False,
-        reviews__isnull=True
-    ).delete()
-    
-    # Пример 4: Обновление описания для туров в Москве
-    moscow_tours_updated = Tour.objects.filter(
-        location__icontains='Москва'
-    ).update(description='Обновлено: Доступна новая система скидок для московских туров!')
-    
-    return render(request, 'main/bulk_actions_result.html', {
-        'old_tours_count': old_tours_count,
-        'short_tours_updated': short_tours_updated,
-        'deleted_tours': deleted_tours[0] if isinstance(deleted_tours, tuple) else 0,  # Безопасное получение количества удаленных записей
-        'moscow_tours_updated': moscow_tours_updated,
-    })
+    """
+    Массовые операции update() и delete() над турами (main/tasks.py). Выполняются
+    фоновой задачей: запрос только ставит её в очередь и перенаправляет на страницу
+    со статусом (?task=<id>), где после выполнения показываются результаты.
+    """
+    task_id = request.GET.get('task')
+    if task_id is None:
+        queued = enqueue(tasks.bulk_tour_actions)
+        return redirect(f"{reverse('bulk_tour_actions')}?task={queued.pk}")
+    if not task_id.isdigit():
+        return HttpResponseBadRequest('Некорректный номер задачи')
+    task = get_object_or_404(Task, pk=task_id, name=tasks.bulk_tour_actions.task_name)
+    return render(request, 'main/bulk_actions_result.html', {'task': task, **(task.result or {})})
 
 def permission_denied(request, exception):
     """Обработчик ошибки 403 (Доступ запрещен)"""
     return render(request, 'main/403.html', {'exception': str(exception)}, status=403)
 
-# Пагинация
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
 # Валидация бизнес-логики: нельзя арендовать недоступный велосипед
 class RentalViewSet(viewsets.ModelViewSet):
-    queryset = Rental.objects.select_related('user', 'bike').all()
+    queryset = Rental.objects.select_related('user', 'bike').order_by('start_time', 'id')
     serializer_class = RentalSerializer
-    pagination_class = StandardResultsSetPagination
+    # ?pagination=cursor - keyset-пагинация по индексу rental_start_id_idx (main/pagination.py)
+    pagination_class = SelectablePagination
+    keyset_ordering = ('start_time', 'id')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['user', 'bike', 'start_time', 'end_time', 'total_price']
     search_fields = ['user__username', 'bike__type']
@@ -645,7 +553,20 @@ class RentalViewSet(viewsets.ModelViewSet):
             bike = Bike.objects.filter(id=bike_id).first()
             if bike and bike.status.status_name != 'Доступен':
                 return Response({'error': 'Велосипед недоступен для аренды.'}, status=status.HTTP_400_BAD_REQUEST)
-        return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if data['end_time'] <= data['start_time']:
+            return Response({'error': 'Время окончания должно быть позже времени начала.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            # Пересечение с арендами и турами велосипеда (main/availability.py)
+            error = data.get('bike') and lock_and_check(data['bike'].pk, data['start_time'], data['end_time'])
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+            self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     @action(methods=['GET'], detail=False)
     def my_rentals(self, request):
@@ -675,30 +596,133 @@ class RentalViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 class BikeViewSet(viewsets.ModelViewSet):
-    queryset = Bike.objects.select_related('status', 'location').all()
+    queryset = Bike.objects.select_related('status', 'location').order_by('id')
     serializer_class = BikeSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = SelectablePagination
+    keyset_ordering = ('id',)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['type', 'status', 'location']
     search_fields = ['type', 'location__name']
     ordering_fields = ['rental_price_hour', 'rental_price_day']
 
+    @action(methods=['GET'], detail=False)
+    def nearby(self, request):
+        """
+        Доступные велосипеды рядом с точкой, от ближнего к дальнему (main/geo.py):
+        ?lat=&lng=&radius= (км, по умолчанию 5)&limit= (по умолчанию 20).
+        """
+        try:
+            lat, lng, radius_km, limit = parse_nearby_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        found = nearby_available_bikes(lat, lng, radius_km, limit)
+        data = self.get_serializer([bike for _, bike in found], many=True).data
+        for item, (distance, bike) in zip(data, found):
+            item['distance_km'] = round(distance, 3)
+            item['location_name'] = bike.location.name
+        return Response(data)
+
+    @action(methods=['GET'], detail=True)
+    def availability(self, request, pk=None):
+        """Занятые интервалы и свободные окна велосипеда: ?start=&end= (ISO 8601, по умолчанию неделя от текущего момента)."""
+        try:
+            start, end = parse_range_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(bike_availability(self.get_object(), start, end))
+
+class TourViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Tour.objects.all()
+    serializer_class = TourSerializer
+    pagination_class = StandardResultsSetPagination
+    # ?search= идёт через полнотекстовый индекс и упорядочивает выдачу по релевантности
+    filter_backends = [DjangoFilterBackend, TourSearchFilter]
+    filterset_fields = ['duration', 'is_active']
+
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = UserSerializer
-    pagination_class = StandardResultsSetPagination
+    # Список и правка пользователей - только для персонала; свою сводку видит каждый
+    permission_classes = [IsAdminUser]
+    pagination_class = SelectablePagination
+    keyset_ordering = ('id',)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['role', 'gender']
     search_fields = ['username', 'email']
-    ordering_fields = ['username', 'email'] 
-
-@login_required
+    ordering_fields = ['username', 'email']
+
+    @action(methods=['GET'], detail=False, url_path='me/summary', permission_classes=[IsAuthenticated])
+    def me_summary(self, request):
+        """Сводка профиля текущего пользователя: последние бронирования и отзывы, счётчики и флаги."""
+        return Response(get_profile_summary(request.user.pk))
+
+@api_view(['GET'])
+def nearby_locations_api(request):
+    """Ближайшие локации проката с числом доступных велосипедов: ?lat=&lng=&radius=&limit="""
+    try:
+        lat, lng, radius_km, limit = parse_nearby_params(request.query_params)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response([
+        {
+            'id': location.pk,
+            'name': location.name,
+            'address': location.address,
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'distance_km': round(distance, 3),
+            'available_bikes': available,
+        }
+        for distance, location, available in nearby_locations(lat, lng, radius_km, limit)
+    ])
+
+@api_view(['GET'])
+def location_availability_api(request, location_id):
+    """Свободные окна велосипедов локации и общие окна локации: ?start=&end= (ISO 8601)."""
+    location = get_object_or_404(Location, pk=location_id)
+    try:
+        start, end = parse_range_params(request.query_params)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(location_availability(location, start, end))
+
+@capability_required(EXPORT_DATA, message='Выгрузка доступна только менеджерам')
+def export_data(request, dataset, fmt):
+    """
+    Потоковая выгрузка аренд/бронирований (main/exports.py) для менеджеров:
+    суперпользователей и участников группы Managers (main/capabilities.py).
+    Параметры: ?since=, ?until= - границы по дате (ISO 8601).
+    """
+    if dataset not in EXPORTS or fmt not in EXPORT_FORMATS:
+        raise Http404('Неизвестная выгрузка')
+    try:
+        since = parse_export_date(request.GET.get('since'))
+        until = parse_export_date(request.GET.get('until'))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    return export_response(dataset, fmt, since, until)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def book_slot_api(request, slot_id):
+    """
+    API бронирования слота: 201 - успех, 404 - нет слота,
+    409 - слот уже занят (slot_unavailable), прошёл (slot_expired) или тур неактивен (tour_inactive).
+    """
+    if not has_capability(request.user, BOOK_TOURS):
+        return Response({'error': 'Бронировать туры могут только пользователи.'}, status=status.HTTP_403_FORBIDDEN)
+    result = book_slot(request.user, slot_id)
+    if result.success:
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+    if result.code == SLOT_NOT_FOUND:
+        return Response(result.as_dict(), status=status.HTTP_404_NOT_FOUND)
+    return Response(result.as_dict(), status=status.HTTP_409_CONFLICT)
+
+@capability_required(MANAGE_TOURS, message='Доступ разрешён только менеджерам')
 def slot_create(request, tour_id):
     tour = get_object_or_404(Tour, id=tour_id)
-    if request.user.role != 'Менеджер':
-        return HttpResponseForbidden('Доступ разрешён только менеджерам')
     if request.method == 'POST':
-        form = SlotForm(request.POST)
+        form = SlotForm(request.POST, instance=Slot(tour=tour))
         if form.is_valid():
             slot = form.save(commit=False)
             slot.tour = tour
@@ -709,11 +733,9 @@ def slot_create(request, tour_id):
         form = SlotForm()
     return render(request, 'main/slot_form.html', {'form': form, 'tour': tour})
 
-@login_required
+@capability_required(MANAGE_TOURS, message='Доступ разрешён только менеджерам')
 def slot_update(request, slot_id):
     slot = get_object_or_404(Slot, id=slot_id)
-    if request.user.role != 'Менеджер':
-        return HttpResponseForbidden('Доступ разрешён только менеджерам')
     if request.method == 'POST':
         form = SlotForm(request.POST, instance=slot)
         if form.is_valid():
@@ -724,11 +746,9 @@ def slot_update(request, slot_id):
         form = SlotForm(instance=slot)
     return render(request, 'main/slot_form.html', {'form': form, 'tour': slot.tour})
 
-@login_required
+@capability_required(MANAGE_TOURS, message='Доступ разрешён только менеджерам')
 def slot_delete(request, slot_id):
     slot = get_object_or_404(Slot, id=slot_id)
-    if request.user.role != 'Менеджер':
-        return HttpResponseForbidden('Доступ разрешён только менеджерам')
     tour_id = slot.tour.id
     if request.method == 'POST':
         slot.delete()
@@ -738,6 +758,7 @@ def slot_delete(request, slot_id):
 
 class RentalCreateView(LoginRequiredMixin, ManagerRequiredMixin, CreateView):
     model = Rental
+    required_capabilities = (MANAGE_RENTALS,)
     form_class = RentalForm
     template_name = 'main/rental_form.html'
     success_url = reverse_lazy('rental_list')
@@ -746,7 +767,13 @@ class RentalCreateView(LoginRequiredMixin, ManagerRequiredMixin, CreateView):
         rental = form.save(commit=False)
         rental.user = self.request.user
         rental.total_price = form.cleaned_data['total_price']
-        rental.save()
+        with transaction.atomic():
+            # Велосипед могли занять между проверкой формы и сохранением
+            error = lock_and_check(rental.bike_id, rental.start_time, rental.end_time)
+            if error:
+                form.add_error(None, error)
+                return self.form_invalid(form)
+            rental.save()
         messages.success(self.request, 'Аренда успешно создана!')
         return redirect(self.success_url)
 
@@ -759,7 +786,7 @@ class RentalDeleteView(LoginRequiredMixin, DeleteView):
         rental = self.get_object()
         user = request.user
         # Разрешено, если пользователь — владелец аренды, менеджер или суперпользователь
-        if user == rental.user or user.is_superuser or user.role == 'Менеджер':
+        if user == rental.user or has_capability(user, MANAGE_RENTALS):
             return super().dispatch(request, *args, **kwargs)
         return HttpResponseForbidden('Доступ запрещён: можно удалять только свои аренды или если вы менеджер/админ.')
 
@@ -769,6 +796,7 @@ class RentalDeleteView(LoginRequiredMixin, DeleteView):
 
 class RentalUpdateView(LoginRequiredMixin, ManagerRequiredMixin, UpdateView):
     model = Rental
+    required_capabilities = (MANAGE_RENTALS,)
     form_class = RentalForm
     template_name = 'main/rental_form.html'
     success_url = reverse_lazy('rental_list')
@@ -777,6 +805,11 @@ class RentalUpdateView(LoginRequiredMixin, ManagerRequiredMixin, UpdateView):
         rental = form.save(commit=False)
         rental.user = self.request.user
         rental.total_price = form.cleaned_data.get('total_price', rental.total_price)
-        rental.save()
+        with transaction.atomic():
+            error = lock_and_check(rental.bike_id, rental.start_time, rental.end_time, exclude_rental=rental.pk)
+            if error:
+                form.add_error(None, error)
+                return self.form_invalid(form)
+            rental.save()
         messages.success(self.request, 'Аренда успешно обновлена!')
         return redirect(self.success_url) 
\ No newline at end of file